@@ -1,65 +1,167 @@
-from flask import Flask, render_template, jsonify, request
-import requests
-import pandas as pd
-from datetime import datetime, timedelta
+from flask import Flask, render_template, jsonify, request, Response, g
+import click
+import os
+import json
+from datetime import datetime, timedelta, timezone
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.metrics import r2_score, mean_absolute_error
 import warnings
+import atexit
+import hashlib
+import time
+import threading
+from cache import DatasetCache, ForecastCache
+from sync import DataSync
+from fetcher import GraphQLClient
+from sources import GraphQLSource, FileSource, SyntheticSource
+from forecasting import forecast_many, MODELS, STATE_MODELS
+from backtest import run_backtest
+from precompute import Precomputer
+from shared import SharedDataset
+from events import EventBroker, format_event
+from encoding import Series, encode, negotiate, to_columnar, FORMATS
+from rollups import DAY_NS, EPOCH_DAY, CategoryRollup
+import metrics
+from metrics import stage
+from compression import COMPRESSIBLE, choose_encoding, compress
+from downsampling import downsample, METHODS as DOWNSAMPLE_METHODS, MIN_POINTS
 warnings.filterwarnings('ignore')
 
+# pandas (y requests, ver fetcher.py) se importa dentro de las funciones que lo
+# usan: así cada worker arranca y responde sin pagar su importación, que se
+# hace al cargar los datos en segundo plano (ver `warm_start`).
+
 app = Flask(__name__)
 
-# Función para obtener datos (la misma que tenías)
+# Configuración
+GRAPHQL_URL = os.environ.get('GRAPHQL_URL', 'http://localhost:3000/api/graphql')
+DATA_CACHE_TTL = float(os.environ.get('DATA_CACHE_TTL', 60))
+DATA_CACHE_MAX_MB = float(os.environ.get('DATA_CACHE_MAX_MB', 256))
+# Pronósticos guardados (LRU) por versión de datos y parámetros
+FORECAST_CACHE_SIZE = int(os.environ.get('FORECAST_CACHE_SIZE', 256))
+# Precálculo en segundo plano de los pronósticos más pedidos
+PRECOMPUTE = os.environ.get('PRECOMPUTE', '0') == '1'
+PRECOMPUTE_WORKERS = int(os.environ.get('PRECOMPUTE_WORKERS', 2))
+PRECOMPUTE_MODELS = ('linear', 'poly2', 'poly3', 'moving_avg')
+PRECOMPUTE_PERIODS = ('D', 'W', 'M')
+PRECOMPUTE_HORIZONS = tuple(int(h) for h in os.environ.get('PRECOMPUTE_HORIZONS', '7,30,90').split(','))
+# Cada cuántos segundos se sincroniza en segundo plano (0 = solo a pedido)
+BACKGROUND_SYNC_INTERVAL = float(os.environ.get('BACKGROUND_SYNC_INTERVAL', 0))
+# Métricas en /metrics (0 = no medir) y cabecera Server-Timing en cada respuesta
+metrics.enabled = os.environ.get('METRICS', '1') == '1'
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '0') == '1'
+# Respuestas más chicas que esto (bytes) no se comprimen
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+# Procesos para la validación cruzada de modelos (0 = en el proceso de la app)
+BACKTEST_WORKERS = int(os.environ.get('BACKTEST_WORKERS', os.cpu_count() or 1))
+# Argumento del API para pedir solo registros posteriores a una fecha (vacío = comparar por id)
+GRAPHQL_DELTA_ARG = os.environ.get('GRAPHQL_DELTA_ARG', '')
+# Cada cuántas sincronizaciones se hace una descarga completa (0 = nunca)
+SYNC_FULL_EVERY = int(os.environ.get('SYNC_FULL_EVERY', 50))
+# Varios procesos comparten la instantánea y solo uno consulta el upstream (requiere SNAPSHOT_DIR)
+SHARED_DATA = os.environ.get('SHARED_DATA', '0') == '1'
+# /stream: mensajes pendientes por cliente antes de pedirle que recargue, clientes a la vez
+# (en modo ASGI) y segundos entre latidos
+STREAM_QUEUE = int(os.environ.get('STREAM_QUEUE', 16))
+STREAM_MAX_CLIENTS = int(os.environ.get('STREAM_MAX_CLIENTS', 100))
+# En modo WSGI cada conexión de /stream ocupa un hilo del servidor mientras la pestaña está
+# abierta: apagado por defecto (0); si se activa, debe quedar por debajo de los hilos por proceso
+STREAM_WSGI_CLIENTS = int(os.environ.get('STREAM_WSGI_CLIENTS', 0))
+STREAM_HEARTBEAT = float(os.environ.get('STREAM_HEARTBEAT', 15))
+# Mientras haya clientes en /stream se sincroniza cada tantos segundos aunque nadie pida
+# datos, para que les lleguen los cambios (0 = solo cuando una petición recarga la caché)
+STREAM_SYNC_INTERVAL = float(os.environ.get('STREAM_SYNC_INTERVAL', DATA_CACHE_TTL))
+
+# Origen de los datos: graphql (por defecto), file o synthetic
+DATA_SOURCE = os.environ.get('DATA_SOURCE', 'graphql')
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+# Volcados capturados del API; DATA_FILES_DIR usa <campo>.json de otra carpeta
+DUMP_FILES = {'ventaBoletos': os.path.join(DATA_DIR, 'pasar a luisiño'), 'gastos': os.path.join(DATA_DIR, 'gastos')}
+DATA_FILES_DIR = os.environ.get('DATA_FILES_DIR', '')
+SYNTHETIC_VENTAS = int(os.environ.get('SYNTHETIC_VENTAS', 100_000))
+SYNTHETIC_GASTOS = int(os.environ.get('SYNTHETIC_GASTOS', 25_000))
+SYNTHETIC_SEED = int(os.environ.get('SYNTHETIC_SEED', 0))
+
+# Instantánea columnar en disco (vacío = desactivada)
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', os.path.join(DATA_DIR, 'snapshot'))
+
+# Timeouts (s) y reintentos de las consultas al API
+GRAPHQL_CONNECT_TIMEOUT = float(os.environ.get('GRAPHQL_CONNECT_TIMEOUT', 3.05))
+GRAPHQL_READ_TIMEOUT = float(os.environ.get('GRAPHQL_READ_TIMEOUT', 30))
+GRAPHQL_RETRIES = int(os.environ.get('GRAPHQL_RETRIES', 2))
+
+# Sesión HTTP compartida (keep-alive, timeouts y reintentos)
+graphql_client = GraphQLClient(
+    GRAPHQL_URL,
+    timeout=(GRAPHQL_CONNECT_TIMEOUT, GRAPHQL_READ_TIMEOUT),
+    retries=GRAPHQL_RETRIES,
+)
+
+http_requests = metrics.registry.counter(
+    'http_requests_total', 'Peticiones atendidas por ruta, método y estado', ('route', 'method', 'status'))
+http_latency = metrics.registry.histogram(
+    'http_request_duration_seconds', 'Latencia por ruta y modelo', ('route', 'model_type'))
+
+# Subcampos pedidos para cada campo raíz del API GraphQL
+QUERY_FIELDS = {
+    'ventaBoletos': ('id', 'precio', 'fechaVenta'),
+    'gastos': ('id', 'descripcion', 'monto', 'fecha'),
+}
+
+# Origen de los datos: el API en vivo, volcados JSON o datos sintéticos
+if DATA_SOURCE == 'file':
+    data_source = FileSource.from_directory(DATA_FILES_DIR) if DATA_FILES_DIR else FileSource(DUMP_FILES)
+elif DATA_SOURCE == 'synthetic':
+    data_source = SyntheticSource(SYNTHETIC_VENTAS, SYNTHETIC_GASTOS, seed=SYNTHETIC_SEED)
+else:
+    data_source = GraphQLSource(graphql_client, QUERY_FIELDS, GRAPHQL_DELTA_ARG)
+
+# DataFrames a partir de las columnas de cada serie (ver store.Columns). El
+# índice (fechas UTC sin zona) y los montos son vistas de las columnas, sin
+# copiarlas: con la instantánea mapeada, los procesos comparten las páginas.
+def columns_frame(cols, col, desc_col=None):
+    import pandas as pd
+    if not len(cols):
+        return pd.DataFrame()
+    fechas = pd.DatetimeIndex(cols.ts.view('datetime64[ns]'), copy=False, name="Fecha")
+    columns = {col: cols.amount}
+    # La descripción queda como categórica: un código por fila y cada texto una sola vez
+    if desc_col and cols.desc is not None:
+        columns[desc_col] = cols.desc
+    return pd.DataFrame(columns, index=fechas, copy=False)
+
+def ventas_frame(cols):
+    return columns_frame(cols, "Ganancia")
+
+def gastos_frame(cols):
+    return columns_frame(cols, "Gasto", "Descripcion")
+
+# Filas entre dos fechas (inclusive). Los DataFrames están ordenados por su
+# DatetimeIndex, así que basta con dos búsquedas binarias y el resultado es
+# una vista, sin copiar ni comparar fila por fila.
+def filter_by_date(df, start_date, end_date):
+    import pandas as pd
+    if df.empty:
+        return df
+    start = pd.Timestamp(start_date, tz=df.index.tz)
+    end = pd.Timestamp(end_date, tz=df.index.tz) + pd.Timedelta(days=1)
+    lo = df.index.searchsorted(start, side='left')
+    hi = df.index.searchsorted(end, side='left')
+    return df.iloc[lo:hi]
+
+# Función para obtener datos (descarga completa)
 def get_datos():
+    import pandas as pd
     try:
-        # Ventas
-        query_ventas = """
-        query {
-          ventaBoletos {
-            precio
-            fechaVenta
-          }
-        }"""
-
-        res_ventas = requests.post("http://localhost:3000/api/graphql", json={"query": query_ventas})
-
-        if res_ventas.status_code == 200:
-            ventas_data = res_ventas.json()
-            if "data" in ventas_data and "ventaBoletos" in ventas_data["data"]:
-                df_ventas = pd.DataFrame(ventas_data["data"]["ventaBoletos"])
-                if not df_ventas.empty:
-                    df_ventas["fechaVenta"] = pd.to_datetime(df_ventas["fechaVenta"])
-                    df_ventas = df_ventas.rename(columns={"precio": "Ganancia", "fechaVenta": "Fecha"})
-                    df_ventas.set_index("Fecha", inplace=True)
-            else:
-                df_ventas = pd.DataFrame()
-        else:
-            df_ventas = pd.DataFrame()
-
-        # Gastos
-        query_gastos = """
-        query {
-          gastos {
-            monto
-            fecha
-          }
-        }"""
-
-        res_gastos = requests.post("http://localhost:3000/api/graphql", json={"query": query_gastos})
-
-        if res_gastos.status_code == 200:
-            gastos_data = res_gastos.json()
-            if "data" in gastos_data and "gastos" in gastos_data["data"]:
-                df_gastos = pd.DataFrame(gastos_data["data"]["gastos"])
-                if not df_gastos.empty:
-                    df_gastos["fecha"] = pd.to_datetime(df_gastos["fecha"]).dt.date
-                    df_gastos = df_gastos.rename(columns={"monto": "Gasto", "fecha": "Fecha"})
-            else:
-                df_gastos = pd.DataFrame()
-        else:
-            df_gastos = pd.DataFrame()
+        results = data_source.fetch_many({'ventaBoletos': ('ventaBoletos',), 'gastos': ('gastos',)})
+        for cols in results.values():
+            if isinstance(cols, Exception):
+                raise cols
+
+        ventas = results['ventaBoletos']
+        df_ventas = ventas_frame(ventas) if ventas is not None else pd.DataFrame()
+
+        gastos = results['gastos']
+        df_gastos = gastos_frame(gastos) if gastos is not None else pd.DataFrame()
 
         return df_ventas, df_gastos
 
@@ -67,134 +169,119 @@ def get_datos():
         print(f"Error al obtener datos: {e}")
         return pd.DataFrame(), pd.DataFrame()
 
+# Serie agregada por período a partir del índice diario (ver rollups.DailyRollup)
+def rollup_frame(rollup, freq, col):
+    import pandas as pd
+    labels, sums, _ = rollup.buckets(freq)
+    return pd.DataFrame({"Fecha": labels.astype('datetime64[ns]'), col: sums})
+
+# Reduce una serie a lo sumo a `max_points` puntos conservando los picos
+def reduce_points(df, col, max_points, method='lttb'):
+    if max_points is None or len(df) <= max_points:
+        return df
+    index = downsample(df.index.asi8, df[col].to_numpy(), max_points, method)
+    return df.iloc[index]
+
+# Serie del gráfico a partir de un DataFrame indexado por fecha
+def frame_series(df, col, label_format):
+    if df.empty:
+        return Series.empty(label_format)
+    return Series(df.index.asi8.view('datetime64[ns]'), df[col], label_format)
+
 # Función para procesar datos para Chart.js
-def process_data_for_chart(df_g, df_x, chart_type, start_date=None, end_date=None):
+def process_data_for_chart(data, chart_type, start_date=None, end_date=None, max_points=None, method='lttb'):
+    import pandas as pd
+    df_g, df_x = data
+    rollup_g = data.rollups['ventaBoletos']
+    rollup_x = data.rollups['gastos']
+
     # Filtrar por fechas si se especifican
     if start_date and end_date:
-        start_date = pd.to_datetime(start_date).date()
-        end_date = pd.to_datetime(end_date).date()
-        
-        if not df_g.empty:
-            df_g = df_g[(df_g.index.date >= start_date) & (df_g.index.date <= end_date)]
-        if not df_x.empty:
-            df_x = df_x[(df_x['Fecha'] >= start_date) & (df_x['Fecha'] <= end_date)]
-    
-    # Procesar según el tipo de gráfico
-    if chart_type == 'daily':
-        if not df_g.empty:
-            df_g = df_g.groupby(df_g.index.date).sum()
-        if not df_x.empty:
-            df_x = df_x.groupby('Fecha').sum()
-    elif chart_type == 'monthly':
-        if not df_g.empty:
-            df_g = df_g.groupby(pd.Grouper(freq='M')).sum()
-            df_g.index = df_g.index.strftime('%Y-%m')
-        if not df_x.empty:
-            df_x = df_x.groupby(pd.Grouper(key='Fecha', freq='M')).sum()
-            df_x.index = df_x.index.strftime('%Y-%m')
+        with stage('filter'):
+            start_date = pd.to_datetime(start_date).date()
+            end_date = pd.to_datetime(end_date).date()
+
+            rollup_g = rollup_g.between(start_date, end_date)
+            rollup_x = rollup_x.between(start_date, end_date)
+            df_g = filter_by_date(df_g, start_date, end_date)
+            df_x = filter_by_date(df_x, start_date, end_date)
     
     # Preparar datos para Chart.js
-    chart_data = {
-        'ganancias': {
-            'labels': [],
-            'data': []
-        },
-        'gastos': {
-            'labels': [],
-            'data': []
-        }
-    }
-    
-    if not df_g.empty:
-        if chart_type == 'monthly':
-            chart_data['ganancias']['labels'] = df_g.index.tolist()
-        else:
-            chart_data['ganancias']['labels'] = [str(date) for date in df_g.index]
-        chart_data['ganancias']['data'] = df_g['Ganancia'].tolist()
+    chart_data = {}
+
+    # Diario y mensual salen del índice de agregados, sin recorrer las filas
+    if chart_type in ('daily', 'monthly'):
+        monthly = chart_type == 'monthly'
+        for key, rollup in (('ganancias', rollup_g), ('gastos', rollup_x)):
+            with stage('aggregate'):
+                labels, sums, _ = rollup.buckets('M' if monthly else 'D', dense=monthly)
+            chart_data[key] = Series(labels, sums, 'month' if monthly else 'date')
+        return chart_data
     
-    if not df_x.empty:
-        if chart_type == 'monthly':
-            chart_data['gastos']['labels'] = df_x.index.tolist()
-        else:
-            chart_data['gastos']['labels'] = [str(date) for date in df_x.index]
-        chart_data['gastos']['data'] = df_x['Gasto'].tolist()
+    # Una venta/gasto por punto: limitar a lo que el gráfico puede mostrar
+    with stage('downsample'):
+        df_g = reduce_points(df_g, 'Ganancia', max_points, method)
+        df_x = reduce_points(df_x, 'Gasto', max_points, method)
+
+    chart_data['ganancias'] = frame_series(df_g, 'Ganancia', 'timestamp')
+    # Los gastos se muestran por día
+    chart_data['gastos'] = frame_series(df_x, 'Gasto', 'date')
     
     return chart_data
 
+# Frecuencia de pandas de cada período: 'M' está en desuso desde pandas 2.2 (fin de mes es 'ME')
+PANDAS_FREQ = {'D': 'D', 'W': 'W', 'M': 'ME'}
+
 # Función para predicciones (similar a la original pero adaptada)
-def make_predictions(df_g, df_x, model_type, prediction_days, prediction_period):
+def make_predictions(data, model_type, prediction_days, prediction_period, start_date=None, end_date=None):
+    import pandas as pd
     try:
-        # Agregar por período
-        df_g_agg = df_g.groupby(pd.Grouper(freq=prediction_period)).sum().reset_index()
-        df_x_agg = df_x.groupby(pd.Grouper(key="Fecha", freq=prediction_period)).sum().reset_index()
-        
-        df_g_agg = df_g_agg.dropna()
-        df_x_agg = df_x_agg.dropna()
-        
-        def modelo_prediccion(df, col, modelo, dias):
-            df = df.reset_index(drop=True)
-            df["Dia"] = np.arange(len(df))
-            X = df["Dia"].values.reshape(-1, 1)
-            y = df[col].values
-            
-            if modelo == "linear":
-                reg = LinearRegression()
-                reg.fit(X, y)
-                X_pred = np.arange(len(df), len(df) + dias).reshape(-1, 1)
-                y_pred = reg.predict(X_pred)
-                r2 = r2_score(y, reg.predict(X))
-                mae = mean_absolute_error(y, reg.predict(X))
-                return y_pred, r2, mae
-            
-            elif modelo.startswith("poly"):
-                grado = int(modelo[-1])
-                poly = PolynomialFeatures(degree=grado)
-                X_poly = poly.fit_transform(X)
-                reg = LinearRegression()
-                reg.fit(X_poly, y)
-                X_pred = np.arange(len(df), len(df) + dias).reshape(-1, 1)
-                X_pred_poly = poly.transform(X_pred)
-                y_pred = reg.predict(X_pred_poly)
-                r2 = r2_score(y, reg.predict(X_poly))
-                mae = mean_absolute_error(y, reg.predict(X_poly))
-                return y_pred, r2, mae
-            
-            elif modelo == "moving_avg":
-                window = min(5, len(y))
-                y_pred = np.full(dias, np.mean(y[-window:]))
-                return y_pred, None, None
+        rollup_g = data.rollups['ventaBoletos']
+        rollup_x = data.rollups['gastos']
+        if start_date and end_date:
+            with stage('filter'):
+                start_date = pd.to_datetime(start_date).date()
+                end_date = pd.to_datetime(end_date).date()
+                rollup_g = rollup_g.between(start_date, end_date)
+                rollup_x = rollup_x.between(start_date, end_date)
+
+        # Agregar por período (desde el índice de agregados diarios)
+        with stage('aggregate'):
+            df_g_agg = rollup_frame(rollup_g, prediction_period, "Ganancia")
+            df_x_agg = rollup_frame(rollup_x, prediction_period, "Gasto")
             
-            else:
-                return np.zeros(dias), None, None
+            df_g_agg = df_g_agg.dropna()
+            df_x_agg = df_x_agg.dropna()
         
-        y_pred_ganancias, r2_g, mae_g = modelo_prediccion(df_g_agg, "Ganancia", model_type, prediction_days)
-        y_pred_gastos, r2_x, mae_x = modelo_prediccion(df_x_agg, "Gasto", model_type, prediction_days)
+        # Tendencias y promedios móviles salen de los estadísticos que el índice
+        # actualiza con cada período nuevo, también los del rango de fechas
+        # (ver forecasting.TrendState y DailyRollup.between); el resto de los
+        # modelos se ajusta con ganancias y gastos en una sola llamada
+        with stage('fit'):
+            ys = [df_g_agg["Ganancia"].to_numpy(), df_x_agg["Gasto"].to_numpy()]
+            if model_type in STATE_MODELS:
+                results = [
+                    rollup.trend(prediction_period).forecast(model_type, prediction_days, y)
+                    for rollup, y in ((rollup_g, ys[0]), (rollup_x, ys[1]))
+                ]
+            else:
+                results = forecast_many(ys, model_type, prediction_days)
+            (y_pred_ganancias, r2_g, mae_g), (y_pred_gastos, r2_x, mae_x) = results
         
         # Crear fechas de predicción
         last_date = df_g_agg["Fecha"].max() if not df_g_agg.empty else datetime.now()
-        fechas_pred = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=prediction_days, freq=prediction_period)
+        fechas_pred = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=prediction_days,
+                                    freq=PANDAS_FREQ[prediction_period])
         
         # Preparar datos para el gráfico
         prediction_data = {
             'ganancias': {
-                'real': {
-                    'labels': df_g_agg["Fecha"].dt.strftime('%Y-%m-%d').tolist(),
-                    'data': df_g_agg["Ganancia"].tolist()
-                },
-                'predicted': {
-                    'labels': fechas_pred.strftime('%Y-%m-%d').tolist(),
-                    'data': y_pred_ganancias.tolist()
-                }
+                'real': Series(df_g_agg["Fecha"], df_g_agg["Ganancia"]),
+                'predicted': Series(fechas_pred, y_pred_ganancias),
             },
             'gastos': {
-                'real': {
-                    'labels': df_x_agg["Fecha"].dt.strftime('%Y-%m-%d').tolist(),
-                    'data': df_x_agg["Gasto"].tolist()
-                },
-                'predicted': {
-                    'labels': fechas_pred.strftime('%Y-%m-%d').tolist(),
-                    'data': y_pred_gastos.tolist()
-                }
+                'real': Series(df_x_agg["Fecha"], df_x_agg["Gasto"]),
+                'predicted': Series(fechas_pred, y_pred_gastos),
             },
             'metrics': {
                 'ganancias': {
@@ -214,32 +301,599 @@ def make_predictions(df_g, df_x, model_type, prediction_days, prediction_period)
         print(f"Error en predicción: {e}")
         return None
 
+# Descripciones de gastos con mayor monto por período, desde el índice por
+# día y descripción (ver rollups.CategoryRollup), sin agrupar las filas
+def make_breakdown(data, period, top, start_date=None, end_date=None, contains=None):
+    import pandas as pd
+    breakdown = data.breakdowns.get('gastos') or CategoryRollup()
+    if start_date and end_date:
+        start_date = pd.to_datetime(start_date).date()
+        end_date = pd.to_datetime(end_date).date()
+    else:
+        start_date = end_date = None
+
+    with stage('aggregate'):
+        result = breakdown.top(period, top, start_date, end_date, contains)
+    label_format = 'month' if period == 'M' else 'date'
+    total = Series(result['labels'], result['sums'], label_format)
+    names = breakdown.categories
+    bounds = np.searchsorted(result['period'], np.arange(len(total) + 1))
+    buckets = []
+    for i, label in enumerate(total.text_labels()):
+        rows = slice(bounds[i], bounds[i + 1])
+        categories = [
+            {'descripcion': names[code], 'total': value, 'count': count}
+            for code, value, count in zip(
+                result['codes'][rows].tolist(), result['top_sums'][rows].tolist(), result['top_counts'][rows].tolist())
+        ]
+        buckets.append({
+            'label': label,
+            'total': float(result['sums'][i]),
+            'count': int(result['counts'][i]),
+            'categories': categories,
+            'other': float(result['sums'][i] - result['top_sums'][rows].sum()),
+        })
+    return {'period': period, 'top': top, 'total': total, 'buckets': buckets}
+
+# Pool de procesos para /get_backtest, creado al primer uso
+backtest_pool = None
+backtest_pool_lock = threading.Lock()
+
+def backtest_executor():
+    global backtest_pool
+    if BACKTEST_WORKERS <= 0:
+        return None
+    with backtest_pool_lock:
+        if backtest_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            backtest_pool = ProcessPoolExecutor(max_workers=BACKTEST_WORKERS)
+            atexit.register(backtest_pool.shutdown, cancel_futures=True)
+        return backtest_pool
+
+# Validación cruzada con origen móvil de cada modelo × período
+def make_backtest(data, models, periods, horizon, folds, start_date=None, end_date=None):
+    import pandas as pd
+    rollups = {'ganancias': data.rollups['ventaBoletos'], 'gastos': data.rollups['gastos']}
+    if start_date and end_date:
+        start_date = pd.to_datetime(start_date).date()
+        end_date = pd.to_datetime(end_date).date()
+        rollups = {name: rollup.between(start_date, end_date) for name, rollup in rollups.items()}
+
+    series = {
+        (period, name): rollup.buckets(period)[1]
+        for period in periods
+        for name, rollup in rollups.items()
+    }
+    with stage('fit'):
+        results = run_backtest(series, models, horizon, folds, executor=backtest_executor())
+
+    backtest = {'horizon': horizon, 'folds': folds, 'periods': {}}
+    for (period, name), result in results.items():
+        backtest['periods'].setdefault(period, {})[name] = result
+    return backtest
+
+# Sincronización incremental: solo se descargan/procesan las filas nuevas
+data_sync = DataSync(
+    data_source.fetch,
+    {'ventaBoletos': ventas_frame, 'gastos': gastos_frame},
+    use_filter=data_source.supports_filter,
+    full_resync_every=SYNC_FULL_EVERY,
+    fetch_many=data_source.fetch_many,
+)
+
+# Con SHARED_DATA=1 los procesos (p. ej. workers de gunicorn) comparten la
+# instantánea: uno solo sincroniza y el resto la mapea (ver shared.py)
+shared_dataset = None
+if SHARED_DATA and SNAPSHOT_DIR:
+    shared_dataset = SharedDataset(data_sync, SNAPSHOT_DIR, interval=DATA_CACHE_TTL)
+
+# Caché de los datos ya procesados (una consulta al upstream por ventana de TTL)
+dataset_cache = DatasetCache(shared_dataset.load if shared_dataset else data_sync.sync, ttl=DATA_CACHE_TTL, max_bytes=int(DATA_CACHE_MAX_MB * 1024 * 1024))
+
+# Pronósticos ya calculados; se vacía cuando llegan filas nuevas
+forecast_cache = ForecastCache(max_entries=FORECAST_CACHE_SIZE)
+data_sync.add_listener(lambda ds: forecast_cache.clear())
+
+# Contadores que ya llevan la sincronización y las cachés
+metrics.registry.gauge('dataset_version', 'Versión de los datos vigentes', lambda: data_sync.version)
+def cache_events():
+    events = {}
+    for cache, stats, names in (('dataset', dataset_cache.stats(), ('hits', 'misses', 'stale_hits', 'loads')),
+                                ('forecast', forecast_cache.stats(), ('hits', 'misses', 'coalesced', 'evictions'))):
+        events.update({(cache, name): stats[name] for name in names})
+    return events
+
+metrics.registry.gauge('cache_events_total', 'Eventos de las cachés de datos y pronósticos',
+                       cache_events, ('cache', 'event'), kind='counter')
+
+def cached_predictions(data, model_type, prediction_days, prediction_period, start_date=None, end_date=None):
+    key = (data.version, model_type, prediction_days, prediction_period, start_date, end_date)
+    return forecast_cache.get_or_compute(
+        key,
+        lambda: make_predictions(data, model_type, prediction_days, prediction_period, start_date, end_date),
+    )
+
+# Utilidad neta (ganancias − gastos) por período, con ambas series sobre los
+# mismos períodos: los que faltan en una de ellas cuentan como 0
+def net_profit(data, period, start_date=None, end_date=None, predictions=None):
+    import pandas as pd
+    rollup_g = data.rollups['ventaBoletos']
+    rollup_x = data.rollups['gastos']
+    if start_date and end_date:
+        start_date = pd.to_datetime(start_date).date()
+        end_date = pd.to_datetime(end_date).date()
+        rollup_g = rollup_g.between(start_date, end_date)
+        rollup_x = rollup_x.between(start_date, end_date)
+
+    with stage('aggregate'):
+        labels_g, sums_g, _ = rollup_g.buckets(period)
+        labels_x, sums_x, _ = rollup_x.buckets(period)
+        labels = np.union1d(labels_g, labels_x)
+        net = np.zeros(len(labels))
+        net[np.searchsorted(labels, labels_g)] += sums_g
+        net[np.searchsorted(labels, labels_x)] -= sums_x
+    result = {'real': Series(labels, net)}
+    if predictions is not None:
+        ganancias, gastos = predictions['ganancias']['predicted'], predictions['gastos']['predicted']
+        result['predicted'] = Series(ganancias.labels, ganancias.values - gastos.values)
+    return result
+
+# Todo lo que muestra el dashboard (gráficos, pronósticos y utilidad neta) a
+# partir de la misma versión de los datos
+def make_dashboard(data, chart_type, start_date, end_date, max_points, method,
+                   model_type, prediction_days, prediction_period):
+    predictions = cached_predictions(data, model_type, prediction_days, prediction_period, start_date, end_date)
+    return {
+        'chart': process_data_for_chart(data, chart_type, start_date, end_date, max_points, method),
+        'predictions': predictions,
+        'net': net_profit(data, prediction_period, start_date, end_date, predictions),
+    }
+
+# Tareas de precálculo: agregados por período y la grilla de pronósticos por
+# defecto, tanto para todo el historial como para el rango inicial del
+# dashboard (último mes)
+def precompute_tasks(data):
+    import pandas as pd
+    tasks = [
+        lambda rollup=rollup, period=period: rollup.buckets(period)
+        for rollup in data.rollups.values()
+        for period in PRECOMPUTE_PERIODS
+    ]
+    today = pd.Timestamp.today().normalize()
+    ranges = [(None, None), ((today - pd.DateOffset(months=1)).strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d'))]
+    for start_date, end_date in ranges:
+        # Un rango sin filas solo produciría errores en cada sincronización
+        if start_date and not any(len(r.between(start_date, end_date)) for r in data.rollups.values()):
+            continue
+        for model_type in PRECOMPUTE_MODELS:
+            for period in PRECOMPUTE_PERIODS:
+                for horizon in PRECOMPUTE_HORIZONS:
+                    tasks.append(lambda args=(model_type, horizon, period, start_date, end_date):
+                                 cached_predictions(data, *args))
+    return tasks
+
+# Con el turno de recarga de la caché, como `preload`: si una petición ya está
+# cargando, esta vuelta se salta en lugar de consultar el upstream otra vez
+def background_refresh():
+    if not dataset_cache.begin_load():
+        return
+    value = None
+    try:
+        value = dataset_cache.loader()
+    finally:
+        dataset_cache.end_load(value)
+
+precomputer = None
+if PRECOMPUTE:
+    precomputer = Precomputer(
+        precompute_tasks,
+        max_workers=PRECOMPUTE_WORKERS,
+        refresh=background_refresh,
+        interval=BACKGROUND_SYNC_INTERVAL,
+    )
+    data_sync.add_listener(lambda ds: precomputer.schedule(ds.dataset()))
+    atexit.register(precomputer.shutdown)
+
+# La instantánea se reescribe tras cada sincronización con cambios y se usa
+# al arrancar, así un proceso nuevo tiene el historial sin ir a la red. Se
+# carga en segundo plano: el proceso ya atiende `/` mientras tanto, y las
+# peticiones de datos esperan a que termine en lugar de ir al upstream.
+def warm_start():
+    if shared_dataset is not None:
+        data = shared_dataset.start().current()
+        if precomputer is not None and shared_dataset.is_leader:
+            precomputer.schedule(data_sync.dataset())
+        return data
+    if not data_sync.load_snapshot(SNAPSHOT_DIR):
+        return None
+    if precomputer is not None:
+        precomputer.schedule(data_sync.dataset())
+    return data_sync.dataset()
+
+if SNAPSHOT_DIR:
+    data_sync.add_listener(lambda ds: ds.save_snapshot(SNAPSHOT_DIR))
+    if shared_dataset is not None:
+        atexit.register(shared_dataset.close)
+    dataset_cache.preload(warm_start)
+
+if precomputer is not None:
+    precomputer.start()
+
+# Clientes de /stream: reciben las filas nuevas de cada sincronización. asgi.py sube el
+# tope a STREAM_MAX_CLIENTS, porque ahí las conexiones no ocupan hilos.
+event_broker = EventBroker(max_events=STREAM_QUEUE, max_clients=STREAM_WSGI_CLIENTS, heartbeat=STREAM_HEARTBEAT)
+atexit.register(event_broker.close)
+
+# Cambios de una sincronización para los gráficos ya cargados: por serie, las
+# filas nuevas y el total (completo, no solo lo agregado) de cada día que
+# tocaron. Todo cuesta O(filas nuevas); los meses los suma el navegador.
+def changes_payload(ds):
+    data = ds.dataset()
+    payload = {'version': ds.version}
+    for key, field, label_format in (('ganancias', 'ventaBoletos', 'timestamp'), ('gastos', 'gastos', 'date')):
+        if field not in ds.changes:
+            continue
+        cols = ds.changes[field]
+        if cols is None:
+            return None  # la serie se reemplazó entera
+        if not len(cols):
+            continue
+        cols = cols.sorted()
+        rollup = data.rollups[field]
+        days = np.unique(cols.ts // DAY_NS)
+        payload[key] = {
+            'rows': Series(cols.ts.view('datetime64[ns]'), cols.amount, label_format),
+            'days': Series(EPOCH_DAY + days, rollup.sums[np.searchsorted(rollup.days, days)], 'date'),
+        }
+    return to_columnar(payload)
+
+def publish_changes(ds):
+    if not event_broker.has_subscribers():
+        return
+    payload = changes_payload(ds)
+    if payload is None:
+        event_broker.publish('resync', {'version': ds.version}, ds.version)
+    else:
+        event_broker.publish('delta', payload, ds.version)
+
+data_sync.add_listener(publish_changes)
+
+# Sincronización para /stream: se arranca con el primer cliente y solo consulta el
+# upstream mientras haya alguno conectado. Con PRECOMPUTE y BACKGROUND_SYNC_INTERVAL
+# ya hay una sincronización periódica y no hace falta otra.
+stream_sync_stop = threading.Event()
+stream_sync_thread = None
+stream_sync_lock = threading.Lock()
+atexit.register(stream_sync_stop.set)
+
+def stream_sync_loop():
+    while not stream_sync_stop.wait(STREAM_SYNC_INTERVAL):
+        if not event_broker.has_subscribers():
+            continue
+        try:
+            background_refresh()
+        except Exception as e:
+            print(f"Error en la sincronización de /stream: {e}")
+
+def ensure_stream_sync():
+    global stream_sync_thread
+    if STREAM_SYNC_INTERVAL <= 0 or (precomputer is not None and BACKGROUND_SYNC_INTERVAL > 0):
+        return
+    with stream_sync_lock:
+        if stream_sync_thread is None:
+            stream_sync_thread = threading.Thread(target=stream_sync_loop, name='stream-sync', daemon=True)
+            stream_sync_thread.start()
+# Los seguidores no sincronizan: solo avisan que hay otra versión para recargar
+if shared_dataset is not None:
+    shared_dataset.add_listener(lambda data: event_broker.publish('version', {'version': data.version}, data.version))
+
+@app.cli.command('import-snapshot')
+@click.option('--ventas', 'ventas_file', default=os.path.join(DATA_DIR, 'pasar a luisiño'), show_default=True)
+@click.option('--gastos', 'gastos_file', default=os.path.join(DATA_DIR, 'gastos'), show_default=True)
+def import_snapshot(ventas_file, gastos_file):
+    """Convierte los volcados JSON de data/ en la instantánea columnar."""
+    if not SNAPSHOT_DIR:
+        raise click.ClickException('SNAPSHOT_DIR está vacío')
+    dumps = FileSource({'ventaBoletos': ventas_file, 'gastos': gastos_file})
+    series = dumps.fetch_many({'ventaBoletos': ('ventaBoletos',), 'gastos': ('gastos',)})
+    if any(cols is None for cols in series.values()):
+        raise click.ClickException('no se pudieron leer los volcados')
+    ventas, gastos = series['ventaBoletos'], series['gastos']
+    data_sync.load_columns(series)
+    click.echo(f'{len(ventas)} ventas y {len(gastos)} gastos guardados en {SNAPSHOT_DIR}')
+
+@app.cli.command('sync-loop')
+def sync_loop():
+    """Hace de líder con SHARED_DATA=1: sincroniza y los workers solo leen la instantánea."""
+    if shared_dataset is None:
+        raise click.ClickException('requiere SHARED_DATA=1 y SNAPSHOT_DIR')
+    click.echo(f'sincronizando cada {shared_dataset.interval:g} s en {SNAPSHOT_DIR}')
+    leader = None
+    while True:
+        if shared_dataset.is_leader != leader:
+            leader = shared_dataset.is_leader
+            click.echo('líder' if leader else 'esperando al líder actual')
+        time.sleep(shared_dataset.poll)
+
 # Rutas
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', stream_enabled=event_broker.max_clients > 0)
+
+# Respuesta en el formato pedido (`format=` o `Accept`; JSON por defecto)
+def encoded_response(payload, fmt):
+    with stage('serialize'):
+        body, mimetype = encode(payload, fmt)
+        if fmt == 'binary':
+            response = Response(body, mimetype=mimetype)
+        else:
+            response = jsonify(body)
+            response.mimetype = mimetype
+    response.vary.add('Accept')
+    return response
+
+# ETag y Last-Modified: la respuesta solo cambia con los datos o con los parámetros
+def cache_validators(data, fmt):
+    key = json.dumps([request.path, data.version, data.updated_at, fmt, sorted(request.args.items(multi=True))])
+    etag = hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]
+    last_modified = datetime.fromtimestamp(int(data.updated_at), timezone.utc) if data.updated_at else None
+    return etag, last_modified
+
+def not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    return bool(last_modified and request.if_modified_since and request.if_modified_since >= last_modified)
+
+def with_validators(response, etag, last_modified):
+    # Débil: el mismo contenido comprimido o no comparte el ETag
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    # El navegador guarda la respuesta pero la revalida siempre
+    response.cache_control.no_cache = True
+    response.vary.add('Accept')
+    return response
+
+def conditional_response(data, fmt, build):
+    """304 sin calcular nada si el cliente ya tiene esta versión; si no, `build()`."""
+    etag, last_modified = cache_validators(data, fmt)
+    if not_modified(etag, last_modified):
+        response = Response(status=304)
+    else:
+        response = encoded_response(build(), fmt)
+    # Con esta versión el cliente sabe qué eventos de /stream ya tiene
+    response.headers['X-Data-Version'] = str(data.version)
+    return with_validators(response, etag, last_modified)
+
+def response_format():
+    return negotiate(request.args.get('format'), request.accept_mimetypes)
+
+# A diferencia de `request.args.get(..., type=int)`, un valor no numérico da None y no el valor por defecto
+def int_arg(name, default):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+def format_error():
+    return jsonify({'error': f'format debe ser uno de {sorted(FORMATS)}'}), 400
+
+# `downsample` y `max_points` de /get_data y /get_dashboard: la respuesta de error, o None
+def downsample_error(method, max_points):
+    if method not in DOWNSAMPLE_METHODS:
+        return jsonify({'error': f'downsample debe ser uno de {sorted(DOWNSAMPLE_METHODS)}'}), 400
+    if max_points is not None and max_points < MIN_POINTS:
+        return jsonify({'error': f'max_points debe ser al menos {MIN_POINTS}'}), 400
+    return None
+
+# Parámetros de pronóstico de /get_predictions y /get_dashboard: la respuesta de error, o None
+def prediction_error(model_type, prediction_days, prediction_period):
+    if model_type not in MODELS:
+        return jsonify({'error': f'model_type debe ser uno de {list(MODELS)}'}), 400
+    if prediction_days is None or prediction_days < 1:
+        return jsonify({'error': 'prediction_days debe ser un entero positivo'}), 400
+    if prediction_period not in ('D', 'W', 'M'):
+        return jsonify({'error': 'prediction_period debe ser D, W o M'}), 400
+    return None
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    if SERVER_TIMING:
+        metrics.start_timing()
+
+# Se registra antes que la compresión para que su tiempo quede incluido
+@app.after_request
+def record_request(response):
+    if not metrics.enabled:
+        return response
+    elapsed = time.perf_counter() - g.request_start
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    http_requests.inc(route, request.method, str(response.status_code))
+    # La etiqueta sale de la URL: solo modelos conocidos, para no crear una serie por valor inventado
+    model_type = request.args.get('model_type', '')
+    http_latency.observe(elapsed, route, model_type if model_type in MODELS or not model_type else 'other')
+    timings = metrics.stop_timing()
+    if timings is not None:
+        response.headers['Server-Timing'] = metrics.server_timing(timings, elapsed)
+    return response
+
+@app.after_request
+def compress_response(response):
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE):
+        return response
+    encoding = choose_encoding(request.accept_encodings)
+    body = response.get_data()
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return response
+    with stage('compress'):
+        response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
 
 @app.route('/get_data', methods=['GET'])
 def get_data():
     chart_type = request.args.get('chart_type', 'separate')
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
+    max_points = request.args.get('max_points', type=int)
+    method = request.args.get('downsample', 'lttb')
+    error = downsample_error(method, max_points)
+    if error is not None:
+        return error
+    fmt = response_format()
+    if fmt is None:
+        return format_error()
     
-    df_g, df_x = get_datos()
-    chart_data = process_data_for_chart(df_g, df_x, chart_type, start_date, end_date)
-    
-    return jsonify(chart_data)
+    data = dataset_cache.get()
+    return conditional_response(
+        data, fmt,
+        lambda: process_data_for_chart(data, chart_type, start_date, end_date, max_points, method),
+    )
 
 @app.route('/get_predictions', methods=['GET'])
 def get_predictions():
     model_type = request.args.get('model_type', 'linear')
-    prediction_days = int(request.args.get('prediction_days', 30))
+    prediction_days = int_arg('prediction_days', 30)
     prediction_period = request.args.get('prediction_period', 'D')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    error = prediction_error(model_type, prediction_days, prediction_period)
+    if error is not None:
+        return error
+    fmt = response_format()
+    if fmt is None:
+        return format_error()
     
-    df_g, df_x = get_datos()
-    prediction_data = make_predictions(df_g, df_x, model_type, prediction_days, prediction_period)
-    
-    return jsonify(prediction_data)
+    data = dataset_cache.get()
+    return conditional_response(
+        data, fmt,
+        lambda: cached_predictions(data, model_type, prediction_days, prediction_period, start_date, end_date),
+    )
+
+# Gráficos, pronósticos y utilidad neta en una sola petición (y una sola
+# lectura de los datos), con los parámetros de /get_data y /get_predictions
+@app.route('/get_dashboard', methods=['GET'])
+def get_dashboard():
+    chart_type = request.args.get('chart_type', 'separate')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    max_points = request.args.get('max_points', type=int)
+    method = request.args.get('downsample', 'lttb')
+    model_type = request.args.get('model_type', 'linear')
+    prediction_days = int_arg('prediction_days', 30)
+    prediction_period = request.args.get('prediction_period', 'D')
+    error = downsample_error(method, max_points) or prediction_error(model_type, prediction_days, prediction_period)
+    if error is not None:
+        return error
+    fmt = response_format()
+    if fmt is None:
+        return format_error()
+
+    data = dataset_cache.get()
+    return conditional_response(
+        data, fmt,
+        lambda: make_dashboard(data, chart_type, start_date, end_date, max_points, method,
+                               model_type, prediction_days, prediction_period),
+    )
+
+@app.route('/get_backtest', methods=['GET'])
+def get_backtest():
+    models = request.args.get('models', ','.join(MODELS)).split(',')
+    periods = request.args.get('periods', 'D,W,M').split(',')
+    horizon = request.args.get('horizon', 7, type=int)
+    folds = request.args.get('folds', 10, type=int)
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    if not set(models) <= set(MODELS):
+        return jsonify({'error': f'models debe estar entre {list(MODELS)}'}), 400
+    if not set(periods) <= {'D', 'W', 'M'}:
+        return jsonify({'error': 'periods debe estar entre D, W y M'}), 400
+    if horizon < 1 or folds < 1:
+        return jsonify({'error': 'horizon y folds deben ser positivos'}), 400
+
+    data = dataset_cache.get()
+    key = ('backtest', data.version, tuple(models), tuple(periods), horizon, folds, start_date, end_date)
+    backtest = forecast_cache.get_or_compute(
+        key,
+        lambda: make_backtest(data, models, periods, horizon, folds, start_date, end_date),
+    )
+    return jsonify(backtest)
+
+@app.route('/get_breakdown', methods=['GET'])
+def get_breakdown():
+    period = request.args.get('period', 'M')
+    top = request.args.get('top', 10, type=int)
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    contains = request.args.get('q')
+    if period not in ('D', 'W', 'M'):
+        return jsonify({'error': 'period debe ser D, W o M'}), 400
+    if not 1 <= top <= 100:
+        return jsonify({'error': 'top debe estar entre 1 y 100'}), 400
+    fmt = response_format()
+    if fmt is None:
+        return format_error()
+
+    data = dataset_cache.get()
+    return conditional_response(
+        data, fmt,
+        lambda: make_breakdown(data, period, top, start_date, end_date, contains),
+    )
+
+@app.route('/refresh_data', methods=['POST'])
+def refresh_data():
+    if shared_dataset is not None:
+        shared_dataset.request_refresh(full=bool(request.args.get('full')))
+    elif request.args.get('full'):
+        data_sync.reset()
+    dataset_cache.invalidate()
+    return jsonify({'status': 'ok'})
+
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+STREAM_FULL = {'error': 'demasiados clientes conectados'}
+STREAM_DISABLED = {'error': '/stream está desactivado (ver STREAM_WSGI_CLIENTS)'}
+
+# Primer evento de /stream: la versión vigente, para que el cliente sepa si recargar
+def stream_greeting():
+    data = shared_dataset.current() if shared_dataset is not None else data_sync.dataset()
+    return [format_event('version', {'version': data.version}, data.version)]
+
+@app.route('/stream', methods=['GET'])
+def stream():
+    """Server-Sent Events: `version` al conectar y luego `delta`, `resync` o `version` por cambio."""
+    subscriber = event_broker.subscribe()
+    if subscriber is None:
+        return jsonify(STREAM_FULL if event_broker.max_clients else STREAM_DISABLED), 503
+    ensure_stream_sync()
+    response = Response(event_broker.stream(subscriber, stream_greeting()), mimetype='text/event-stream')
+    response.headers.update(STREAM_HEADERS)
+    return response
+
+@app.route('/precompute_status', methods=['GET'])
+def precompute_status():
+    if precomputer is None:
+        return jsonify({'enabled': False})
+    return jsonify(precomputer.status())
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.registry.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    stats = dataset_cache.stats()
+    stats['sync'] = data_sync.stats()
+    stats['forecasts'] = forecast_cache.stats()
+    if shared_dataset is not None:
+        stats['shared'] = shared_dataset.stats()
+    stats['stream'] = event_broker.stats()
+    return jsonify(stats)
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""Modo ASGI opcional (requiere `starlette`, `httpx`, `a2wsgi` y un servidor como `uvicorn`):
+
+    uvicorn asgi:app --port 5000
+
+Las rutas son las de `app.py`, servidas tal cual (validadores, compresión,
+métricas) a través de un puente WSGI con `ASGI_THREADS` hilos. Lo que cambia
+es cómo se espera:
+
+- Antes de pasar una petición `/get_*` a Flask se asegura que haya datos
+  vigentes. Con el API GraphQL la sincronización consulta el upstream con
+  httpx desde el event loop (`sources.AsyncGraphQLSource`), así que las
+  peticiones que esperan datos no ocupan hilos; el parseo, los agregados y
+  los ajustes corren en hilos.
+- `/stream` es nativo: cada dashboard conectado es una corrutina y no un
+  hilo del puente.
+
+Así un solo proceso mantiene cientos de peticiones en curso con un puñado de
+hilos (`python test/benchmarks.py serving` compara ambos modos).
+"""
+import asyncio
+import contextlib
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as flask_app
+from fetcher import AsyncGraphQLClient
+from sources import AsyncGraphQLSource, GraphQLSource
+
+# Hilos del puente WSGI (peticiones de Flask atendiéndose a la vez)
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 10))
+# Conexiones simultáneas al upstream
+ASGI_UPSTREAM_POOL = int(os.environ.get('ASGI_UPSTREAM_POOL', 100))
+
+# Sincronización y parseo de las respuestas. Hay a lo sumo una carga a la
+# vez: un hilo que sincroniza y uno por serie que parsea.
+executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='asgi-load')
+
+async_client = None
+load_source = None
+if isinstance(flask_app.data_source, GraphQLSource) and flask_app.shared_dataset is None:
+    async_client = AsyncGraphQLClient(
+        flask_app.GRAPHQL_URL,
+        timeout=(flask_app.GRAPHQL_CONNECT_TIMEOUT, flask_app.GRAPHQL_READ_TIMEOUT),
+        retries=flask_app.GRAPHQL_RETRIES,
+        pool_size=ASGI_UPSTREAM_POOL,
+    )
+    load_source = AsyncGraphQLSource(
+        flask_app.graphql_client, async_client, flask_app.QUERY_FIELDS, flask_app.GRAPHQL_DELTA_ARG, executor)
+
+
+class DataLoader:
+    """Mantiene al día la caché de datos de la app sin bloquear el event loop.
+
+    Como `DatasetCache.get`, carga una sola vez por vencimiento del TTL y,
+    si hay una copia vencida, la deja servir mientras tanto; solo se espera
+    cuando todavía no hay datos.
+    """
+
+    def __init__(self, cache, source=None):
+        self.cache = cache
+        self.source = source
+        self._task = None
+
+    async def ensure(self):
+        value, fresh = self.cache.peek()
+        if fresh:
+            return
+        if self._task is None:
+            if not self.cache.begin_load():
+                # Carga otro hilo (p. ej. la instantánea al arrancar)
+                while value is None and self.cache.loading:
+                    await asyncio.sleep(0.05)
+                return
+            self._task = asyncio.create_task(self._load())
+        if value is None:
+            await asyncio.shield(self._task)
+
+    async def _load(self):
+        loop = asyncio.get_running_loop()
+        value = None
+        try:
+            if self.source is None:
+                value = await loop.run_in_executor(executor, self.cache.loader)
+            else:
+                def fetch_many(args_by_field):
+                    # Corre en el hilo de la sincronización; la consulta, en el event loop
+                    future = asyncio.run_coroutine_threadsafe(self.source.fetch_many_async(args_by_field), loop)
+                    return future.result()
+                sync = functools.partial(flask_app.data_sync.sync, fetch_many=fetch_many)
+                value = await loop.run_in_executor(executor, sync)
+        except Exception as e:
+            print(f"Error al cargar los datos: {e}")
+        finally:
+            self.cache.end_load(value)
+            self._task = None
+
+
+loader = DataLoader(flask_app.dataset_cache, load_source)
+# Aquí cada conexión de /stream es una corrutina, no un hilo del puente
+flask_app.event_broker.max_clients = flask_app.STREAM_MAX_CLIENTS
+wsgi = WSGIMiddleware(flask_app.app, workers=ASGI_THREADS)
+
+
+async def flask_routes(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'].startswith('/get_'):
+        await loader.ensure()
+    await wsgi(scope, receive, send)
+
+
+async def stream(request):
+    broker = flask_app.event_broker
+    subscriber = broker.subscribe()
+    if subscriber is None:
+        return JSONResponse(flask_app.STREAM_FULL, status_code=503)
+    flask_app.ensure_stream_sync()
+    greeting = await asyncio.get_running_loop().run_in_executor(executor, flask_app.stream_greeting)
+    return StreamingResponse(broker.astream(subscriber, greeting), media_type='text/event-stream',
+                             headers=flask_app.STREAM_HEADERS)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_):
+    yield
+    if async_client is not None:
+        await async_client.aclose()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = Starlette(
+    routes=[Route('/stream', stream), Mount('', app=flask_routes)],
+    lifespan=lifespan,
+)
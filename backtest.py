@@ -0,0 +1,72 @@
+"""Validación cruzada con origen móvil (rolling origin) de los modelos de pronóstico.
+
+Para cada origen `t` se ajusta el modelo con `y[:t]` y se compara el
+pronóstico de `horizon` períodos con `y[t:t + horizon]`. Los errores de todos
+los orígenes se agregan en MAE y RMSE fuera de muestra, que a diferencia del
+R²/MAE dentro de la muestra no premian sobreajustar (p. ej. poly3).
+
+Cada combinación serie × período × modelo es un trabajo independiente, de
+modo que `run_backtest` puede repartirlos en un `ProcessPoolExecutor`.
+"""
+import numpy as np
+
+from forecasting import forecast_many
+
+MIN_TRAIN = 5
+
+
+def rolling_origins(n, horizon, folds, step=1, min_train=MIN_TRAIN):
+    """Los últimos `folds` orígenes (separados `step` períodos) con `horizon` valores para evaluar."""
+    last = n - horizon
+    first = max(min_train, last - (folds - 1) * step)
+    if last < first:
+        return []
+    return list(range(last, first - 1, -step))[::-1]
+
+
+def backtest_series(y, model, horizon, folds, step=1):
+    """MAE y RMSE fuera de muestra de `model` sobre la serie `y`."""
+    y = np.asarray(y, dtype='float64')
+    origins = rolling_origins(len(y), horizon, folds, step)
+    if not origins:
+        return {'mae': None, 'rmse': None, 'folds': 0}
+
+    # Los ajustes por tendencia de todos los orígenes van en una sola llamada
+    predictions = forecast_many([y[:t] for t in origins], model, horizon)
+    errors = np.concatenate([pred - y[t:t + horizon] for t, (pred, _, _) in zip(origins, predictions)])
+    return {
+        'mae': float(np.mean(np.abs(errors))),
+        'rmse': float(np.sqrt(np.mean(errors ** 2))),
+        'folds': len(origins),
+    }
+
+
+def _job(key, y, model, horizon, folds, step):
+    return key, model, backtest_series(y, model, horizon, folds, step)
+
+
+def best_model(scores):
+    """El modelo con menor MAE (y RMSE para desempatar), o None si ninguno se pudo evaluar."""
+    ranked = [(s['mae'], s['rmse'], model) for model, s in scores.items() if s['mae'] is not None]
+    return min(ranked)[2] if ranked else None
+
+
+def run_backtest(series, models, horizon, folds, step=1, executor=None):
+    """Evalúa cada modelo sobre cada serie de `series` ({clave: arreglo}).
+
+    Devuelve {clave: {'models': {modelo: métricas}, 'best': modelo}}. Con
+    `executor` los trabajos se reparten entre sus procesos; sin él se
+    ejecutan en el proceso actual.
+    """
+    jobs = [(key, y, model, horizon, folds, step) for key, y in series.items() for model in models]
+    if executor is None:
+        outcomes = [_job(*job) for job in jobs]
+    else:
+        outcomes = [f.result() for f in [executor.submit(_job, *job) for job in jobs]]
+
+    results = {key: {'models': {}} for key in series}
+    for key, model, scores in outcomes:
+        results[key]['models'][model] = scores
+    for entry in results.values():
+        entry['best'] = best_model(entry['models'])
+    return results
@@ -0,0 +1,267 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def frame_nbytes(frames):
+    """Memoria aproximada (en bytes) ocupada por una tupla de DataFrames."""
+    total = 0
+    for df in frames:
+        if df is not None and not df.empty:
+            total += int(df.memory_usage(index=True, deep=True).sum())
+    return total
+
+
+class DatasetCache:
+    """Caché en proceso de los DataFrames de ventas y gastos.
+
+    Guarda el último resultado de `loader` durante `ttl` segundos. Cuando el
+    TTL vence, un solo hilo vuelve a cargar los datos (revalidación) mientras
+    el resto sigue sirviendo la copia anterior, de modo que el upstream se
+    consulta una única vez por ventana de TTL.
+
+    La caché no acota la memoria: guarda el mismo objeto que ya retiene la
+    sincronización, así que descartarlo no liberaría nada y solo haría
+    consultar el upstream en cada petición. `max_bytes` es un umbral de
+    aviso: la primera vez que una versión de los datos (`value.version`) lo
+    supera se avisa en el log y se cuenta en `oversized`.
+    """
+
+    def __init__(self, loader, ttl=60.0, max_bytes=None, clock=time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._value = None
+        self._loaded_at = None
+        self._nbytes = 0
+        self._oversized_version = None
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.loads = 0
+        self.oversized = 0
+        self.invalidations = 0
+
+    def _fresh(self, now):
+        return self._value is not None and now - self._loaded_at < self.ttl
+
+    def get(self):
+        with self._lock:
+            if self._fresh(self.clock()):
+                self.hits += 1
+                return self._value
+            stale = self._value
+
+        # Si otro hilo ya está recargando y tenemos una copia, servirla
+        if stale is not None and not self._refresh_lock.acquire(blocking=False):
+            with self._lock:
+                self.stale_hits += 1
+            return stale
+        if stale is None:
+            self._refresh_lock.acquire()
+
+        try:
+            # Otro hilo pudo haber recargado mientras esperábamos el lock
+            with self._lock:
+                if self._fresh(self.clock()):
+                    self.hits += 1
+                    return self._value
+                self.misses += 1
+            return self._load()
+        finally:
+            self._refresh_lock.release()
+
+    def _load(self):
+        value = self.loader()
+        self.loads += 1
+        return self.put(value)
+
+    def put(self, value):
+        """Guarda `value` como copia vigente (p. ej. datos leídos de disco al arrancar)."""
+        # No retener resultados vacíos (upstream caído)
+        if all(df.empty for df in value):
+            return value
+        nbytes = frame_nbytes(value)
+        # Cada sincronización devuelve un `Dataset` nuevo: se avisa por versión, no por objeto
+        version = getattr(value, 'version', id(value))
+        if self.max_bytes is not None and nbytes > self.max_bytes and version != self._oversized_version:
+            self._oversized_version = version
+            self.oversized += 1
+            print(f"Aviso: los datos ocupan {nbytes / 2 ** 20:.0f} MB, más que el tope de "
+                  f"{self.max_bytes / 2 ** 20:.0f} MB")
+
+        with self._lock:
+            self._value = value
+            self._loaded_at = self.clock()
+            self._nbytes = nbytes
+        return value
+
+    def peek(self):
+        """(copia actual o None, si sigue vigente), sin cargar nada ni contar el acceso."""
+        with self._lock:
+            return self._value, self._fresh(self.clock())
+
+    @property
+    def loading(self):
+        return self._refresh_lock.locked()
+
+    def begin_load(self, blocking=False):
+        """Toma el turno de recarga para cargar por fuera de `get` (ver `preload` y asgi.py).
+
+        Devuelve False si otro ya está cargando. Mientras se tenga el turno,
+        `get` sirve la copia vencida o espera sin llamar a `loader`; hay que
+        devolverlo con `end_load`.
+        """
+        return self._refresh_lock.acquire(blocking=blocking)
+
+    def end_load(self, value=None):
+        """Guarda `value` (si no es None) y devuelve el turno de recarga."""
+        try:
+            if value is not None:
+                self.put(value)
+        finally:
+            self._refresh_lock.release()
+
+    def preload(self, fn):
+        """Carga `fn()` en un hilo aparte (p. ej. la instantánea al arrancar).
+
+        Mientras tanto, quien pida los datos espera a que termine en lugar de
+        consultar el upstream por su cuenta; si `fn` devuelve None o falla, la
+        siguiente petición los carga con `loader` como siempre.
+        """
+        self.begin_load(blocking=True)
+
+        def run():
+            value = None
+            try:
+                value = fn()
+            except Exception as e:
+                print(f"Error al precargar los datos: {e}")
+            finally:
+                self.end_load(value)
+
+        thread = threading.Thread(target=run, name='dataset-preload', daemon=True)
+        thread.start()
+        # Un proceso hijo (p. ej. gunicorn --preload) heredaría el lock tomado
+        # sin el hilo que lo suelta: antes de un fork se espera a que termine
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(before=thread.join)
+        return thread
+
+    def invalidate(self):
+        """Descarta la copia actual; la siguiente petición recarga los datos."""
+        with self._lock:
+            self._value = None
+            self._loaded_at = None
+            self._nbytes = 0
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            age = None if self._loaded_at is None else self.clock() - self._loaded_at
+            return {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits + self.stale_hits) / lookups if lookups else None,
+                'loads': self.loads,
+                'oversized': self.oversized,
+                'invalidations': self.invalidations,
+                'ttl': self.ttl,
+                'age': age,
+                'bytes': self._nbytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+class ForecastCache:
+    """Caché LRU de resultados calculados (pronósticos) con un solo vuelo.
+
+    La clave debe incluir la versión de los datos, así un resultado nunca
+    sobrevive a una sincronización con filas nuevas. Si varias peticiones
+    piden la misma clave a la vez, solo una calcula y el resto espera su
+    resultado.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.compute_seconds = 0.0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+                owner = True
+
+        if not owner:
+            return future.result()
+
+        start = time.perf_counter()
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self.compute_seconds += time.perf_counter() - start
+            self._store(key, value)
+            del self._inflight[key]
+        future.set_result(value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_ratio': (self.hits + self.coalesced) / lookups if lookups else None,
+                'evictions': self.evictions,
+                'compute_seconds': self.compute_seconds,
+                'avg_compute_seconds': self.compute_seconds / self.misses if self.misses else None,
+            }
@@ -0,0 +1,29 @@
+"""Compresión de respuestas (gzip, o brotli si está instalado)."""
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('application/json', 'application/vnd.columnar+json', 'application/octet-stream', 'text/html')
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encodings):
+    """La codificación a usar según `Accept-Encoding` (brotli antes que gzip), o None."""
+    for encoding in available_encodings():
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
@@ -0,0 +1,75 @@
+import numpy as np
+
+# Menos puntos que estos no alcanzan para reducir una serie (LTTB conserva los extremos)
+MIN_POINTS = 3
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: índices de `threshold` puntos representativos.
+
+    Conserva el primer y el último punto y, de cada cubeta intermedia, el que
+    forma el triángulo de mayor área con el punto elegido antes y el promedio
+    de la cubeta siguiente, de modo que los picos visibles se mantienen.
+    """
+    n = len(x)
+    if threshold < MIN_POINTS:
+        raise ValueError(f"max_points debe ser al menos {MIN_POINTS}")
+    if threshold >= n:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    # Límites de las threshold - 2 cubetas intermedias
+    edges = np.floor(np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype('int64') + 1
+    edges[-1] = n - 1
+
+    selected = np.empty(threshold, dtype='int64')
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(x, y, threshold):
+    """Índices del mínimo y el máximo de cada una de `threshold // 2` cubetas."""
+    n = len(x)
+    if threshold < MIN_POINTS:
+        raise ValueError(f"max_points debe ser al menos {MIN_POINTS}")
+    if threshold >= n:
+        return np.arange(n)
+
+    y = np.asarray(y)
+    buckets = threshold // 2
+    edges = np.linspace(0, n, buckets + 1).astype('int64')
+    selected = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        chunk = y[start:end]
+        selected.append(start + int(np.argmin(chunk)))
+        selected.append(start + int(np.argmax(chunk)))
+    return np.unique(selected)
+
+
+METHODS = {
+    'lttb': lttb,
+    'minmax': minmax,
+}
+
+
+def downsample(x, y, max_points, method='lttb'):
+    """Índices de los puntos a enviar para no superar `max_points`."""
+    if method not in METHODS:
+        raise ValueError(f"Método de reducción no soportado: {method}")
+    return METHODS[method](x, y, max_points)
@@ -0,0 +1,147 @@
+"""Formatos de respuesta de /get_data y /get_predictions.
+
+Las funciones de la app devuelven diccionarios cuyas hojas son `Series`
+(fechas datetime64 y valores float64 en arreglos de NumPy); aquí se
+convierten al formato pedido:
+
+- `json`: el formato original, con cada fecha como texto y cada valor como
+  número suelto (`{'labels': [...], 'data': [...]}`).
+- `columnar`: JSON con una fecha base y desplazamientos enteros desde ella
+  (`{'base': 'AAAA-MM-DD', 'unit': 'D' | 's', 'offsets': [...], 'data': [...]}`).
+- `binary`: un `uint32` con el largo del encabezado JSON, el encabezado
+  (rellenado con espacios hasta múltiplo de 8 bytes) y luego, por serie, los
+  valores como Float64 y los desplazamientos como Int32, little-endian. El
+  encabezado indica la posición de cada arreglo desde el fin del encabezado,
+  así el navegador los carga directo en un `Float64Array`/`Int32Array`.
+"""
+import json
+import math
+import struct
+
+import numpy as np
+
+JSON_MIMETYPE = 'application/json'
+COLUMNAR_MIMETYPE = 'application/vnd.columnar+json'
+BINARY_MIMETYPE = 'application/octet-stream'
+
+FORMATS = {
+    'json': JSON_MIMETYPE,
+    'columnar': COLUMNAR_MIMETYPE,
+    'binary': BINARY_MIMETYPE,
+}
+
+DAY_SECONDS = 86_400
+
+
+class Series:
+    """Una serie del gráfico: fechas (datetime64), valores y cómo mostrar las fechas.
+
+    `label_format` es `date` (`AAAA-MM-DD`), `month` (`AAAA-MM`) o
+    `timestamp` (fecha y hora UTC como `str(pd.Timestamp)`).
+    """
+
+    def __init__(self, labels, values, label_format='date'):
+        self.labels = np.asarray(labels, dtype='datetime64[ns]')
+        self.values = np.asarray(values, dtype='float64')
+        self.label_format = label_format
+
+    def __len__(self):
+        return len(self.values)
+
+    @classmethod
+    def empty(cls, label_format='date'):
+        return cls(np.empty(0, 'datetime64[ns]'), np.empty(0, 'float64'), label_format)
+
+    def text_labels(self):
+        if self.label_format == 'timestamp':
+            import pandas as pd
+            return [str(ts) for ts in pd.DatetimeIndex(self.labels, tz='UTC')]
+        unit = 'M' if self.label_format == 'month' else 'D'
+        return np.datetime_as_string(self.labels.astype(f'datetime64[{unit}]')).tolist()
+
+    def offsets(self):
+        """(fecha base, unidad, desplazamientos int32) de las etiquetas."""
+        unit = 's' if self.label_format == 'timestamp' else 'D'
+        labels = self.labels
+        if self.label_format == 'month':
+            labels = labels.astype('datetime64[M]')
+        labels = labels.astype(f'datetime64[{unit}]').astype('int64')
+        if not len(labels):
+            return None, unit, np.empty(0, '<i4')
+        per_day = DAY_SECONDS if unit == 's' else 1
+        base_day = int(labels.min()) // per_day
+        base = str(np.datetime64(base_day, 'D'))
+        return base, unit, (labels - base_day * per_day).astype('<i4')
+
+
+def _walk(tree, leaf):
+    if isinstance(tree, Series):
+        return leaf(tree)
+    if isinstance(tree, dict):
+        return {key: _walk(value, leaf) for key, value in tree.items()}
+    return tree
+
+
+def to_json(tree):
+    """El formato original: etiquetas como texto."""
+    return _walk(tree, lambda s: {'labels': s.text_labels(), 'data': s.values.tolist()})
+
+
+def _columnar(series):
+    base, unit, offsets = series.offsets()
+    return {'base': base, 'unit': unit, 'offsets': offsets.tolist(), 'data': series.values.tolist()}
+
+
+def to_columnar(tree):
+    return _walk(tree, _columnar)
+
+
+def _split(tree, path, found):
+    """Separa las `Series` de `tree` (por ruta con puntos) del resto del contenido."""
+    if isinstance(tree, Series):
+        found['.'.join(path)] = tree
+        return {}
+    if isinstance(tree, dict):
+        return {key: _split(value, path + (key,), found) for key, value in tree.items()}
+    if isinstance(tree, float) and not math.isfinite(tree):
+        return None  # JSON.parse no acepta NaN
+    return tree
+
+
+def to_binary(tree):
+    series = {}
+    meta = _split(tree, (), series)
+    header = {'meta': meta, 'series': {}}
+    chunks = []
+    position = 0
+    for path, s in series.items():
+        base, unit, offsets = s.offsets()
+        values = s.values.astype('<f8')
+        header['series'][path] = {
+            'length': len(s), 'base': base, 'unit': unit, 'format': s.label_format,
+            'data': position, 'offsets': position + values.nbytes,
+        }
+        padding = -(values.nbytes + offsets.nbytes) % 8
+        chunks += [values.tobytes(), offsets.tobytes(), b'\0' * padding]
+        position += values.nbytes + offsets.nbytes + padding
+
+    encoded = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    encoded += b' ' * (-(4 + len(encoded)) % 8)
+    return b''.join([struct.pack('<I', len(encoded)), encoded] + chunks)
+
+
+def encode(tree, fmt):
+    """Devuelve (cuerpo, mimetype); `json` y `columnar` devuelven el objeto sin serializar."""
+    if fmt == 'binary':
+        return to_binary(tree), BINARY_MIMETYPE
+    if fmt == 'columnar':
+        return to_columnar(tree), COLUMNAR_MIMETYPE
+    return to_json(tree), JSON_MIMETYPE
+
+
+def negotiate(fmt, accept_mimetypes):
+    """Formato pedido con `format=` o, si no, con la cabecera `Accept` (JSON por defecto)."""
+    if fmt:
+        return fmt if fmt in FORMATS else None
+    best = accept_mimetypes.best_match(list(FORMATS.values()), default=JSON_MIMETYPE)
+    return {mimetype: name for name, mimetype in FORMATS.items()}[best]
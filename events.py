@@ -0,0 +1,174 @@
+"""Difusión de eventos a los navegadores conectados a `/stream` (Server-Sent Events).
+
+Cada evento se serializa una sola vez y se encola por referencia en la cola
+de cada cliente, así publicar cuesta O(clientes) y el tamaño del mensaje es
+el del cambio, no el del historial. Las colas están acotadas: si un cliente
+lento acumula `max_events` mensajes sin leer, se descartan y se le envía un
+único `resync` para que vuelva a pedir los datos completos; la conexión de
+un cliente lento solo retiene su propio hilo, nunca a quien publica.
+"""
+import json
+import threading
+from collections import deque
+
+RETRY_MS = 5000
+
+
+def format_event(event, data, event_id=None):
+    """Mensaje SSE (`event:`, `id:` y `data:` en una línea JSON) listo para enviar."""
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append('data: ' + json.dumps(data, separators=(',', ':')))
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+class Subscriber:
+    """Cola acotada de mensajes pendientes de un cliente."""
+
+    def __init__(self, max_events):
+        self.max_events = max_events
+        self.overflows = 0
+        self._messages = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        # Se llama (desde el hilo que publica) al llegar un mensaje o al cerrar
+        self.on_message = None
+
+    def put(self, message, resync):
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._messages) >= self.max_events:
+                self._messages.clear()
+                self._messages.append(resync)
+                self.overflows += 1
+            else:
+                self._messages.append(message)
+            self._cond.notify()
+        if self.on_message is not None:
+            self.on_message()
+
+    def get(self, timeout):
+        """El siguiente mensaje, o None si no llegó ninguno en `timeout` segundos."""
+        with self._cond:
+            if not self._messages and not self._closed:
+                self._cond.wait(timeout)
+            return self._messages.popleft() if self._messages else None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self.on_message is not None:
+            self.on_message()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def __len__(self):
+        return len(self._messages)
+
+
+class EventBroker:
+    """Reparte los eventos publicados entre los clientes suscritos.
+
+    `max_clients` limita las conexiones abiertas (cada una ocupa un hilo del
+    servidor) y `heartbeat` es cada cuántos segundos se envía un comentario
+    para mantener viva la conexión y detectar clientes que se fueron.
+    """
+
+    def __init__(self, max_events=16, max_clients=100, heartbeat=15.0):
+        self.max_events = max_events
+        self.max_clients = max_clients
+        self.heartbeat = heartbeat
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+        self.published = 0
+        self.rejected = 0
+        self.overflows = 0
+
+    def subscribe(self):
+        """Nueva suscripción, o None si ya hay `max_clients` clientes."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                self.rejected += 1
+                return None
+            subscriber = Subscriber(self.max_events)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.close()
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            self.overflows += subscriber.overflows
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def publish(self, event, data, event_id=None):
+        message = format_event(event, data, event_id)
+        resync = format_event('resync', {'version': event_id}, event_id)
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for subscriber in subscribers:
+            subscriber.put(message, resync)
+
+    def stream(self, subscriber, first=()):
+        """Generador con el cuerpo de la respuesta: `first`, luego los eventos publicados."""
+        try:
+            yield f'retry: {RETRY_MS}\n\n'.encode('utf-8')
+            yield from first
+            while not subscriber.closed:
+                message = subscriber.get(self.heartbeat)
+                yield message if message is not None else b': ping\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def astream(self, subscriber, first=()):
+        """Como `stream`, para servidores ASGI: espera en el event loop, sin ocupar un hilo."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        subscriber.on_message = lambda: loop.call_soon_threadsafe(wake.set)
+        try:
+            yield f'retry: {RETRY_MS}\n\n'.encode('utf-8')
+            for message in first:
+                yield message
+            while not subscriber.closed:
+                wake.clear()
+                message = subscriber.get(0)
+                if message is not None:
+                    yield message
+                    continue
+                try:
+                    await asyncio.wait_for(wake.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield b': ping\n\n'
+        finally:
+            subscriber.on_message = None
+            self.unsubscribe(subscriber)
+
+    def close(self):
+        """Cierra todas las conexiones (al terminar el proceso)."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def stats(self):
+        with self._lock:
+            pending = [len(s) for s in self._subscribers]
+            overflows = self.overflows + sum(s.overflows for s in self._subscribers)
+        return {
+            'clients': len(pending),
+            'pending': sum(pending),
+            'published': self.published,
+            'rejected': self.rejected,
+            'overflows': overflows,
+        }
@@ -0,0 +1,131 @@
+import contextlib
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Estados con cuerpo de GraphQL (datos, o los errores de validación)
+STREAM_STATUSES = (200, 400)
+
+
+class GraphQLClient:
+    """Cliente HTTP compartido para el API GraphQL.
+
+    Usa una sola `requests.Session` con un pool de conexiones keep-alive,
+    timeouts de conexión/lectura y reintentos con backoff exponencial ante
+    errores de red y respuestas 502/503/504. `gather` lanza varias consultas
+    a la vez, de modo que la latencia total es la de la más lenta.
+
+    La sesión (y `requests`) se crea con la primera consulta, no al arrancar.
+    """
+
+    def __init__(self, url, timeout=(3.05, 30), retries=2, backoff=0.3, pool_size=10):
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='graphql')
+
+    @property
+    def session(self):
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._make_session()
+            return self._session
+
+    def _make_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=(502, 503, 504),
+            # Las consultas son de solo lectura, se pueden repetir
+            allowed_methods=frozenset(['POST']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def execute(self, query):
+        """Envía una consulta; devuelve el JSON de respuesta o None si el estado no es 200."""
+        res = self.session.post(self.url, json={"query": query}, timeout=self.timeout)
+        if res.status_code != 200:
+            return None
+        return res.json()
+
+    def stream(self, query):
+        """Como `execute`, pero devuelve la respuesta sin leer el cuerpo (o None).
+
+        Quien llama lee el cuerpo por partes (`iter_content`) y debe cerrarla.
+        También se devuelven las respuestas 400, que en GraphQL traen los
+        errores de validación de la consulta en el cuerpo.
+        """
+        res = self.session.post(self.url, json={"query": query}, timeout=self.timeout, stream=True)
+        if res.status_code not in STREAM_STATUSES:
+            res.close()
+            return None
+        return res
+
+    def gather(self, fn, args_by_key):
+        """Ejecuta `fn(*args)` en paralelo para cada clave.
+
+        Devuelve {clave: resultado}; si una llamada lanza una excepción, esa
+        excepción es el resultado de su clave. Cada llamada corre con una copia
+        del contexto de quien llama (p. ej. las mediciones de la petición).
+        """
+        futures = {
+            key: self._executor.submit(contextvars.copy_context().run, fn, *args)
+            for key, args in args_by_key.items()
+        }
+        results = {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                results[key] = e
+        return results
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        if self._session is not None:
+            self._session.close()
+
+
+class AsyncGraphQLClient:
+    """Cliente asíncrono del API GraphQL para el modo ASGI (requiere `httpx`).
+
+    Todas las consultas en curso comparten un pool de hasta `pool_size`
+    conexiones keep-alive, con los mismos timeouts que `GraphQLClient`. httpx
+    solo reintenta los errores de conexión, no las respuestas 502/503/504.
+    """
+
+    def __init__(self, url, timeout=(3.05, 30), retries=2, pool_size=100):
+        import httpx
+
+        self.url = url
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout[1], connect=timeout[0]),
+            transport=httpx.AsyncHTTPTransport(retries=retries, limits=limits),
+        )
+
+    @contextlib.asynccontextmanager
+    async def stream(self, query):
+        """Respuesta sin leer el cuerpo (`aiter_bytes`), o None si el estado no es 200 ni 400."""
+        async with self.client.stream('POST', self.url, json={"query": query}) as res:
+            yield res if res.status_code in STREAM_STATUSES else None
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -0,0 +1,248 @@
+"""Modelos de pronóstico sobre series agregadas (un valor por período).
+
+Las tendencias lineal y polinomial se ajustan con una sola resolución de
+mínimos cuadrados sobre la matriz de Vandermonde, y los valores ajustados se
+calculan una vez para R² y MAE. Varias series de igual longitud se ajustan en
+la misma llamada a `lstsq`.
+
+`TrendState` guarda en cambio los estadísticos suficientes de una serie
+(momentos de la ecuación normal y la ventana del promedio móvil), que se
+actualizan con cada período nuevo sin volver a recorrer el historial.
+"""
+import numpy as np
+
+MODELS = ('linear', 'poly2', 'poly3', 'moving_avg', 'rolling_avg', 'exp_smoothing')
+# Modelos que se pueden pronosticar desde `TrendState`
+STATE_MODELS = ('linear', 'poly2', 'poly3', 'moving_avg', 'rolling_avg')
+
+MOVING_AVG_WINDOW = 5
+MAX_DEGREE = 3
+SMOOTHING_ALPHA = 0.3
+SMOOTHING_BETA = 0.1
+
+
+def trend_degree(model):
+    if model == 'linear':
+        return 1
+    if model.startswith('poly'):
+        return int(model[-1])
+    return None
+
+
+def vandermonde(x, degree, scale):
+    # x se escala a [0, 1] para que la matriz esté bien condicionada
+    return np.vander(np.asarray(x, dtype='float64') / scale, degree + 1, increasing=True)
+
+
+def r2_score(y, fitted):
+    """R² con la misma convención que sklearn para series constantes o muy cortas."""
+    if len(y) < 2:
+        return float('nan')
+    ss_res = float(np.sum((y - fitted) ** 2))
+    ss_tot = float(np.sum((y - np.mean(y)) ** 2))
+    if ss_tot == 0:
+        return 1.0 if ss_res == 0 else 0.0
+    return 1 - ss_res / ss_tot
+
+
+def mean_absolute_error(y, fitted):
+    return float(np.mean(np.abs(y - fitted)))
+
+
+def fit_trends(ys, degree, horizon):
+    """Ajusta una tendencia polinomial a cada serie de `ys`.
+
+    Devuelve una lista de (pronóstico, r2, mae). Las series con la misma
+    longitud comparten la matriz de diseño y se resuelven juntas.
+    """
+    results = [None] * len(ys)
+    by_length = {}
+    for i, y in enumerate(ys):
+        if len(y) == 0:
+            raise ValueError("No hay datos para ajustar el modelo")
+        by_length.setdefault(len(y), []).append(i)
+
+    for n, indices in by_length.items():
+        scale = max(n - 1, 1)
+        X = vandermonde(np.arange(n), degree, scale)
+        Y = np.column_stack([np.asarray(ys[i], dtype='float64') for i in indices])
+        coef, *_ = np.linalg.lstsq(X, Y, rcond=None)
+        fitted = X @ coef
+        pred = vandermonde(np.arange(n, n + horizon), degree, scale) @ coef
+        for k, i in enumerate(indices):
+            y = Y[:, k]
+            results[i] = (pred[:, k], r2_score(y, fitted[:, k]), mean_absolute_error(y, fitted[:, k]))
+    return results
+
+
+def moving_average(y, horizon, window=MOVING_AVG_WINDOW):
+    """Promedio de los últimos `window` valores, repetido en todo el horizonte."""
+    window = min(window, len(y))
+    return np.full(horizon, np.mean(y[-window:]))
+
+
+def rolling_average(y, horizon, window=MOVING_AVG_WINDOW):
+    """Promedio móvil recursivo: cada pronóstico entra en la ventana del siguiente."""
+    window = min(window, len(y))
+    buffer = list(np.asarray(y[-window:], dtype='float64'))
+    total = sum(buffer)
+    pred = np.empty(horizon)
+    for i in range(horizon):
+        pred[i] = total / window
+        total += pred[i] - buffer[i]
+        buffer.append(pred[i])
+    return pred
+
+
+def exp_smoothing(y, horizon, alpha=SMOOTHING_ALPHA, beta=SMOOTHING_BETA):
+    """Suavizado exponencial doble (Holt) con tendencia lineal.
+
+    R² y MAE se calculan con los pronósticos a un paso dentro de la muestra.
+    """
+    y = np.asarray(y, dtype='float64')
+    level = y[0]
+    trend = y[1] - y[0] if len(y) > 1 else 0.0
+    fitted = np.empty(len(y))
+    fitted[0] = y[0]
+    for t in range(1, len(y)):
+        fitted[t] = level + trend
+        previous = level
+        level = alpha * y[t] + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous) + (1 - beta) * trend
+    pred = level + trend * np.arange(1, horizon + 1)
+    return pred, r2_score(y, fitted), mean_absolute_error(y, fitted)
+
+
+class TrendState:
+    """Estadísticos suficientes de una serie para las tendencias y los promedios móviles.
+
+    Para x = 0..n-1 guarda las sumas de x^k (k ≤ 2·`MAX_DEGREE`) y de x^k·y
+    (k ≤ `MAX_DEGREE`), que forman la ecuación normal de cualquier grado, y
+    la suma de y². Los y se guardan desplazados por el primer valor para no
+    perder precisión al restar. `update` cuesta O(valores que cambian), así
+    agregar un período es O(1) sin importar el largo del historial.
+    """
+
+    def __init__(self, window=MOVING_AVG_WINDOW):
+        self.n = 0
+        self.offset = None
+        self.x_powers = np.zeros(2 * MAX_DEGREE + 1)
+        self.xy = np.zeros(MAX_DEGREE + 1)
+        self.yy = 0.0
+        self.window_size = window
+        self.window = np.empty(0)
+
+    @classmethod
+    def from_values(cls, y, window=MOVING_AVG_WINDOW):
+        state = cls(window)
+        state.update(y, 0)
+        return state
+
+    def copy(self):
+        state = TrendState(self.window_size)
+        state.n, state.offset, state.yy = self.n, self.offset, self.yy
+        state.x_powers, state.xy, state.window = self.x_powers.copy(), self.xy.copy(), self.window
+        return state
+
+    def _accumulate(self, start, values, sign):
+        if not len(values):
+            return
+        powers = np.vander(np.arange(start, start + len(values), dtype='float64'), 2 * MAX_DEGREE + 1, increasing=True)
+        z = np.asarray(values, dtype='float64') - self.offset
+        self.x_powers += sign * powers.sum(axis=0)
+        self.xy += sign * (z @ powers[:, :MAX_DEGREE + 1])
+        self.yy += sign * float(z @ z)
+
+    def update(self, y, start, old=()):
+        """Pasa a la serie `y`, que difiere de la anterior desde la posición `start` (antes `old`)."""
+        self.replace_tail(start, np.asarray(y, dtype='float64')[start:], old)
+
+    def replace_tail(self, start, new, old=()):
+        """Como `update`, pero con solo los valores desde la posición `start` (`new`, antes `old`)."""
+        new = np.asarray(new, dtype='float64')
+        if self.offset is None and len(new):
+            self.offset = float(new[0])
+        self._accumulate(start, old, -1)
+        self._accumulate(start, new, 1)
+        # La ventana cubre las posiciones n - len(window) .. n - 1: se conserva
+        # lo anterior a `start` y se completa con los valores nuevos
+        keep = min(max(start - (self.n - len(self.window)), 0), len(self.window))
+        self.window = np.concatenate([self.window[:keep], new])[-self.window_size:]
+        self.n = start + len(new)
+
+    def _normal_equations(self, degree):
+        scale = float(max(self.n - 1, 1))
+        powers = self.x_powers[:2 * degree + 1] / scale ** np.arange(2 * degree + 1)
+        A = powers[np.add.outer(np.arange(degree + 1), np.arange(degree + 1))]
+        b = self.xy[:degree + 1] / scale ** np.arange(degree + 1)
+        return A, b, scale
+
+    def trend(self, degree, horizon, y=None):
+        """(pronóstico, r2, mae) como `fit_trends`, a partir de los momentos.
+
+        El MAE no se puede armar con sumas (tiene valores absolutos): si se
+        pasa la serie `y` se calcula en una pasada vectorizada sobre ella; si
+        no, es None.
+        """
+        if not self.n:
+            raise ValueError("No hay datos para ajustar el modelo")
+        A, b, scale = self._normal_equations(degree)
+        coef, *_ = np.linalg.lstsq(A, b, rcond=None)
+        pred = vandermonde(np.arange(self.n, self.n + horizon), degree, scale) @ coef + self.offset
+
+        r2 = float('nan')
+        if self.n >= 2:
+            ss_res = self.yy - 2 * float(coef @ b) + float(coef @ A @ coef)
+            ss_tot = self.yy - self.xy[0] ** 2 / self.n
+            # Lo que queda por debajo del error de redondeo de las sumas es 0
+            tolerance = 1e-12 * self.yy
+            ss_res = ss_res if ss_res > tolerance else 0.0
+            if ss_tot <= tolerance:
+                r2 = 1.0 if ss_res == 0 else 0.0
+            else:
+                r2 = 1 - ss_res / ss_tot
+        mae = None
+        if y is not None:
+            # Horner sobre la serie, sin armar la matriz de Vandermonde
+            fitted = np.polynomial.polynomial.polyval(np.arange(self.n) / scale, coef)
+            fitted += self.offset
+            mae = mean_absolute_error(np.asarray(y, dtype='float64'), fitted)
+        return pred, r2, mae
+
+    def forecast(self, model, horizon, y=None):
+        """Como `forecasting.forecast`, para los modelos de `STATE_MODELS`."""
+        degree = trend_degree(model)
+        if degree is not None:
+            return self.trend(degree, horizon, y)
+        if model not in ('moving_avg', 'rolling_avg'):
+            raise ValueError(f"{model} no se calcula desde TrendState")
+        if not self.n:
+            raise ValueError("No hay datos para ajustar el modelo")
+        if model == 'moving_avg':
+            return moving_average(self.window, horizon), None, None
+        return rolling_average(self.window, horizon), None, None
+
+
+def forecast_many(ys, model, horizon):
+    """Pronostica `horizon` períodos de cada serie; devuelve [(pred, r2, mae)]."""
+    degree = trend_degree(model)
+    if degree is not None:
+        return fit_trends(ys, degree, horizon)
+
+    results = []
+    for y in ys:
+        if len(y) == 0:
+            raise ValueError("No hay datos para ajustar el modelo")
+        if model == 'moving_avg':
+            results.append((moving_average(y, horizon), None, None))
+        elif model == 'rolling_avg':
+            results.append((rolling_average(y, horizon), None, None))
+        elif model == 'exp_smoothing':
+            results.append(exp_smoothing(y, horizon))
+        else:
+            results.append((np.zeros(horizon), None, None))
+    return results
+
+
+def forecast(y, model, horizon):
+    return forecast_many([y], model, horizon)[0]
@@ -0,0 +1,242 @@
+"""Lectura por partes de respuestas GraphQL (`{"data": {field: [...]}}`).
+
+`iter_batches` recorre la lista de registros a medida que llegan los bloques
+de texto, sin armar el documento completo; `ColumnBuilder` copia de cada
+tanda solo los campos que usa la app (id, fecha, monto y descripción) en
+arreglos de NumPy reservados de antemano, así que cada registro vive como
+dict apenas lo que dura su tanda. Las fechas de cada tanda se convierten con
+`parse_timestamps`, que lee el formato fijo del API
+(`AAAA-MM-DDTHH:MM:SS.sssZ`) con aritmética de arreglos en lugar de la
+inferencia de `pd.to_datetime`.
+"""
+import codecs
+import json
+import re
+
+import numpy as np
+
+from store import Columns, ID_DTYPE
+
+TS_DTYPE = 'S32'
+# Bytes aproximados por registro, para reservar los arreglos según el tamaño del cuerpo
+RECORD_BYTES = 96
+MIN_CAPACITY = 1024
+BATCH_ROWS = 4096
+
+# Posiciones de cada parte en `AAAA-MM-DDTHH:MM:SS.sssZ`
+_DIGITS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18, 20, 21, 22]
+_SEPARATORS = {4: b'-', 7: b'-', 10: b'T', 13: b':', 16: b':', 19: b'.', 23: b'Z'}
+_ISO_LENGTH = 24
+
+
+def _number(digits, start, count):
+    value = digits[:, start].astype('int64')
+    for i in range(start + 1, start + count):
+        value = value * 10 + digits[:, i]
+    return value
+
+
+def parse_timestamps(raw):
+    """Fechas ISO 8601 en UTC (bytes o str) -> int64 en ns desde 1970.
+
+    Las que no siguen el formato del API se pasan a `pd.to_datetime`.
+    """
+    raw = np.asarray(raw, dtype=TS_DTYPE)
+    if not len(raw):
+        return np.empty(0, 'int64')
+    chars = raw.view('u1').reshape(len(raw), -1)[:, :_ISO_LENGTH + 1]
+    digits = chars[:, _DIGITS] - np.uint8(ord('0'))
+    ok = (digits <= 9).all(axis=1) & (chars[:, _ISO_LENGTH] == 0)
+    for pos, sep in _SEPARATORS.items():
+        ok &= chars[:, pos] == ord(sep)
+
+    year, month, day = _number(digits, 0, 4), _number(digits, 4, 2), _number(digits, 6, 2)
+    hour, minute, second = _number(digits, 8, 2), _number(digits, 10, 2), _number(digits, 12, 2)
+    millis = _number(digits, 14, 3)
+    ok &= (month >= 1) & (month <= 12) & (day >= 1) & (hour < 24) & (minute < 60) & (second < 60)
+
+    months = ((year - 1970) * 12 + np.where(ok, month - 1, 0)).astype('datetime64[M]')
+    days = months.astype('datetime64[D]').astype('int64') + day - 1
+    ok &= day <= (months + 1).astype('datetime64[D]').astype('int64') - months.astype('datetime64[D]').astype('int64')
+    seconds = days * 86_400 + hour * 3_600 + minute * 60 + second
+    ts = (seconds * 1_000 + millis) * 1_000_000
+
+    if not ok.all():
+        odd = ~ok
+        text = np.char.decode(raw[odd], 'ascii')
+        import pandas as pd
+        ts[odd] = pd.to_datetime(text, utc=True, format='ISO8601').as_unit('ns').asi8
+    return ts
+
+
+class ColumnBuilder:
+    """Acumula tandas de registros en arreglos reservados y entrega `store.Columns`.
+
+    `capacity` es la cantidad de filas esperada; si llegan más, los arreglos
+    crecen un 50%.
+    """
+
+    def __init__(self, time_field, amount_field, desc_field=None, capacity=MIN_CAPACITY):
+        self.time_field = time_field
+        self.amount_field = amount_field
+        self.desc_field = desc_field
+        self.size = 0
+        capacity = max(int(capacity), MIN_CAPACITY)
+        self.ts = np.empty(capacity, 'int64')
+        self.amount = np.empty(capacity, 'float64')
+        self.ids = np.empty(capacity, ID_DTYPE)
+        self.codes = np.empty(capacity, 'int32') if desc_field is not None else None
+        self.categories = {}
+
+    def _reserve(self, n):
+        capacity = len(self.ts)
+        if self.size + n <= capacity:
+            return
+        capacity = max(self.size + n, capacity + capacity // 2)
+        for name in ('ts', 'amount', 'ids', 'codes'):
+            array = getattr(self, name)
+            if array is not None:
+                grown = np.empty(capacity, array.dtype)
+                grown[:self.size] = array[:self.size]
+                setattr(self, name, grown)
+
+    def extend(self, records):
+        n = len(records)
+        if not n:
+            return
+        self._reserve(n)
+        rows = slice(self.size, self.size + n)
+        self.ts[rows] = parse_timestamps([r[self.time_field] for r in records])
+        self.amount[rows] = [r[self.amount_field] for r in records]
+        self.ids[rows] = [r['id'] for r in records]
+        if self.codes is not None:
+            categories = self.categories
+            self.codes[rows] = [
+                -1 if (value := r.get(self.desc_field)) is None else categories.setdefault(value, len(categories))
+                for r in records
+            ]
+        self.size += n
+
+    def _trimmed(self, array):
+        # Los arreglos son solo del builder: se achican en su lugar, sin copiarlos
+        array.resize(self.size, refcheck=False)
+        return array
+
+    def finish(self):
+        if not self.size:
+            return Columns.empty(with_desc=self.codes is not None)
+        desc = None
+        if self.codes is not None:
+            import pandas as pd
+            desc = pd.Categorical.from_codes(self._trimmed(self.codes), categories=list(self.categories))
+            # Mismo orden de categorías que `pd.Categorical(lista)`
+            desc = desc.reorder_categories(sorted(self.categories))
+        return Columns(self._trimmed(self.ts), self._trimmed(self.amount), self._trimmed(self.ids), desc)
+
+
+def decode_chunks(chunks, encoding='utf-8'):
+    """Bloques de bytes -> bloques de texto (un carácter puede quedar partido entre dos)."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+class GraphQLError(ValueError):
+    """La respuesta trae `"errors"`; `text` es la parte de la respuesta que los contiene."""
+
+    def __init__(self, text):
+        super().__init__("la respuesta trae errores de GraphQL")
+        self.text = text
+
+    @property
+    def rejects_arguments(self):
+        """Si el API rechazó la consulta al validarla (p. ej. por un argumento desconocido)."""
+        return bool(re.search(r'Unknown argument|GRAPHQL_VALIDATION_FAILED', self.text))
+
+
+def _check_errors(text):
+    if re.search(r'"errors"\s*:', text):
+        raise GraphQLError(text)
+
+
+def iter_batches(chunks, field):
+    """Recorre los registros de `{"data": {field: [...]}}` a partir de bloques de texto.
+
+    Devuelve una lista de registros por bloque recibido. Si la lista no
+    aparece (p. ej. `"data": null`), está incompleta o la respuesta trae
+    `"errors"`, lanza `ValueError` (`GraphQLError` en el último caso).
+    """
+    decoder = json.JSONDecoder()
+    start = re.compile(r'"%s"\s*:\s*\[' % re.escape(field))
+    chunks = iter(chunks)
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        match = start.search(buffer)
+        if match:
+            break
+    else:
+        _check_errors(buffer)
+        raise ValueError(f"la respuesta no tiene la lista {field}")
+    _check_errors(buffer[:match.start()])
+    buffer, pos = buffer[match.end():], 0
+
+    while True:
+        batch = []
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        # Lo normal es decodificar de una vez todo hasta la última `}` del
+        # búfer (si la lista termina antes, hasta su `]`); si ahí se corta un
+        # texto, se sigue registro por registro.
+        end = buffer.rfind('}', pos) + 1
+        if end:
+            try:
+                batch, consumed = decoder.raw_decode('[' + buffer[pos:end] + ']')
+                pos += consumed - 2 if consumed < end - pos + 2 else end - pos
+            except json.JSONDecodeError:
+                pass
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == ']':
+                if batch:
+                    yield batch
+                _check_errors(buffer[pos:] + ''.join(chunks))
+                return
+            try:
+                record, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # registro cortado al final del bloque
+            batch.append(record)
+        if batch:
+            yield batch
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError(f"la lista {field} está incompleta")
+        buffer, pos = buffer[pos:] + chunk, 0
+
+
+def read_columns(chunks, field, time_field, amount_field, desc_field=None, size_hint=0):
+    """Columnas de `field` leídas por partes de `chunks` (texto).
+
+    `size_hint` es el tamaño aproximado del cuerpo en bytes (p. ej. el
+    `Content-Length`), para reservar los arreglos de una vez.
+    """
+    builder = ColumnBuilder(time_field, amount_field, desc_field, capacity=size_hint // RECORD_BYTES)
+    # Con bloques chicos se juntan varias tandas, para no pagar el costo fijo
+    # de cada conversión por unos pocos registros
+    pending = []
+    for batch in iter_batches(chunks, field):
+        pending += batch
+        if len(pending) >= BATCH_ROWS:
+            builder.extend(pending)
+            pending = []
+    builder.extend(pending)
+    return builder.finish()
@@ -0,0 +1,197 @@
+"""Contadores, histogramas y temporizadores por etapa en formato Prometheus.
+
+`stage(nombre)` mide un bloque del camino caliente (descarga, parseo,
+filtro, agregación, ajuste, serialización): suma su duración al histograma
+`stage_seconds` y, si la petición en curso lo pidió con `start_timing()`, la
+anota para la cabecera `Server-Timing`. Medir un bloque cuesta un par de
+`perf_counter()` y un lock; con `enabled = False` no se mide nada.
+"""
+import bisect
+import contextvars
+import math
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+enabled = True
+
+_timings = contextvars.ContextVar('timings', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # {labels: [conteo por cubeta..., suma, total]}
+        self._values = {}
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def count(self, *labels):
+        entry = self._values.get(labels)
+        return entry[-1] if entry else 0
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, entry in sorted(self._values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + (math.inf,), entry):
+                    cumulative += n
+                    le = (('le', _number(bound)),)
+                    lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+                lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(entry[-2])}')
+                lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {entry[-1]}')
+        return lines
+
+
+class Gauge:
+    """Valor leído al exponer: `fn()` devuelve un número o {etiquetas: número}.
+
+    Con `kind='counter'` sirve para exponer contadores que ya lleva otro
+    objeto (p. ej. los aciertos de una caché).
+    """
+
+    def __init__(self, name, help, fn, labelnames=(), kind='gauge'):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        values = self.fn()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            if value is not None:
+                lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name, help, fn, labelnames=(), kind='gauge'):
+        return self.register(Gauge(name, help, fn, labelnames, kind))
+
+    def expose(self):
+        """Todas las métricas en el formato de texto de Prometheus (0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+stage_seconds = registry.histogram('stage_seconds', 'Duración de cada etapa del procesamiento', ('stage',))
+
+
+class stage:
+    """`with stage('fit'): ...` suma la duración del bloque a `stage_seconds`."""
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter() if enabled else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is None:
+            return
+        elapsed = time.perf_counter() - self.start
+        stage_seconds.observe(elapsed, self.name)
+        timings = _timings.get()
+        if timings is not None:
+            timings.append((self.name, elapsed))
+
+
+def start_timing():
+    """Empieza a anotar las etapas de la petición en curso para `Server-Timing`."""
+    timings = []
+    _timings.set(timings)
+    return timings
+
+
+def stop_timing():
+    timings = _timings.get()
+    _timings.set(None)
+    return timings
+
+
+def server_timing(timings, total=None):
+    """Cabecera `Server-Timing` (ms), sumando las etapas repetidas."""
+    durations = {}
+    for name, elapsed in timings:
+        durations[name] = durations.get(name, 0.0) + elapsed
+    if total is not None:
+        durations['total'] = total
+    return ', '.join(f'{name};dur={elapsed * 1000:.2f}' for name, elapsed in durations.items())
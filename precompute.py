@@ -0,0 +1,116 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Precomputer:
+    """Calcula en segundo plano los resultados más pedidos tras cada sincronización.
+
+    `tasks(data)` devuelve una lista de funciones sin argumentos; cada una
+    calcula un resultado y lo deja en su caché. Las tareas corren en un pool
+    de `max_workers` hilos; si llega una versión nueva de los datos antes de
+    terminar, las tareas pendientes de la anterior se cancelan.
+
+    Con `refresh` e `interval` también sincroniza periódicamente los datos
+    con el upstream desde un hilo propio.
+    """
+
+    def __init__(self, tasks, max_workers=2, refresh=None, interval=0):
+        self.tasks = tasks
+        self.max_workers = max_workers
+        self.refresh = refresh
+        self.interval = interval
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='precompute')
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._futures = []
+        self._generation = 0
+        self._remaining = 0
+        self._thread = None
+
+        self.version = None
+        self.scheduled = 0
+        self.done = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.started_at = None
+        self.finished_at = None
+        self.last_refresh = None
+        self.refresh_errors = 0
+
+    def start(self):
+        if self.refresh is not None and self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_loop, name='precompute-sync', daemon=True)
+            self._thread.start()
+        return self
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+                self.last_refresh = time.time()
+            except Exception as e:
+                print(f"Error en la sincronización en segundo plano: {e}")
+                self.refresh_errors += 1
+
+    def schedule(self, data):
+        """Encola las tareas para `data` y cancela las pendientes de versiones anteriores."""
+        if self._stop.is_set():
+            return
+        tasks = self.tasks(data)
+        with self._lock:
+            for future in self._futures:
+                if future.cancel():
+                    self.cancelled += 1
+            self._generation += 1
+            self._remaining = len(tasks)
+            self.version = data.version
+            self.started_at = time.time()
+            self.finished_at = None if tasks else self.started_at
+            self.scheduled += len(tasks)
+            self._futures = [self._executor.submit(self._run, task, self._generation) for task in tasks]
+
+    def _run(self, task, generation):
+        try:
+            task()
+            ok = True
+        except Exception as e:
+            print(f"Error en precálculo: {e}")
+            ok = False
+        with self._lock:
+            if ok:
+                self.done += 1
+            else:
+                self.failed += 1
+            if generation == self._generation:
+                self._remaining -= 1
+                if self._remaining == 0:
+                    self.finished_at = time.time()
+
+    def status(self):
+        with self._lock:
+            pending = sum(not f.done() for f in self._futures)
+            return {
+                'enabled': not self._stop.is_set(),
+                'version': self.version,
+                'max_workers': self.max_workers,
+                'pending': pending,
+                'scheduled': self.scheduled,
+                'done': self.done,
+                'failed': self.failed,
+                'cancelled': self.cancelled,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'duration': (self.finished_at - self.started_at) if self.finished_at and self.started_at else None,
+                'sync_interval': self.interval,
+                'last_refresh': self.last_refresh,
+                'refresh_errors': self.refresh_errors,
+            }
+
+    def shutdown(self, wait=True):
+        """Detiene la sincronización periódica y cancela lo que no empezó."""
+        self._stop.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
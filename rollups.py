@@ -0,0 +1,465 @@
+import numpy as np
+
+from forecasting import TrendState
+
+DAY_NS = 86_400_000_000_000
+EPOCH_DAY = np.datetime64('1970-01-01', 'D')
+# Rangos de fechas con estadísticos de tendencia guardados por índice (ver `DailyRollup.between`)
+RANGE_TRENDS = 32
+
+
+def to_day(value):
+    """Fecha (str, date, Timestamp o datetime64) -> días desde 1970-01-01."""
+    return int((np.datetime64(value, 'D') - EPOCH_DAY).astype('int64'))
+
+
+def _week_label(keys):
+    return EPOCH_DAY + keys * 7 + 3
+
+
+def _month_label(keys):
+    return (np.datetime64('1970-01', 'M') + keys + 1).astype('datetime64[D]') - 1
+
+
+# Fecha etiqueta de cada clave de período (ver `bucket_keys`)
+PERIOD_LABELS = {
+    'D': lambda keys: EPOCH_DAY + keys,
+    'W': _week_label,
+    'M': _month_label,
+}
+
+
+def bucket_keys(days, freq):
+    """Clave de período de cada día y función que pasa claves a la fecha etiqueta.
+
+    Las etiquetas siguen a `pd.Grouper`: 'D' el propio día, 'W' el domingo que
+    cierra la semana y 'M' el último día del mes.
+    """
+    if freq == 'D':
+        return days, PERIOD_LABELS[freq]
+    if freq == 'W':
+        # 1970-01-01 fue jueves: (día + 3) % 7 es el día de la semana (lunes = 0)
+        # y los domingos cumplen día % 7 == 3
+        ends = days + (6 - (days + 3) % 7)
+        return ends // 7, PERIOD_LABELS[freq]
+    if freq == 'M':
+        months = (EPOCH_DAY + days).astype('datetime64[M]').astype('int64')
+        return months, PERIOD_LABELS[freq]
+    raise ValueError(f"Período no soportado: {freq}")
+
+
+def period_start(key, freq):
+    """Primer día (días desde 1970-01-01) del período con clave `key` (ver `bucket_keys`)."""
+    if freq == 'D':
+        return int(key)
+    if freq == 'W':
+        # La semana `key` termina el domingo 7·key + 3
+        return int(key) * 7 - 3
+    if freq == 'M':
+        return int(((np.datetime64('1970-01', 'M') + int(key)).astype('datetime64[D]') - EPOCH_DAY).astype('int64'))
+    raise ValueError(f"Período no soportado: {freq}")
+
+
+class DailyRollup:
+    """Sumas y conteos por día (UTC) de una serie.
+
+    Es inmutable: `add` devuelve un índice nuevo, así quien tenga una versión
+    anterior la sigue viendo entera. Los agregados semanales y mensuales se
+    derivan de los diarios, de modo que cuestan O(días) y no O(filas).
+    """
+
+    def __init__(self, days=None, sums=None, counts=None):
+        self.days = days if days is not None else np.empty(0, 'int64')
+        self.sums = sums if sums is not None else np.empty(0, 'float64')
+        self.counts = counts if counts is not None else np.empty(0, 'int64')
+        self._buckets = {}
+        self._trends = {}
+        # Estadísticos de las vistas de `between`, por (período, primer día, último día)
+        self._range_trends = {}
+        self._root = None
+        self._bounds = (None, None)
+
+    def __len__(self):
+        return len(self.days)
+
+    @classmethod
+    def from_columns(cls, ts, amounts):
+        return cls().add(ts, amounts)
+
+    def add(self, ts, amounts):
+        """Devuelve un índice nuevo con las filas (`ts` en ns UTC, `amounts`) agregadas."""
+        if not len(ts):
+            return self
+        new_days, inverse = np.unique(np.floor_divide(ts, DAY_NS), return_inverse=True)
+        new_sums = np.bincount(inverse, weights=amounts, minlength=len(new_days))
+        new_counts = np.bincount(inverse, minlength=len(new_days))
+
+        days = np.union1d(self.days, new_days)
+        sums = np.zeros(len(days), 'float64')
+        counts = np.zeros(len(days), 'int64')
+        old = np.searchsorted(days, self.days)
+        sums[old] = self.sums
+        counts[old] = self.counts
+        new = np.searchsorted(days, new_days)
+        sums[new] += new_sums
+        counts[new] += new_counts
+        result = DailyRollup(days, sums, counts)
+        result._carry_trends(self, new_days)
+        return result
+
+    def to_snapshot(self):
+        """(info, arreglos) para guardar el índice con `store.save_snapshot`; ver `from_snapshot`."""
+        return {}, {'days': self.days, 'sums': self.sums, 'counts': self.counts}
+
+    @classmethod
+    def from_snapshot(cls, info, arrays):
+        return cls(arrays['days'], arrays['sums'], arrays['counts'])
+
+    def carry_trends_from(self, previous):
+        """Toma los estadísticos de tendencia de `previous` actualizados a este índice; devuelve `self`.
+
+        Es para índices que no salen de `previous.add`, como el de una
+        instantánea nueva: se comparan los días y solo se rehacen los
+        períodos desde el primero que difiere.
+        """
+        days = np.union1d(previous.days, self.days)
+        before, after = previous._dense(days), self._dense(days)
+        changed = days[(before[0] != after[0]) | (before[1] != after[1])]
+        if len(changed):
+            self._carry_trends(previous, changed)
+        else:
+            self._trends = dict(previous._trends)
+            self._range_trends = dict(previous._range_trends)
+            self._buckets = dict(previous._buckets)
+        return self
+
+    def _dense(self, days):
+        """(sumas, conteos) de cada uno de `days`, que incluye a los de este índice."""
+        index = np.searchsorted(days, self.days)
+        sums = np.zeros(len(days), 'float64')
+        counts = np.zeros(len(days), 'int64')
+        sums[index] = self.sums
+        counts[index] = self.counts
+        return sums, counts
+
+    def _carry_trends(self, previous, new_days):
+        """Actualiza los estadísticos de tendencia de `previous` con los períodos que cambiaron.
+
+        Solo se reagrupan los días desde el período del primero de `new_days`; los
+        agregados ya calculados de antes se reutilizan tal cual.
+        """
+        for freq, state in previous._trends.items():
+            carried = _carry_state(state, previous, self, new_days[0], freq)
+            if carried is None:
+                continue  # hay filas anteriores al primer período: se rehace al pedirlo
+            self._trends[freq], start, tail = carried
+            if (freq, True) in previous._buckets:
+                self._buckets[(freq, True)] = tuple(
+                    np.concatenate([old[:start], new]) for old, new in zip(previous._buckets[(freq, True)], tail)
+                )
+        for key, state in list(previous._range_trends.items()):
+            freq, first, last = key
+            changed = new_days[slice(*_day_range(new_days, first, last))]
+            if not len(changed):
+                self._range_trends[key] = state  # ninguna fila nueva cae en el rango
+                continue
+            carried = _carry_state(state, previous._slice(first, last), self._slice(first, last), changed[0], freq)
+            if carried is not None:
+                self._range_trends[key] = carried[0]
+
+    def _first_key(self, freq):
+        return int(bucket_keys(self.days[:1], freq)[0][0])
+
+    def _tail_buckets(self, freq, first_key):
+        """`buckets(freq)` desde el período `first_key` en adelante, sin recorrer los días anteriores."""
+        lo = np.searchsorted(self.days, period_start(first_key, freq), 'left')
+        days = self.days[lo:]
+        if not len(days):
+            return np.empty(0, 'datetime64[D]'), np.empty(0, 'float64'), np.empty(0, 'int64')
+        keys, to_label = bucket_keys(days, freq)
+        offsets = keys - first_key
+        size = int(offsets[-1]) + 1
+        sums = np.bincount(offsets, weights=self.sums[lo:], minlength=size)
+        counts = np.bincount(offsets, weights=self.counts[lo:], minlength=size).astype('int64')
+        return to_label(first_key + np.arange(size)), sums, counts
+
+    def between(self, start=None, end=None):
+        """Vista de los días entre `start` y `end` (inclusive).
+
+        Los estadísticos de tendencia de la vista se guardan en el índice del
+        que sale, por rango de fechas, así `add` también los actualiza y el
+        mismo rango pedido tras una sincronización no recorre sus períodos.
+        """
+        first = None if start is None else to_day(start)
+        last = None if end is None else to_day(end)
+        root = self
+        if self._root is not None:
+            root = self._root
+            first = _tighter(first, self._bounds[0], max)
+            last = _tighter(last, self._bounds[1], min)
+        view = root._slice(first, last)
+        view._root = root
+        view._bounds = (first, last)
+        return view
+
+    def _slice(self, first, last):
+        lo, hi = _day_range(self.days, first, last)
+        return DailyRollup(self.days[lo:hi], self.sums[lo:hi], self.counts[lo:hi])
+
+    def buckets(self, freq, dense=True):
+        """Agrega por período; devuelve (etiquetas datetime64[D], sumas, conteos).
+
+        Con `dense=True` se incluyen con suma 0 los períodos sin filas entre el
+        primero y el último, igual que `groupby(pd.Grouper(freq=...)).sum()`.
+        Como el índice no cambia, el resultado se guarda para las siguientes
+        llamadas.
+        """
+        key = (freq, dense)
+        if key not in self._buckets:
+            self._buckets[key] = self._compute_buckets(freq, dense)
+        return self._buckets[key]
+
+    def trend(self, freq):
+        """Estadísticos de tendencia (`forecasting.TrendState`) de `buckets(freq)`.
+
+        Se arman una vez y luego `add` los actualiza con los períodos que
+        cambiaron, sin recorrer el resto del historial.
+        """
+        if self._root is not None:
+            return self._root._range_trend(freq, self._bounds, self)
+        if freq not in self._trends:
+            self._trends[freq] = TrendState.from_values(self.buckets(freq)[1])
+        return self._trends[freq]
+
+    def _range_trend(self, freq, bounds, view):
+        if bounds == (None, None):
+            return self.trend(freq)
+        key = (freq,) + bounds
+        state = self._range_trends.get(key)
+        if state is None:
+            state = self._range_trends[key] = TrendState.from_values(view.buckets(freq)[1])
+            # Se descarta el rango guardado hace más tiempo
+            while len(self._range_trends) > RANGE_TRENDS:
+                self._range_trends.pop(next(iter(self._range_trends)), None)
+        return state
+
+    def _compute_buckets(self, freq, dense):
+        if not len(self.days):
+            return np.empty(0, 'datetime64[D]'), np.empty(0, 'float64'), np.empty(0, 'int64')
+        if freq == 'D' and not dense:
+            return EPOCH_DAY + self.days, self.sums, self.counts
+
+        if dense:
+            return self._tail_buckets(freq, self._first_key(freq))
+
+        keys, to_label = bucket_keys(self.days, freq)
+        unique, inverse = np.unique(keys, return_inverse=True)
+        sums = np.bincount(inverse, weights=self.sums, minlength=len(unique))
+        counts = np.bincount(inverse, weights=self.counts, minlength=len(unique)).astype('int64')
+        return to_label(unique), sums, counts
+
+
+def _day_range(days, first, last):
+    """(lo, hi) de los días ordenados `days` entre `first` y `last` (inclusive, None sin límite)."""
+    lo = 0 if first is None else int(np.searchsorted(days, first, 'left'))
+    hi = len(days) if last is None else int(np.searchsorted(days, last, 'right'))
+    return lo, hi
+
+
+def _tighter(value, bound, pick):
+    if value is None:
+        return bound
+    return value if bound is None else pick(value, bound)
+
+
+def _carry_state(state, old, new, first_day, freq):
+    """`state` (de `old.buckets(freq)`) llevado a `new`, que difiere desde `first_day`.
+
+    Devuelve (estado, posición del primer período que cambió, `buckets` de
+    `new` desde ese período), o None si cambió el primer período.
+    """
+    if not len(old) or not len(new) or new._first_key(freq) != old._first_key(freq):
+        return None
+    last = int(bucket_keys(old.days[-1:], freq)[0][0])
+    first_key = min(int(bucket_keys(np.array([first_day]), freq)[0][0]), last + 1)
+    start = first_key - old._first_key(freq)
+    _, old_tail, _ = old._tail_buckets(freq, first_key)
+    tail = new._tail_buckets(freq, first_key)
+    state = state.copy()
+    state.replace_tail(start, tail[1], old_tail)
+    return state, start, tail
+
+
+def _group(keys, codes, sums, counts, width):
+    """Suma `sums` y `counts` por (clave, código); el resultado queda ordenado por clave y código."""
+    if not len(keys):
+        return keys, codes, sums, counts
+    first = keys.min()
+    unique, inverse = np.unique((keys - first) * width + codes, return_inverse=True)
+    return (
+        unique // width + first,
+        unique % width,
+        np.bincount(inverse, weights=sums, minlength=len(unique)),
+        np.bincount(inverse, weights=counts, minlength=len(unique)).astype('int64'),
+    )
+
+
+class CategoryRollup:
+    """Sumas y conteos por día (UTC) y categoría de una serie (p. ej. la descripción de los gastos).
+
+    Es disperso: guarda solo los pares (día, categoría) que tienen filas,
+    ordenados por día y código, así ocupa O(pares) aunque haya miles de
+    categorías. `categories[code]` es el nombre de cada código (None para
+    las filas sin descripción). Igual que `DailyRollup` es inmutable y los
+    agregados por semana o mes salen de los diarios.
+    """
+
+    def __init__(self, categories=(), days=None, codes=None, sums=None, counts=None):
+        self.categories = list(categories)
+        self.days = days if days is not None else np.empty(0, 'int64')
+        self.codes = codes if codes is not None else np.empty(0, 'int64')
+        self.sums = sums if sums is not None else np.empty(0, 'float64')
+        self.counts = counts if counts is not None else np.empty(0, 'int64')
+        self._periods = {}
+
+    def __len__(self):
+        return len(self.days)
+
+    @classmethod
+    def from_columns(cls, ts, amounts, desc):
+        return cls().add(ts, amounts, desc)
+
+    def add(self, ts, amounts, desc):
+        """Devuelve un índice nuevo con las filas agregadas; `desc` es un `pd.Categorical`."""
+        if not len(ts):
+            return self
+        # Los códigos de `desc` son propios de cada tanda: se traducen a los
+        # de este índice y las categorías nuevas van al final
+        categories = self.categories
+        index = {name: code for code, name in enumerate(categories)}
+        names = list(desc.categories) + [None]
+        if any(name not in index for name in names):
+            categories = list(categories)
+            for name in names:
+                if name not in index:
+                    index[name] = len(categories)
+                    categories.append(name)
+        mapping = np.array([index[name] for name in names], 'int64')
+        width = len(categories)
+        new_codes = mapping[np.asarray(desc.codes)]  # -1 (sin descripción) toma el último
+
+        new_days, new_codes, new_sums, new_counts = _group(
+            np.floor_divide(ts, DAY_NS), new_codes, amounts, np.ones(len(ts), 'int64'), width)
+        # Lo nuevo suele caer en los últimos días: solo se rehace la cola del índice
+        split = np.searchsorted(self.days, new_days[0], 'left')
+        tail = _group(
+            np.concatenate([self.days[split:], new_days]),
+            np.concatenate([self.codes[split:], new_codes]),
+            np.concatenate([self.sums[split:], new_sums]),
+            np.concatenate([self.counts[split:], new_counts]),
+            width,
+        )
+        head = (self.days[:split], self.codes[:split], self.sums[:split], self.counts[:split])
+        result = CategoryRollup(categories, *(np.concatenate([h, t]) for h, t in zip(head, tail)))
+        result._carry_periods(self, new_days[0])
+        return result
+
+    def to_snapshot(self):
+        """(info, arreglos) para guardar el índice con `store.save_snapshot`; ver `from_snapshot`."""
+        return {'categories': self.categories}, {
+            'days': self.days, 'codes': self.codes, 'sums': self.sums, 'counts': self.counts}
+
+    @classmethod
+    def from_snapshot(cls, info, arrays):
+        return cls(info['categories'], arrays['days'], arrays['codes'], arrays['sums'], arrays['counts'])
+
+    def _carry_periods(self, previous, first_day):
+        """Reusa los agregados por período de `previous` anteriores a `first_day`; rehace el resto."""
+        width = max(len(self.categories), 1)
+        for freq, cached in previous._periods.items():
+            if freq == 'D':
+                continue
+            first_key = bucket_keys(np.array([first_day]), freq)[0][0]
+            # Ningún período dura más de 31 días
+            lo = np.searchsorted(self.days, first_day - 31, 'left')
+            keys, _ = bucket_keys(self.days[lo:], freq)
+            start = np.searchsorted(keys, first_key, 'left')
+            tail = _group(keys[start:], self.codes[lo + start:], self.sums[lo + start:], self.counts[lo + start:], width)
+            cut = np.searchsorted(cached[0], first_key, 'left')
+            self._periods[freq] = tuple(np.concatenate([c[:cut], t]) for c, t in zip(cached, tail))
+
+    def between(self, start=None, end=None):
+        """Vista de los días entre `start` y `end` (inclusive)."""
+        lo = 0 if start is None else np.searchsorted(self.days, to_day(start), 'left')
+        hi = len(self.days) if end is None else np.searchsorted(self.days, to_day(end), 'right')
+        return CategoryRollup(self.categories, self.days[lo:hi], self.codes[lo:hi], self.sums[lo:hi], self.counts[lo:hi])
+
+    def periods(self, freq):
+        """(claves de período, códigos, sumas, conteos) por período y categoría; se guarda."""
+        if freq not in self._periods:
+            if freq == 'D':
+                self._periods[freq] = (self.days, self.codes, self.sums, self.counts)
+            else:
+                keys, _ = bucket_keys(self.days, freq)
+                self._periods[freq] = _group(keys, self.codes, self.sums, self.counts, max(len(self.categories), 1))
+        return self._periods[freq]
+
+    def _range(self, freq, start, end):
+        """Agregados por período y categoría entre `start` y `end` (inclusive).
+
+        Los períodos enteros salen de `periods(freq)`; solo los de los bordes,
+        que el rango puede cortar, se suman a partir de los días.
+        """
+        keys, codes, sums, counts = self.periods(freq)
+        if start is None and end is None:
+            return keys, codes, sums, counts
+        days = self.between(start, end)
+        if not len(days):
+            return days.days, days.codes, days.sums, days.counts
+        edge_keys, _ = bucket_keys(days.days, freq)
+        first, last = edge_keys[0], edge_keys[-1]
+        lo = np.searchsorted(keys, first, 'right')
+        hi = np.searchsorted(keys, last, 'left')
+        edges = (edge_keys == first) | (edge_keys == last)
+        grouped = _group(edge_keys[edges], days.codes[edges], days.sums[edges], days.counts[edges],
+                         max(len(self.categories), 1))
+        split = np.searchsorted(grouped[0], first, 'right')
+        return tuple(
+            np.concatenate([edge[:split], full[lo:hi], edge[split:]])
+            for edge, full in zip(grouped, (keys, codes, sums, counts))
+        )
+
+    def top(self, freq, n, start=None, end=None, contains=None):
+        """Las `n` categorías de mayor suma de cada período entre `start` y `end`.
+
+        `contains` deja solo las categorías cuyo nombre lo incluye (sin
+        distinguir mayúsculas). Devuelve un dict con `labels` (datetime64[D],
+        como en `bucket_keys`), `sums` y `counts` por período, y las filas
+        del top: `period` (posición en `labels`), `codes`, `top_sums` y
+        `top_counts`, ordenadas por período y suma descendente.
+        """
+        keys, codes, sums, counts = self._range(freq, start, end)
+        if contains:
+            text = contains.lower()
+            selected = np.array([name is not None and text in str(name).lower() for name in self.categories], bool)
+            keep = selected[codes]
+            keys, codes, sums, counts = keys[keep], codes[keep], sums[keep], counts[keep]
+
+        # Las filas vienen ordenadas por clave: cada período es un tramo contiguo
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, 'int64')
+        bounds = np.r_[starts, len(keys)]
+        chosen = []
+        for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            # Las `n` mayores sin ordenar todo el período; luego solo esas
+            candidates = np.arange(lo, hi) if hi - lo <= n else lo + np.argpartition(-sums[lo:hi], n - 1)[:n]
+            chosen.append(candidates[np.lexsort((codes[candidates], -sums[candidates]))])
+        chosen = np.concatenate(chosen) if chosen else np.empty(0, 'int64')
+        return {
+            'labels': PERIOD_LABELS[freq](keys[starts]),
+            'sums': np.add.reduceat(sums, starts) if len(keys) else np.empty(0, 'float64'),
+            'counts': np.add.reduceat(counts, starts) if len(keys) else np.empty(0, 'int64'),
+            'period': np.searchsorted(starts, chosen, 'right') - 1,
+            'codes': codes[chosen],
+            'top_sums': sums[chosen],
+            'top_counts': counts[chosen],
+        }
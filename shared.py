@@ -0,0 +1,243 @@
+"""Datos compartidos entre varios procesos de la app (p. ej. workers de gunicorn).
+
+La instantánea columnar de `SNAPSHOT_DIR` (ver `store.save_snapshot`) hace
+de segmento compartido: un solo proceso, el líder, consulta el upstream y la
+reescribe tras cada sincronización con cambios; el resto la mapea en memoria
+de solo lectura cada vez que cambia el puntero `CURRENT`. Los DataFrames de
+los seguidores son vistas de esos arreglos, así que todos comparten las
+mismas páginas y agregar workers no multiplica la memoria ni las consultas.
+
+El líder es quien tiene el `flock` de `LEADER` en la carpeta; si muere, el
+sistema libera el lock y el siguiente proceso que lo pida toma su lugar.
+También puede hacer de líder un proceso aparte (`flask --app app sync-loop`)
+y dejar a los workers solo leyendo.
+"""
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+from store import Columns, current_snapshot, load_snapshot
+from sync import Dataset, aggregates_from_snapshot
+
+LEADER_LOCK = 'LEADER'
+REFRESH_MARKER = 'REFRESH'
+
+
+def _try_lock(f):
+    """Toma el lock exclusivo de `f` sin esperar; False si lo tiene otro proceso."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            # En Windows se bloquea el primer byte; se libera al cerrar el archivo
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+class SharedDataset:
+    """Sincronización de `data_sync` compartida a través de `directory`.
+
+    `load()` es el `loader` de la caché de datos de cada proceso: en el líder
+    sincroniza (a lo sumo una vez cada `interval` segundos, salvo que se pida
+    una actualización) y en los seguidores mapea la última instantánea. El
+    líder además sincroniza desde un hilo propio, así los datos se renuevan
+    aunque no le lleguen peticiones (ver `start`). `data_sync` debe guardar la
+    instantánea en `directory` tras cada cambio.
+    """
+
+    def __init__(self, data_sync, directory, interval=60.0, poll=1.0, first_wait=30.0):
+        if fcntl is None and msvcrt is None:
+            # Sin lock entre procesos todos se creerían líderes y consultarían el upstream
+            raise RuntimeError('SHARED_DATA=1 necesita fcntl o msvcrt para elegir un solo líder')
+        self.data_sync = data_sync
+        self.directory = directory
+        self.interval = interval
+        self.poll = poll
+        self.first_wait = first_wait
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_file = None
+        self._mapped = None
+        self._dataset = None
+        self._last_sync = None
+        self._refresh_seen = None
+        self._pending_refresh = False
+        self.listeners = []
+
+        self.syncs = 0
+        self.maps = 0
+        self.errors = 0
+
+    @property
+    def is_leader(self):
+        return self._lock_file is not None
+
+    def _try_lead(self):
+        if self._lock_file is not None:
+            return True
+        os.makedirs(self.directory, exist_ok=True)
+        f = open(os.path.join(self.directory, LEADER_LOCK), 'a+')
+        if not _try_lock(f):
+            f.close()
+            return False
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        self._lock_file = f
+        # El estado incremental (ids, marcas de agua) parte de la última
+        # instantánea, que cuenta como sincronización reciente
+        if self.data_sync.load_snapshot(self.directory):
+            self._last_sync = time.monotonic()
+        self._refresh_seen = self._refresh_request()[0]
+        return True
+
+    def start(self):
+        """Toma el liderazgo si está libre y arranca el hilo que sincroniza o sigue la instantánea.
+
+        En los seguidores el hilo mapea las versiones nuevas apenas aparecen
+        y vuelve a pedir el lock, por si el líder terminó.
+        """
+        with self._lock:
+            self._try_lead()
+        if self._thread is None and self.poll > 0:
+            self._thread = threading.Thread(target=self._loop, name='shared-sync', daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while not self._stop.wait(self.poll):
+            try:
+                with self._lock:
+                    if self._try_lead():
+                        self._sync_if_due()
+                    else:
+                        self._follow()
+            except Exception as e:
+                print(f"Error en la sincronización compartida: {e}")
+                self.errors += 1
+
+    def load(self):
+        with self._lock:
+            if self._try_lead():
+                return self._sync_if_due()
+            return self._follow(wait=self.first_wait)
+
+    def current(self):
+        """Los datos vigentes en este proceso, sin sincronizar ni esperar al líder."""
+        with self._lock:
+            if self.is_leader:
+                return self.data_sync.dataset()
+            return self._follow()
+
+    def add_listener(self, fn):
+        """Registra `fn(dataset)`, que se llama cuando un seguidor mapea una instantánea nueva."""
+        self.listeners.append(fn)
+
+    def _refresh_request(self):
+        """(mtime, contenido) del aviso de actualización de los seguidores, o (None, None)."""
+        path = os.path.join(self.directory, REFRESH_MARKER)
+        try:
+            with open(path, encoding='utf-8') as f:
+                return os.fstat(f.fileno()).st_mtime_ns, f.read().strip()
+        except FileNotFoundError:
+            return None, None
+
+    def _sync_if_due(self):
+        seen, kind = self._refresh_request()
+        if seen != self._refresh_seen:
+            self._refresh_seen = seen
+            self._pending_refresh = True
+            if kind == 'full':
+                self.data_sync.reset()
+        due = self._last_sync is None or time.monotonic() - self._last_sync >= self.interval
+        if not (self._pending_refresh or due):
+            return self.data_sync.dataset()
+        self._pending_refresh = False
+        self._last_sync = time.monotonic()
+        self.syncs += 1
+        return self.data_sync.sync()
+
+    def _follow(self, wait=0.0):
+        name = current_snapshot(self.directory)
+        # Sin ninguna instantánea todavía, esperar un poco a que el líder guarde la primera
+        deadline = time.monotonic() + wait
+        while name is None and self._dataset is None and time.monotonic() < deadline:
+            time.sleep(0.1)
+            name = current_snapshot(self.directory)
+        if name is not None and name != self._mapped:
+            # None si el líder la reemplazó dos veces mientras se leía: se reintenta
+            snapshot = load_snapshot(self.directory, aggregates=True)
+            if snapshot is not None:
+                self._dataset = self._build(*snapshot)
+                self._mapped = name
+                self.maps += 1
+                for fn in self.listeners:
+                    try:
+                        fn(self._dataset)
+                    except Exception as e:
+                        print(f"Error en listener de datos compartidos: {e}")
+        if self._dataset is None:
+            return self.data_sync.dataset()
+        return self._dataset
+
+    def _build(self, series, meta, aggregates):
+        # Los agregados vienen en la instantánea; de la versión anterior solo
+        # se toman los estadísticos de tendencia, que se ponen al día
+        previous = self._dataset.rollups if self._dataset is not None else {}
+        frames = {}
+        rollups = {}
+        breakdowns = {}
+        for field, build in self.data_sync.builders.items():
+            cols = series.get(field, Columns.empty())
+            frames[field] = build(cols)
+            rollups[field], breakdown = aggregates_from_snapshot(cols, aggregates.get(field, {}))
+            if field in previous:
+                rollups[field].carry_trends_from(previous[field])
+            if breakdown is not None:
+                breakdowns[field] = breakdown
+        return Dataset(frames['ventaBoletos'], frames['gastos'], rollups, meta.get('version', 0), meta.get('updated_at'),
+                       breakdowns)
+
+    def request_refresh(self, full=False):
+        """Pide una sincronización: en el líder en su próxima carga, en un seguidor avisando al líder."""
+        if self.is_leader:
+            if full:
+                self.data_sync.reset()
+            self._pending_refresh = True
+            return
+        marker = os.path.join(self.directory, REFRESH_MARKER)
+        tmp = f'{marker}.{os.getpid()}'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write('full' if full else 'delta')
+        os.replace(tmp, marker)
+
+    def stats(self):
+        return {
+            'leader': self.is_leader,
+            'pid': os.getpid(),
+            'snapshot': self._mapped,
+            'syncs': self.syncs,
+            'maps': self.maps,
+            'errors': self.errors,
+        }
+
+    def close(self):
+        self._stop.set()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
@@ -0,0 +1,222 @@
+"""Orígenes de datos de ventas y gastos.
+
+Todos ofrecen `fetch(field, desde=None)`, que devuelve las filas de la serie
+como `store.Columns` (o None si falla), y `fetch_many({field: args})` para
+pedir varias series a la vez. `supports_filter` indica si `desde` (marca de
+agua de `DataSync`) se respeta o si hay que comparar por `id`; si el API lo
+rechaza, `fetch` lanza `sync.FilterRejected` en lugar de devolver None.
+
+- `GraphQLSource`: el API en vivo.
+- `AsyncGraphQLSource`: el API en vivo con consultas asíncronas (modo ASGI).
+- `FileSource`: volcados JSON como los de `data/`.
+- `SyntheticSource`: datos generados con `synthetic.py`, deterministas.
+
+Las respuestas y los volcados se leen por partes con `ingest.read_columns`,
+sin cargar el documento ni un dict por registro a la vez.
+"""
+import contextlib
+import functools
+import json
+import os
+import queue
+
+import numpy as np
+
+import metrics
+from ingest import GraphQLError, decode_chunks, parse_timestamps, read_columns
+from metrics import stage
+from store import Columns
+from sync import SERIES, FilterRejected
+
+READ_CHUNK = 1 << 20
+STREAM_CHUNK = 1 << 16
+
+source_requests = metrics.registry.counter(
+    'upstream_requests_total', 'Consultas al origen de datos por campo y resultado', ('field', 'outcome'))
+
+
+@contextlib.contextmanager
+def rejected_filter(field, desde):
+    """Convierte el error de validación de una consulta con `desde` en `FilterRejected`."""
+    try:
+        yield
+    except GraphQLError as e:
+        if desde and e.rejects_arguments:
+            raise FilterRejected(f"el API no acepta el filtro de {field}") from e
+        raise
+
+
+class Source:
+    supports_filter = False
+
+    def fetch(self, field, desde=None):
+        with stage('fetch'):
+            try:
+                cols = self._fetch(field, desde)
+            except FilterRejected:
+                source_requests.inc(field, 'rejected')
+                raise
+            except Exception as e:
+                print(f"Error al leer {field}: {e}")
+                cols = None
+        source_requests.inc(field, 'ok' if cols is not None else 'error')
+        return cols
+
+    def _fetch(self, field, desde):
+        raise NotImplementedError
+
+    def fetch_many(self, args_by_field):
+        results = {}
+        for field, args in args_by_field.items():
+            try:
+                results[field] = self.fetch(*args)
+            except FilterRejected as e:
+                results[field] = e
+        return results
+
+
+class GraphQLSource(Source):
+    """Consulta el API GraphQL con un `fetcher.GraphQLClient` compartido.
+
+    `fields[field]` son los subcampos pedidos; con `delta_arg` se pide solo
+    lo posterior a `desde` (p. ej. `ventaBoletos(desde: "...")`).
+    """
+
+    def __init__(self, client, fields, delta_arg=''):
+        self.client = client
+        self.fields = fields
+        self.delta_arg = delta_arg
+        self.supports_filter = bool(delta_arg)
+
+    def query(self, field, desde=None):
+        args = f'({self.delta_arg}: {json.dumps(desde)})' if desde and self.delta_arg else ''
+        return """
+        query {
+          %s%s {
+            %s
+          }
+        }""" % (field, args, "\n            ".join(self.fields[field]))
+
+    def _fetch(self, field, desde):
+        response = self.client.stream(self.query(field, desde))
+        if response is None:
+            return None
+        with response:
+            size = int(response.headers.get('Content-Length') or 0)
+            chunks = decode_chunks(response.iter_content(STREAM_CHUNK))
+            with rejected_filter(field, desde):
+                return read_columns(chunks, field, *SERIES[field], size_hint=size)
+
+    def fetch_many(self, args_by_field):
+        # Las consultas van en paralelo sobre la misma sesión
+        return self.client.gather(self.fetch, args_by_field)
+
+
+class AsyncGraphQLSource(GraphQLSource):
+    """`GraphQLSource` que además consulta con un `fetcher.AsyncGraphQLClient` (ver asgi.py).
+
+    Las respuestas se descargan en el event loop y se leen por partes en un
+    hilo de `executor` a medida que llegan, así que esperar al upstream no
+    ocupa hilos. `fetch` sigue siendo síncrono (con `client`).
+    """
+
+    def __init__(self, client, async_client, fields, delta_arg='', executor=None):
+        super().__init__(client, fields, delta_arg)
+        self.async_client = async_client
+        self.executor = executor
+
+    async def fetch_async(self, field, desde=None):
+        with stage('fetch'):
+            try:
+                cols = await self._fetch_async(field, desde)
+            except FilterRejected:
+                source_requests.inc(field, 'rejected')
+                raise
+            except Exception as e:
+                print(f"Error al leer {field}: {e}")
+                cols = None
+        source_requests.inc(field, 'ok' if cols is not None else 'error')
+        return cols
+
+    async def _fetch_async(self, field, desde):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        async with self.async_client.stream(self.query(field, desde)) as response:
+            if response is None:
+                return None
+            size = int(response.headers.get('Content-Length') or 0)
+            chunks = queue.SimpleQueue()
+            parse = functools.partial(
+                read_columns, decode_chunks(iter(chunks.get, None)), field, *SERIES[field], size_hint=size)
+            parsing = loop.run_in_executor(self.executor, parse)
+            try:
+                async for chunk in response.aiter_bytes(STREAM_CHUNK):
+                    chunks.put(chunk)
+            except BaseException:
+                chunks.put(None)
+                await asyncio.wait([parsing])
+                raise
+            chunks.put(None)
+            with rejected_filter(field, desde):
+                return await parsing
+
+    async def fetch_many_async(self, args_by_field):
+        import asyncio
+        results = await asyncio.gather(
+            *(self.fetch_async(*args) for args in args_by_field.values()), return_exceptions=True)
+        return dict(zip(args_by_field, results))
+
+
+class FileSource(Source):
+    """Volcados JSON (`{"data": {field: [...]}}`), uno por serie.
+
+    Con `desde` solo se devuelven las filas con fecha >= `desde`, y si el
+    archivo no cambió desde la última lectura no se vuelve a leer: todo lo
+    que tiene ya se entregó.
+    """
+
+    supports_filter = True
+
+    def __init__(self, paths, chunk_size=READ_CHUNK):
+        self.paths = paths
+        self.chunk_size = chunk_size
+        self._read = {}
+
+    @classmethod
+    def from_directory(cls, directory):
+        """Volcados `<field>.json` de `directory` (p. ej. los de `synthetic.py --out`)."""
+        return cls({field: os.path.join(directory, f'{field}.json') for field in SERIES})
+
+    def _fetch(self, field, desde):
+        path = self.paths[field]
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if desde and self._read.get(field) == signature:
+            return Columns.empty(with_desc=SERIES[field][2] is not None)
+        with open(path, encoding='utf-8') as f:
+            chunks = iter(functools.partial(f.read, self.chunk_size), '')
+            cols = read_columns(chunks, field, *SERIES[field], size_hint=stat.st_size)
+        self._read[field] = signature
+        if desde:
+            cols = cols.take(cols.ts >= parse_timestamps([desde])[0])
+        return cols
+
+
+class SyntheticSource(Source):
+    """Historial sintético (ver `synthetic.generate`), el mismo en cada corrida."""
+
+    supports_filter = True
+
+    def __init__(self, ventas=10_000, gastos=10_000, seed=0, start='2023-01-01', days=730):
+        self.options = dict(ventas=ventas, gastos=gastos, seed=seed, start=start, days=days)
+        self._series = None
+
+    def _fetch(self, field, desde):
+        if self._series is None:
+            import synthetic
+            self._series = synthetic.generate(**self.options)
+        cols = self._series[field]
+        if desde:
+            since = parse_timestamps([desde])[0]
+            cols = cols.take(slice(int(np.searchsorted(cols.ts, since, 'left')), None))
+        return cols
@@ -11,23 +11,34 @@ document.addEventListener('DOMContentLoaded', function() {
   let gananciasChart = initChart('gananciasChart', 'Ganancias', 'rgba(54, 162, 235, 0.2)', 'rgba(54, 162, 235, 1)');
   let gastosChart = initChart('gastosChart', 'Gastos', 'rgba(255, 99, 132, 0.2)', 'rgba(255, 99, 132, 1)');
   let predictionChart = initPredictionChart('predictionChart');
+  // Versión de los datos mostrados (cabecera X-Data-Version de /get_dashboard)
+  let loadedVersion = null;
+  // Cargas de /get_dashboard en curso y la versión que anunció /stream mientras tanto
+  let loadsInFlight = 0;
+  let announcedVersion = null;
+  // `max_points` con que se pidió lo que se muestra (los deltas no deben pasarse de ese tope)
+  let loadedMaxPoints = null;
   
   // Cargar datos iniciales
   loadData();
+  listenForChanges();
   
   // Event listeners
   document.getElementById('refresh-button').addEventListener('click', function() {
-      loadData();
-      document.getElementById('status-message').textContent = 'Datos actualizados...';
+      // Invalidar la caché del servidor antes de recargar
+      fetch('/refresh_data', { method: 'POST' })
+        .catch(error => console.error('Error al invalidar la caché:', error))
+        .finally(() => {
+          loadData();
+          document.getElementById('status-message').textContent = 'Datos actualizados...';
+        });
   });
   
-  document.getElementById('chart-type').addEventListener('change', loadData);
-  document.getElementById('start-date').addEventListener('change', loadData);
-  document.getElementById('end-date').addEventListener('change', loadData);
-  
-  document.getElementById('predict-button').addEventListener('click', function() {
-      generatePredictions();
-  });
+  // Cualquier control vuelve a pedir el dashboard completo en una sola petición
+  for (const id of ['chart-type', 'start-date', 'end-date', 'model-type', 'prediction-days', 'prediction-period']) {
+      document.getElementById(id).addEventListener('change', loadData);
+  }
+  document.getElementById('predict-button').addEventListener('click', loadData);
   
   // Función para inicializar un gráfico básico
   function initChart(canvasId, label, bgColor, borderColor) {
@@ -108,6 +119,21 @@ document.addEventListener('DOMContentLoaded', function() {
                       backgroundColor: 'rgba(255, 99, 132, 0.2)',
                       borderWidth: 2,
                       borderDash: [5, 5]
+                  },
+                  {
+                      label: 'Utilidad Neta Real',
+                      data: [],
+                      borderColor: 'rgba(75, 192, 192, 1)',
+                      backgroundColor: 'rgba(75, 192, 192, 0.2)',
+                      borderWidth: 2
+                  },
+                  {
+                      label: 'Utilidad Neta Predicha',
+                      data: [],
+                      borderColor: 'rgba(75, 192, 192, 1)',
+                      backgroundColor: 'rgba(75, 192, 192, 0.2)',
+                      borderWidth: 2,
+                      borderDash: [5, 5]
                   }
               ]
           },
@@ -154,204 +180,383 @@ document.addEventListener('DOMContentLoaded', function() {
       });
   }
   
-  // Función para cargar datos - VERSIÓN CORREGIDA
+  // Pide la respuesta en formato binario (ver encoding.py); los errores llegan como JSON.
+  // Con 'no-cache' el navegador revalida con If-None-Match y, si los datos no
+  // cambiaron, el servidor responde 304 y se reutiliza la copia local.
+  // Devuelve {data, version}, con la versión de los datos de la respuesta.
+  function fetchCompact(url) {
+      return fetch(`${url}&format=binary`, { cache: 'no-cache' }).then(response => {
+          if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+          }
+          const version = Number(response.headers.get('X-Data-Version'));
+          const body = (response.headers.get('Content-Type') || '').startsWith('application/octet-stream') ?
+            response.arrayBuffer().then(decodeBinary) : response.json();
+          return body.then(data => ({ data, version }));
+      });
+  }
+
+  // Reconstruye el mismo objeto que devuelve el formato JSON
+  function decodeBinary(buffer) {
+      const headerLength = new DataView(buffer).getUint32(0, true);
+      const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+      const start = 4 + headerLength;
+      const result = header.meta;
+      if (!result) {
+        return result;
+      }
+      for (const [path, entry] of Object.entries(header.series)) {
+          const values = new Float64Array(buffer, start + entry.data, entry.length);
+          const offsets = new Int32Array(buffer, start + entry.offsets, entry.length);
+          const base = Date.parse(`${entry.base}T00:00:00Z`);
+          const step = entry.unit === 's' ? 1000 : 86400000;
+          const keys = path.split('.');
+          const parent = keys.slice(0, -1).reduce((obj, key) => obj[key], result);
+          parent[keys[keys.length - 1]] = {
+              labels: Array.from(offsets, offset => formatLabel(new Date(base + offset * step), entry.format)),
+              data: Array.from(values)
+          };
+      }
+      return result;
+  }
+
+  function formatLabel(date, format) {
+      const iso = date.toISOString();
+      if (format === 'timestamp') {
+        return iso;
+      }
+      return iso.slice(0, format === 'month' ? 7 : 10);
+  }
+
+  // Carga gráficos, pronósticos y utilidad neta con una sola petición a
+  // /get_dashboard, así todo sale de la misma versión de los datos
   function loadData() {
     const chartType = document.getElementById('chart-type').value;
     const startDate = document.getElementById('start-date').value;
     const endDate = document.getElementById('end-date').value;
+    const modelType = document.getElementById('model-type').value;
+    const predictionDays = document.getElementById('prediction-days').value;
+    const predictionPeriod = document.getElementById('prediction-period').value;
+    // No tiene sentido pedir más puntos que píxeles de ancho del gráfico
+    const maxPoints = Math.max(document.getElementById('gananciasChart').clientWidth, 100);
 
     // Mostrar indicador de carga
     document.getElementById('status-message').textContent = 'Cargando datos...';
-    
-    fetch(`/get_data?chart_type=${chartType}&start_date=${startDate}&end_date=${endDate}`)
-      .then(response => {
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        return response.json();
-      })
-      .then(data => {
-        // Validación básica de la estructura de datos
+    document.getElementById('prediction-metrics').innerHTML = '<p>Generando predicciones...</p>';
+
+    loadsInFlight += 1;
+    fetchCompact(`/get_dashboard?chart_type=${chartType}&start_date=${startDate}&end_date=${endDate}&max_points=${maxPoints}` +
+                 `&model_type=${modelType}&prediction_days=${predictionDays}&prediction_period=${predictionPeriod}`)
+      .then(({ data, version }) => {
+        loadedVersion = version;
+        loadedMaxPoints = maxPoints;
         if (!data || (typeof data !== 'object')) {
           throw new Error('Formato de datos inválido');
         }
-
-        // Manejo robusto de ganancias
-        if (data.ganancias) {
-          try {
-            // Asegurar que tenemos arrays válidos
-            const gananciasLabels = Array.isArray(data.ganancias.labels) ? data.ganancias.labels : [];
-            const gananciasData = Array.isArray(data.ganancias.data) ? data.ganancias.data : [];
-            
-            // Normalizar datos (convertir a números y manejar valores faltantes)
-            const normalizedGananciasData = gananciasData.map(d => {
-              const num = Number(d);
-              return isNaN(num) ? 0 : num;
-            });
-            
-            // Emparejar labels con datos (tomar el mínimo de ambos)
-            const minLength = Math.min(gananciasLabels.length, normalizedGananciasData.length);
-            const pairedGananciasLabels = gananciasLabels.slice(0, minLength);
-            const pairedGananciasData = normalizedGananciasData.slice(0, minLength);
-            
-            // Actualizar gráfico
-            gananciasChart.data.labels = pairedGananciasLabels;
-            gananciasChart.data.datasets[0].data = pairedGananciasData;
-            gananciasChart.update();
-            
-            document.getElementById('status-message').textContent = 
-              `Ganancias: ${pairedGananciasData.length} registros válidos`;
-            
-            if (gananciasLabels.length !== normalizedGananciasData.length) {
-              console.warn(`Ganancias: Se esperaban ${gananciasLabels.length} labels pero hay ${normalizedGananciasData.length} datos. Usando ${minLength} puntos.`);
-            }
-          } catch (e) {
-            console.error('Error procesando datos de ganancias:', e);
-          }
-        }
-
-        // Manejo robusto de gastos
-        if (data.gastos) {
-          try {
-            // Asegurar que tenemos arrays válidos
-            const gastosLabels = Array.isArray(data.gastos.labels) ? data.gastos.labels : [];
-            const gastosData = Array.isArray(data.gastos.data) ? data.gastos.data : [];
-            
-            // Normalizar datos (convertir a números y manejar valores faltantes)
-            const normalizedGastosData = gastosData.map(d => {
-              const num = Number(d);
-              return isNaN(num) ? 0 : num;
-            });
-            
-            // Si no hay labels, crear unos genéricos basados en el índice
-            const finalGastosLabels = gastosLabels.length > 0 ? 
-              gastosLabels.slice(0, normalizedGastosData.length) : 
-              Array.from({length: normalizedGastosData.length}, (_, i) => `Dato ${i+1}`);
-            
-            // Actualizar gráfico
-            gastosChart.data.labels = finalGastosLabels;
-            gastosChart.data.datasets[0].data = normalizedGastosData;
-            gastosChart.update();
-            
-            document.getElementById('status-message').textContent += 
-              ` | Gastos: ${normalizedGastosData.length} registros`;
-            
-            if (gastosLabels.length > 0 && gastosLabels.length !== normalizedGastosData.length) {
-              console.warn(`Gastos: Se esperaban ${gastosLabels.length} labels pero hay ${normalizedGastosData.length} datos. Usando ${Math.min(gastosLabels.length, normalizedGastosData.length)} puntos.`);
-            }
-          } catch (e) {
-            console.error('Error procesando datos de gastos:', e);
-          }
-        }
+        renderCharts(data.chart);
+        renderPredictions(data.predictions, data.net, modelType);
       })
       .catch(error => {
         console.error('Error:', error);
         document.getElementById('status-message').textContent = 'Error al cargar datos: ' + error.message;
+        document.getElementById('prediction-metrics').innerHTML =
+            `<div class="alert alert-danger">Error al generar predicciones: ${error.message}</div>`;
+      })
+      .finally(() => {
+        loadsInFlight -= 1;
+        // Si /stream anunció una versión posterior a la que trajo la carga, se vuelve a pedir
+        const announced = announcedVersion;
+        announcedVersion = null;
+        if (!loadsInFlight && announced !== null && loadedVersion !== null && announced > loadedVersion) {
+          loadData();
+        }
+      });
+  }
+
+  // Gráficos de ganancias y gastos
+  function renderCharts(data) {
+    // Validación básica de la estructura de datos
+    if (!data || (typeof data !== 'object')) {
+      throw new Error('Formato de datos inválido');
+    }
+
+    // Manejo robusto de ganancias
+    if (data.ganancias) {
+      try {
+        // Asegurar que tenemos arrays válidos
+        const gananciasLabels = Array.isArray(data.ganancias.labels) ? data.ganancias.labels : [];
+        const gananciasData = Array.isArray(data.ganancias.data) ? data.ganancias.data : [];
+        
+        // Normalizar datos (convertir a números y manejar valores faltantes)
+        const normalizedGananciasData = gananciasData.map(d => {
+          const num = Number(d);
+          return isNaN(num) ? 0 : num;
+        });
+        
+        // Emparejar labels con datos (tomar el mínimo de ambos)
+        const minLength = Math.min(gananciasLabels.length, normalizedGananciasData.length);
+        const pairedGananciasLabels = gananciasLabels.slice(0, minLength);
+        const pairedGananciasData = normalizedGananciasData.slice(0, minLength);
+        
+        // Actualizar gráfico
+        gananciasChart.data.labels = pairedGananciasLabels;
+        gananciasChart.data.datasets[0].data = pairedGananciasData;
+        gananciasChart.update();
+        
+        document.getElementById('status-message').textContent = 
+          `Ganancias: ${pairedGananciasData.length} registros válidos`;
+        
+        if (gananciasLabels.length !== normalizedGananciasData.length) {
+          console.warn(`Ganancias: Se esperaban ${gananciasLabels.length} labels pero hay ${normalizedGananciasData.length} datos. Usando ${minLength} puntos.`);
+        }
+      } catch (e) {
+        console.error('Error procesando datos de ganancias:', e);
+      }
+    }
+
+    // Manejo robusto de gastos
+    if (data.gastos) {
+      try {
+        // Asegurar que tenemos arrays válidos
+        const gastosLabels = Array.isArray(data.gastos.labels) ? data.gastos.labels : [];
+        const gastosData = Array.isArray(data.gastos.data) ? data.gastos.data : [];
+        
+        // Normalizar datos (convertir a números y manejar valores faltantes)
+        const normalizedGastosData = gastosData.map(d => {
+          const num = Number(d);
+          return isNaN(num) ? 0 : num;
+        });
+        
+        // Si no hay labels, crear unos genéricos basados en el índice
+        const finalGastosLabels = gastosLabels.length > 0 ? 
+          gastosLabels.slice(0, normalizedGastosData.length) : 
+          Array.from({length: normalizedGastosData.length}, (_, i) => `Dato ${i+1}`);
+        
+        // Actualizar gráfico
+        gastosChart.data.labels = finalGastosLabels;
+        gastosChart.data.datasets[0].data = normalizedGastosData;
+        gastosChart.update();
+        
+        document.getElementById('status-message').textContent += 
+          ` | Gastos: ${normalizedGastosData.length} registros`;
+        
+        if (gastosLabels.length > 0 && gastosLabels.length !== normalizedGastosData.length) {
+          console.warn(`Gastos: Se esperaban ${gastosLabels.length} labels pero hay ${normalizedGastosData.length} datos. Usando ${Math.min(gastosLabels.length, normalizedGastosData.length)} puntos.`);
+        }
+      } catch (e) {
+        console.error('Error procesando datos de gastos:', e);
+      }
+    }
+  }
+
+  // Cambios en vivo (/stream): cada sincronización con filas nuevas llega como
+  // 'delta' y se agrega a los gráficos sin volver a pedir todo. Ante 'resync'
+  // (la serie se reemplazó o el cliente se atrasó) o una versión salteada se
+  // recarga. El navegador reconecta solo si se corta la conexión; si el
+  // servidor la rechaza (503: /stream desactivado o lleno) se sigue sin cambios
+  // en vivo.
+  function listenForChanges() {
+      if (!window.EventSource || document.body.dataset.stream !== '1') {
+        return;
+      }
+      const source = new EventSource('/stream');
+      source.addEventListener('error', () => {
+          if (source.readyState === EventSource.CLOSED) {
+            source.close();
+            console.info('Sin cambios en vivo: el servidor rechazó /stream');
+          }
+      });
+      source.addEventListener('version', event => {
+          const version = JSON.parse(event.data).version;
+          // La carga en curso (p. ej. la inicial) ya trae esta versión o una
+          // posterior; se compara al terminar
+          if (loadsInFlight) {
+            announcedVersion = version;
+            return;
+          }
+          if (version !== loadedVersion) {
+            loadData();
+          }
+      });
+      source.addEventListener('resync', loadData);
+      source.addEventListener('delta', event => {
+          const delta = JSON.parse(event.data);
+          if (loadedVersion === null || delta.version <= loadedVersion) {
+            return;
+          }
+          if (delta.version !== loadedVersion + 1) {
+            loadData();
+            return;
+          }
+          if (applyDelta(delta)) {
+            loadedVersion = delta.version;
+          } else {
+            loadData();
+          }
       });
   }
 
-  // Función para generar predicciones
-  function generatePredictions() {
-      const modelType = document.getElementById('model-type').value;
-      const predictionDays = document.getElementById('prediction-days').value;
-      const predictionPeriod = document.getElementById('prediction-period').value;
-      
-      // Mostrar indicador de carga
-      document.getElementById('prediction-metrics').innerHTML = '<p>Generando predicciones...</p>';
-      
-      fetch(`/get_predictions?model_type=${modelType}&prediction_days=${predictionDays}&prediction_period=${predictionPeriod}`)
-          .then(response => {
-            if (!response.ok) {
-              throw new Error(`HTTP error! status: ${response.status}`);
+  // Serie en formato columnar (ver encoding.py) -> [[etiqueta, valor], ...]
+  function decodeColumnar(series, format) {
+      const base = Date.parse(`${series.base}T00:00:00Z`);
+      const step = series.unit === 's' ? 1000 : 86400000;
+      return series.offsets.map((offset, i) => [formatLabel(new Date(base + offset * step), format), series.data[i]]);
+  }
+
+  // Agrega los cambios al gráfico según el tipo: en diario se reemplaza el total
+  // de cada día, en mensual se suman las filas nuevas al mes y en separado o
+  // combinado se insertan las filas en orden. En separado o combinado el
+  // servidor reduce las filas a `max_points` (ver /get_data): si con las nuevas
+  // se pasaría del tope, no se agregan y devuelve false para pedir la serie ya
+  // reducida; por debajo del tope lo que se agrega es lo mismo que enviaría.
+  function applyDelta(delta) {
+      const chartType = document.getElementById('chart-type').value;
+      const startDate = document.getElementById('start-date').value;
+      const endDate = document.getElementById('end-date').value;
+      const inRange = label => label.slice(0, 10) >= startDate && label.slice(0, 10) <= endDate;
+
+      if (chartType !== 'daily' && chartType !== 'monthly') {
+        for (const [key, chart] of [['ganancias', gananciasChart], ['gastos', gastosChart]]) {
+            const changes = delta[key];
+            if (!changes) {
+              continue;
             }
-            return response.json();
-          })
-          .then(data => {
-              if (!data) {
-                  throw new Error('No se recibieron datos de predicción');
+            const added = decodeColumnar(changes.rows, key === 'ganancias' ? 'timestamp' : 'date')
+              .filter(([label]) => inRange(label)).length;
+            if (loadedMaxPoints !== null && chart.data.labels.length + added > loadedMaxPoints) {
+              return false;
+            }
+        }
+      }
+
+      for (const [key, chart] of [['ganancias', gananciasChart], ['gastos', gastosChart]]) {
+          const changes = delta[key];
+          if (!changes) {
+            continue;
+          }
+          const labels = chart.data.labels;
+          const values = chart.data.datasets[0].data;
+          const at = label => {
+              let lo = 0, hi = labels.length;
+              while (lo < hi) {
+                  const mid = (lo + hi) >> 1;
+                  if (labels[mid] <= label) { lo = mid + 1; } else { hi = mid; }
               }
-              
-              // Validación y normalización de datos de predicción
-              try {
-                // Ganancias reales
-                const gananciasRealLabels = Array.isArray(data.ganancias?.real?.labels) ? data.ganancias.real.labels : [];
-                const gananciasRealData = Array.isArray(data.ganancias?.real?.data) ? 
-                  data.ganancias.real.data.map(d => Number(d)) : [];
-                
-                // Ganancias predichas
-                const gananciasPredictedLabels = Array.isArray(data.ganancias?.predicted?.labels) ? 
-                  data.ganancias.predicted.labels : [];
-                const gananciasPredictedData = Array.isArray(data.ganancias?.predicted?.data) ? 
-                  data.ganancias.predicted.data.map(d => Number(d)) : [];
-                
-                // Gastos reales
-                const gastosRealData = Array.isArray(data.gastos?.real?.data) ? 
-                  data.gastos.real.data.map(d => Number(d)) : [];
-                
-                // Gastos predichos
-                const gastosPredictedData = Array.isArray(data.gastos?.predicted?.data) ? 
-                  data.gastos.predicted.data.map(d => Number(d)) : [];
-                
-                // Actualizar gráfico de predicción
-                predictionChart.data.labels = [
-                    ...gananciasRealLabels,
-                    ...gananciasPredictedLabels
-                ];
-                
-                predictionChart.data.datasets[0].data = [
-                    ...gananciasRealData,
-                    ...Array(gananciasPredictedLabels.length).fill(null)
-                ];
-                
-                predictionChart.data.datasets[1].data = [
-                    ...Array(gananciasRealLabels.length).fill(null),
-                    ...gananciasPredictedData
-                ];
-                
-                predictionChart.data.datasets[2].data = [
-                    ...gastosRealData,
-                    ...Array(gastosPredictedData.length).fill(null)
-                ];
-                
-                predictionChart.data.datasets[3].data = [
-                    ...Array(gastosRealData.length).fill(null),
-                    ...gastosPredictedData
-                ];
-                
-                predictionChart.update();
-                
-                // Mostrar métricas
-                let metricsHTML = '<h5>Métricas de Predicción</h5>';
-                
-                if (data.metrics?.ganancias?.r2 !== undefined && data.metrics?.ganancias?.mae !== undefined) {
-                    metricsHTML += `
-                        <p><strong>Ganancias:</strong> 
-                        R² = ${Number(data.metrics.ganancias.r2).toFixed(3)}, 
-                        MAE = ${Number(data.metrics.ganancias.mae).toFixed(2)}</p>
-                    `;
-                }
-                
-                if (data.metrics?.gastos?.r2 !== undefined && data.metrics?.gastos?.mae !== undefined) {
-                    metricsHTML += `
-                        <p><strong>Gastos:</strong> 
-                        R² = ${Number(data.metrics.gastos.r2).toFixed(3)}, 
-                        MAE = ${Number(data.metrics.gastos.mae).toFixed(2)}</p>
-                    `;
-                }
-                
-                if (modelType === 'moving_avg') {
-                    metricsHTML += '<p>Modelo de promedio móvil: métricas no aplicables</p>';
-                }
-                
-                document.getElementById('prediction-metrics').innerHTML = metricsHTML;
-              } catch (e) {
-                throw new Error('Error procesando datos de predicción: ' + e.message);
+              return lo;
+          };
+          const setBucket = (label, value, add) => {
+              const i = at(label);
+              if (i > 0 && labels[i - 1] === label) {
+                values[i - 1] = add ? values[i - 1] + value : value;
+              } else {
+                labels.splice(i, 0, label);
+                values.splice(i, 0, value);
               }
-          })
-          .catch(error => {
-              console.error('Error:', error);
-              document.getElementById('prediction-metrics').innerHTML = 
-                  `<div class="alert alert-danger">Error al generar predicciones: ${error.message}</div>`;
-          });
+          };
+
+          if (chartType === 'daily') {
+            decodeColumnar(changes.days, 'date').filter(([label]) => inRange(label))
+              .forEach(([label, value]) => setBucket(label, value, false));
+          } else if (chartType === 'monthly') {
+            decodeColumnar(changes.rows, 'timestamp').filter(([label]) => inRange(label))
+              .forEach(([label, value]) => setBucket(label.slice(0, 7), value, true));
+          } else {
+            const format = key === 'ganancias' ? 'timestamp' : 'date';
+            decodeColumnar(changes.rows, format).filter(([label]) => inRange(label)).forEach(([label, value]) => {
+                const i = at(label);
+                labels.splice(i, 0, label);
+                values.splice(i, 0, value);
+            });
+          }
+          chart.update('none');
+      }
+      document.getElementById('status-message').textContent =
+        `Datos actualizados: ${gananciasChart.data.labels.length} ganancias, ${gastosChart.data.labels.length} gastos`;
+      return true;
+  }
+
+  // Gráfico de predicción y métricas; `net` es la utilidad neta (ganancias − gastos)
+  function renderPredictions(data, net, modelType) {
+      if (!data) {
+          throw new Error('No se recibieron datos de predicción');
+      }
+
+      // Ganancias reales
+      const gananciasRealLabels = Array.isArray(data.ganancias?.real?.labels) ? data.ganancias.real.labels : [];
+      const gananciasRealData = Array.isArray(data.ganancias?.real?.data) ? 
+        data.ganancias.real.data.map(d => Number(d)) : [];
+
+      // Ganancias predichas
+      const gananciasPredictedLabels = Array.isArray(data.ganancias?.predicted?.labels) ? 
+        data.ganancias.predicted.labels : [];
+      const gananciasPredictedData = Array.isArray(data.ganancias?.predicted?.data) ? 
+        data.ganancias.predicted.data.map(d => Number(d)) : [];
+
+      // Gastos reales
+      const gastosRealData = Array.isArray(data.gastos?.real?.data) ? 
+        data.gastos.real.data.map(d => Number(d)) : [];
+
+      // Gastos predichos
+      const gastosPredictedData = Array.isArray(data.gastos?.predicted?.data) ? 
+        data.gastos.predicted.data.map(d => Number(d)) : [];
+
+      // Actualizar gráfico de predicción
+      predictionChart.data.labels = [
+          ...gananciasRealLabels,
+          ...gananciasPredictedLabels
+      ];
+
+      predictionChart.data.datasets[0].data = [
+          ...gananciasRealData,
+          ...Array(gananciasPredictedLabels.length).fill(null)
+      ];
+
+      predictionChart.data.datasets[1].data = [
+          ...Array(gananciasRealLabels.length).fill(null),
+          ...gananciasPredictedData
+      ];
+
+      predictionChart.data.datasets[2].data = [
+          ...gastosRealData,
+          ...Array(gastosPredictedData.length).fill(null)
+      ];
+
+      predictionChart.data.datasets[3].data = [
+          ...Array(gastosRealData.length).fill(null),
+          ...gastosPredictedData
+      ];
+
+      // Utilidad neta: el servidor ya la alinea por período; se ubica por etiqueta
+      const netReal = new Map((net?.real?.labels || []).map((label, i) => [label, net.real.data[i]]));
+      const netPredicted = new Map((net?.predicted?.labels || []).map((label, i) => [label, net.predicted.data[i]]));
+      predictionChart.data.datasets[4].data = predictionChart.data.labels.map(label => netReal.get(label) ?? null);
+      predictionChart.data.datasets[5].data = predictionChart.data.labels.map(label => netPredicted.get(label) ?? null);
+
+      predictionChart.update();
+
+      // Mostrar métricas
+      let metricsHTML = '<h5>Métricas de Predicción</h5>';
+
+      if (data.metrics?.ganancias?.r2 !== undefined && data.metrics?.ganancias?.mae !== undefined) {
+          metricsHTML += `
+              <p><strong>Ganancias:</strong> 
+              R² = ${Number(data.metrics.ganancias.r2).toFixed(3)}, 
+              MAE = ${Number(data.metrics.ganancias.mae).toFixed(2)}</p>
+          `;
+      }
+
+      if (data.metrics?.gastos?.r2 !== undefined && data.metrics?.gastos?.mae !== undefined) {
+          metricsHTML += `
+              <p><strong>Gastos:</strong> 
+              R² = ${Number(data.metrics.gastos.r2).toFixed(3)}, 
+              MAE = ${Number(data.metrics.gastos.mae).toFixed(2)}</p>
+          `;
+      }
+
+      if (modelType === 'moving_avg' || modelType === 'rolling_avg') {
+          metricsHTML += '<p>Modelo de promedio móvil: métricas no aplicables</p>';
+      }
+
+      document.getElementById('prediction-metrics').innerHTML = metricsHTML;
   }
 });
\ No newline at end of file
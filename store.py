@@ -0,0 +1,212 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SNAPSHOT_POINTER = 'CURRENT'
+SNAPSHOT_LOCK = 'CURRENT.lock'
+ID_DTYPE = 'S36'
+
+
+class Columns:
+    """Una serie en formato columnar.
+
+    `ts` son marcas de tiempo UTC en nanosegundos (int64), `amount` los montos
+    (float64), `ids` los `id` del upstream y `desc`, si la serie lo tiene, la
+    descripción como `pd.Categorical`.
+    """
+
+    def __init__(self, ts, amount, ids, desc=None):
+        self.ts = ts
+        self.amount = amount
+        self.ids = ids
+        self.desc = desc
+
+    def __len__(self):
+        return len(self.ts)
+
+    @classmethod
+    def empty(cls, with_desc=False):
+        desc = None
+        if with_desc:
+            import pandas as pd
+            desc = pd.Categorical([])
+        return cls(np.empty(0, 'int64'), np.empty(0, 'float64'), np.empty(0, ID_DTYPE), desc)
+
+    def is_sorted(self):
+        return bool(np.all(self.ts[1:] >= self.ts[:-1]))
+
+    def take(self, index):
+        desc = self.desc[index] if self.desc is not None else None
+        return Columns(self.ts[index], self.amount[index], self.ids[index], desc)
+
+    def sorted(self):
+        """Devuelve las columnas ordenadas por fecha (orden estable)."""
+        if self.is_sorted():
+            return self
+        return self.take(np.argsort(self.ts, kind='stable'))
+
+    def append(self, other):
+        """Agrega `other` manteniendo el orden por fecha.
+
+        Lo normal es que las filas nuevas sean posteriores y basta con
+        concatenar; si llega alguna atrasada se reordena todo.
+        """
+        if not len(self):
+            return other.sorted()
+        if not len(other):
+            return self
+        other = other.sorted()
+        desc = None
+        if self.desc is not None:
+            from pandas.api.types import union_categoricals
+            desc = union_categoricals([self.desc, other.desc])
+        merged = Columns(
+            np.concatenate([self.ts, other.ts]),
+            np.concatenate([self.amount, other.amount]),
+            np.concatenate([self.ids, other.ids]),
+            desc,
+        )
+        if other.ts[0] < self.ts[-1]:
+            merged = merged.sorted()
+        return merged
+
+
+def columns_from_records(records, time_field, amount_field, desc_field=None):
+    """Convierte registros del API GraphQL en columnas."""
+    if not records:
+        return Columns.empty(with_desc=desc_field is not None)
+    import pandas as pd
+    ts = pd.to_datetime([r[time_field] for r in records], utc=True).as_unit('ns').asi8
+    amount = np.array([r[amount_field] for r in records], dtype='float64')
+    ids = np.array([r['id'] for r in records], dtype=ID_DTYPE)
+    desc = None
+    if desc_field is not None:
+        desc = pd.Categorical([r.get(desc_field) for r in records])
+    return Columns(ts, amount, ids, desc)
+
+
+def format_timestamp(ts):
+    """Marca de tiempo en ns -> ISO 8601 como la devuelve el API (`...T..:..:..sssZ`)."""
+    return str(np.datetime64(int(ts), 'ns').astype('datetime64[ms]')) + 'Z'
+
+
+def _write_array(directory, name, array):
+    np.save(os.path.join(directory, name + '.npy'), np.ascontiguousarray(array), allow_pickle=False)
+
+
+def save_snapshot(directory, series, meta=None, aggregates=None):
+    """Guarda las series en `directory` de forma atómica.
+
+    `aggregates` ({serie: {nombre: (info, {arreglo: ndarray})}}) guarda junto
+    a cada serie índices derivados de ella (ver `DailyRollup.to_snapshot`),
+    así quien abre la instantánea no tiene que recalcularlos; `info` debe
+    poder pasarse a JSON.
+
+    Cada versión se escribe en un subdirectorio nuevo y luego se reemplaza el
+    puntero `CURRENT` con `os.replace`, así un lector nunca ve una versión a
+    medio escribir. Varios procesos pueden guardar a la vez: el cambio de
+    puntero se hace con el `flock` de `CURRENT.lock` y cada uno borra solo la
+    versión que reemplazó (un proceso que la tenga mapeada en memoria la
+    sigue viendo hasta cerrarla).
+    """
+    os.makedirs(directory, exist_ok=True)
+    target = tempfile.mkdtemp(prefix='snap-', dir=directory)
+    try:
+        info = {'series': {}, 'meta': meta or {}}
+        for name, cols in series.items():
+            _write_array(target, f'{name}.ts', cols.ts)
+            _write_array(target, f'{name}.amount', cols.amount)
+            _write_array(target, f'{name}.ids', cols.ids)
+            entry = {'rows': len(cols)}
+            if cols.desc is not None:
+                _write_array(target, f'{name}.desc', cols.desc.codes.astype('int32'))
+                entry['categories'] = [str(c) for c in cols.desc.categories]
+            for kind, (extra, arrays) in (aggregates or {}).get(name, {}).items():
+                for array_name, array in arrays.items():
+                    _write_array(target, f'{name}.{kind}.{array_name}', array)
+                entry.setdefault('aggregates', {})[kind] = {'info': extra, 'arrays': list(arrays)}
+            info['series'][name] = entry
+        with open(os.path.join(target, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False)
+
+        pointer = os.path.join(directory, SNAPSHOT_POINTER)
+        tmp_pointer = f'{pointer}.{os.getpid()}.tmp'
+        with open(os.path.join(directory, SNAPSHOT_LOCK), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            previous = current_snapshot(directory)
+            with open(tmp_pointer, 'w', encoding='utf-8') as f:
+                f.write(os.path.basename(target))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_pointer, pointer)
+    except BaseException:
+        shutil.rmtree(target, ignore_errors=True)
+        raise
+
+    if previous is not None and previous != os.path.basename(target):
+        shutil.rmtree(os.path.join(directory, previous), ignore_errors=True)
+    return target
+
+
+def current_snapshot(directory):
+    """Nombre de la versión vigente en `directory` (cambia con cada guardado), o None."""
+    try:
+        with open(os.path.join(directory, SNAPSHOT_POINTER), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_snapshot(directory, mmap=True, aggregates=False):
+    """Abre la última versión guardada; devuelve ({serie: Columns}, meta) o None.
+
+    Con `mmap=True` los arreglos se mapean en memoria en lugar de leerse, de
+    modo que abrir el historial completo cuesta milisegundos. Con
+    `aggregates=True` devuelve además los índices guardados con
+    `save_snapshot`, como {serie: {nombre: (info, {arreglo: ndarray})}}. Si
+    otro proceso guarda una versión nueva (y borra esta) mientras se lee, se
+    reintenta una vez con la nueva.
+    """
+    for attempt in range(2):
+        name = current_snapshot(directory)
+        if name is None:
+            return None
+        try:
+            snapshot = _read_snapshot(os.path.join(directory, name), mmap)
+        except FileNotFoundError:
+            continue
+        return snapshot if aggregates else snapshot[:2]
+    return None
+
+
+def _read_snapshot(target, mmap):
+    with open(os.path.join(target, 'meta.json'), encoding='utf-8') as f:
+        info = json.load(f)
+
+    mode = 'r' if mmap else None
+
+    def read(name):
+        return np.load(os.path.join(target, name + '.npy'), mmap_mode=mode, allow_pickle=False)
+
+    series = {}
+    aggregates = {}
+    for name, entry in info['series'].items():
+        desc = None
+        if 'categories' in entry:
+            import pandas as pd
+            desc = pd.Categorical.from_codes(read(f'{name}.desc'), categories=entry['categories'])
+        series[name] = Columns(read(f'{name}.ts'), read(f'{name}.amount'), read(f'{name}.ids'), desc)
+        aggregates[name] = {
+            kind: (saved['info'], {array_name: read(f'{name}.{kind}.{array_name}') for array_name in saved['arrays']})
+            for kind, saved in entry.get('aggregates', {}).items()
+        }
+    return series, info['meta'], aggregates
@@ -0,0 +1,354 @@
+import threading
+import time
+
+import numpy as np
+
+from metrics import stage
+from rollups import CategoryRollup, DailyRollup
+from store import columns_from_records, format_timestamp, load_snapshot, save_snapshot
+
+# Campos de cada serie: (fecha, monto, descripción). La fecha se usa como
+# marca de agua de la sincronización.
+SERIES = {
+    'ventaBoletos': ('fechaVenta', 'precio', None),
+    'gastos': ('fecha', 'monto', 'descripcion'),
+}
+
+
+class FilterRejected(Exception):
+    """El API rechaza el filtro incremental (`desde`): hay que comparar por `id`."""
+
+
+class Dataset:
+    """Datos vigentes tras una sincronización.
+
+    Se desempaqueta como `(df_ventas, df_gastos)`; `rollups[field]` tiene los
+    agregados diarios de cada serie (ver `rollups.DailyRollup`),
+    `breakdowns[field]` los de cada descripción en las series que la tienen
+    (ver `rollups.CategoryRollup`) y `version`
+    cambia cada vez que llegan filas nuevas; `updated_at` es el momento
+    (epoch, s) de ese cambio.
+    """
+
+    def __init__(self, ventas, gastos, rollups, version, updated_at=None, breakdowns=None):
+        self.ventas = ventas
+        self.gastos = gastos
+        self.rollups = rollups
+        self.breakdowns = breakdowns or {}
+        self.version = version
+        self.updated_at = updated_at
+
+    def __iter__(self):
+        return iter((self.ventas, self.gastos))
+
+
+def breakdown_from_columns(cols):
+    """Agregados por día y descripción de `cols`, o None si la serie no tiene descripción."""
+    if cols.desc is None:
+        return None
+    return CategoryRollup.from_columns(cols.ts, cols.amount, cols.desc)
+
+
+def aggregates_from_snapshot(cols, saved):
+    """(DailyRollup, CategoryRollup o None) de `cols` a partir de los índices guardados en la instantánea.
+
+    Las instantáneas que no los traen (las de versiones anteriores) se
+    agregan desde las columnas.
+    """
+    rollup = DailyRollup.from_snapshot(*saved['daily']) if 'daily' in saved else None
+    if rollup is None:
+        rollup = DailyRollup.from_columns(cols.ts, cols.amount)
+    if cols.desc is None:
+        return rollup, None
+    if 'breakdown' in saved:
+        return rollup, CategoryRollup.from_snapshot(*saved['breakdown'])
+    return rollup, breakdown_from_columns(cols)
+
+
+class SeriesState:
+    def __init__(self):
+        self.columns = None
+        self.frame = None
+        self.rollup = DailyRollup()
+        self.breakdown = None
+        self.watermark = None
+        self._ids = set()
+
+    @property
+    def ids(self):
+        """`id` ya vistos; tras cargar una instantánea se arman recién al sincronizar."""
+        if self._ids is None:
+            self._ids = set(self.columns.ids.tolist())
+        return self._ids
+
+    @ids.setter
+    def ids(self, ids):
+        self._ids = ids
+
+
+class DataSync:
+    """Sincronización incremental de ventas y gastos.
+
+    Las filas del upstream solo se agregan, así que basta con recordar los
+    `id` ya vistos y la fecha más reciente (marca de agua). Con `use_filter`
+    se pide al API solo lo posterior a la marca de agua; si el API no acepta
+    el filtro (`fetch` lanza `FilterRejected`) se descarga todo y se compara
+    contra los `id` conocidos. En ambos casos solo se agregan las filas nuevas.
+
+    `fetch(field, desde=None)` devuelve las filas como `store.Columns` o None
+    si la consulta falla (un error pasajero no desactiva el filtro);
+    `builders[field](columns)` construye el DataFrame a
+    partir de las columnas (`store.Columns`) acumuladas de la serie.
+    `fetch_many({field: (field, desde)})` permite lanzar las consultas de
+    ambas series en paralelo (por defecto se hacen una tras otra).
+    """
+
+    def __init__(self, fetch, builders, use_filter=False, full_resync_every=0, fetch_many=None):
+        self.fetch = fetch
+        self.fetch_many = fetch_many or self._fetch_serial
+        self.builders = builders
+        self.use_filter = use_filter
+        self.full_resync_every = full_resync_every
+
+        self._lock = threading.Lock()
+        self._state = {field: SeriesState() for field in SERIES}
+        self._force_full = False
+
+        self.listeners = []
+
+        self.version = 0
+        self.updated_at = None
+        self.changes = {}
+        self.syncs = 0
+        self.full_syncs = 0
+        self.delta_syncs = 0
+        self.new_rows = 0
+        self.errors = 0
+
+    def _fetch_serial(self, args_by_field):
+        results = {}
+        for field, args in args_by_field.items():
+            try:
+                results[field] = self.fetch(*args)
+            except Exception as e:
+                results[field] = e
+        return results
+
+    def frames(self):
+        import pandas as pd
+
+        return tuple(
+            state.frame if state.frame is not None else pd.DataFrame()
+            for state in self._state.values()
+        )
+
+    def dataset(self):
+        ventas, gastos = self.frames()
+        rollups = {field: state.rollup for field, state in self._state.items()}
+        breakdowns = {field: state.breakdown for field, state in self._state.items() if state.breakdown is not None}
+        return Dataset(ventas, gastos, rollups, self.version, self.updated_at, breakdowns)
+
+    def columns(self):
+        return {field: state.columns for field, state in self._state.items() if state.columns is not None}
+
+    def add_listener(self, fn):
+        """Registra `fn(data_sync)`, que se llama tras cada sincronización con cambios.
+
+        `data_sync.changes[field]` tiene las filas nuevas de cada serie que
+        cambió (`store.Columns`), o None si la serie se reemplazó entera.
+        """
+        self.listeners.append(fn)
+
+    def reset(self):
+        """Fuerza una resincronización completa en la próxima llamada."""
+        self._force_full = True
+
+    def sync(self, full=False, fetch_many=None):
+        """Trae lo nuevo del upstream; `fetch_many` reemplaza al de la instancia en esta llamada."""
+        fetch_many = fetch_many or self.fetch_many
+        with self._lock:
+            # Sin contar la primera: tras cargar la instantánea basta con lo nuevo
+            periodic = self.full_resync_every and self.syncs and self.syncs % self.full_resync_every == 0
+            full = full or self._force_full or bool(periodic)
+            self._force_full = False
+
+            # Las dos series se piden a la vez; el resto del proceso es local
+            plan = {field: self._plan(field, full) for field in SERIES}
+            self.changes = {}
+            results = fetch_many({field: (field, desde) for field, (_, desde) in plan.items()})
+
+            changed = False
+            for field, (mode, _) in plan.items():
+                cols = results[field]
+                if isinstance(cols, FilterRejected) and mode == 'filter':
+                    # El API no acepta el filtro: comparar contra la copia local
+                    print(f"El API no acepta el filtro incremental para {field}; se compara por id")
+                    self.use_filter = False
+                    mode, cols = 'diff', self.fetch(field)
+                if isinstance(cols, Exception):
+                    print(f"Error al sincronizar {field}: {cols}")
+                    self.errors += 1
+                    continue
+                try:
+                    changed |= self._apply(field, mode, cols)
+                except Exception as e:
+                    print(f"Error al sincronizar {field}: {e}")
+                    self.errors += 1
+            self.syncs += 1
+            if changed:
+                self._bump()
+            return self.dataset()
+
+    def _bump(self):
+        self.version += 1
+        self.updated_at = time.time()
+        self._notify()
+
+    def _notify(self):
+        for fn in self.listeners:
+            try:
+                fn(self)
+            except Exception as e:
+                print(f"Error en listener de sincronización: {e}")
+
+    def load_columns(self, columns_by_field):
+        """Reemplaza el contenido con columnas ya leídas (p. ej. de los volcados de data/)."""
+        with self._lock:
+            self.changes = {}
+            for field, cols in columns_by_field.items():
+                self._replace(field, cols)
+            self._bump()
+            return self.dataset()
+
+    def load_records(self, records_by_field):
+        """Como `load_columns`, a partir de registros con la forma del API."""
+        return self.load_columns({
+            field: columns_from_records(records, *SERIES[field])
+            for field, records in records_by_field.items()
+        })
+
+    def save_snapshot(self, directory):
+        """Guarda las columnas actuales y sus agregados en `directory` (ver `store.save_snapshot`)."""
+        meta = {
+            'version': self.version,
+            'updated_at': self.updated_at,
+            'watermarks': {field: state.watermark for field, state in self._state.items()},
+        }
+        aggregates = {}
+        for field, state in self._state.items():
+            aggregates[field] = {'daily': state.rollup.to_snapshot()}
+            if state.breakdown is not None:
+                aggregates[field]['breakdown'] = state.breakdown.to_snapshot()
+        return save_snapshot(directory, self.columns(), meta, aggregates)
+
+    def load_snapshot(self, directory):
+        """Carga la última instantánea de `directory`; devuelve False si no hay ninguna."""
+        snapshot = load_snapshot(directory, aggregates=True)
+        if snapshot is None:
+            return False
+        series, meta, aggregates = snapshot
+        with self._lock:
+            for field, cols in series.items():
+                if field not in self._state:
+                    continue
+                state = self._state[field]
+                cols = cols.sorted()
+                state.columns = cols
+                # El conjunto de `id` solo hace falta para sincronizar: armarlo
+                # con millones de filas demoraría el arranque
+                state.ids = None
+                state.watermark = meta.get('watermarks', {}).get(field)
+                if state.watermark is None and len(cols):
+                    state.watermark = format_timestamp(cols.ts.max())
+                state.frame = self.builders[field](cols)
+                state.rollup, state.breakdown = aggregates_from_snapshot(cols, aggregates.get(field, {}))
+            self.version = meta.get('version', self.version)
+            self.updated_at = meta.get('updated_at') or time.time()
+        return True
+
+    def _plan(self, field, full):
+        """Devuelve (modo, desde) de la consulta a hacer para `field`."""
+        state = self._state[field]
+        if full or state.frame is None:
+            return 'full', None
+        if self.use_filter and state.watermark is not None:
+            return 'filter', state.watermark
+        return 'diff', None
+
+    def _apply(self, field, mode, cols):
+        state = self._state[field]
+        if mode == 'full':
+            if cols is None:
+                self.errors += 1
+                return False
+            return self._replace(field, cols)
+
+        if cols is None:
+            self.errors += 1
+            return False
+        if mode == 'diff' and len(cols) < len(state.ids):
+            # Se borraron filas en el upstream: la copia local ya no es válida
+            return self._replace(field, cols)
+
+        self.delta_syncs += 1
+        known = state.ids
+        is_new = np.fromiter((i not in known for i in cols.ids.tolist()), dtype=bool, count=len(cols))
+        if not is_new.any():
+            return False
+        new_columns = cols if is_new.all() else cols.take(is_new)
+        known.update(new_columns.ids.tolist())
+        self._track(state, new_columns)
+        self.changes[field] = new_columns
+        with stage('parse'):
+            state.columns = state.columns.append(new_columns)
+        with stage('aggregate'):
+            state.rollup = state.rollup.add(new_columns.ts, new_columns.amount)
+            if new_columns.desc is not None:
+                state.breakdown = (state.breakdown or CategoryRollup()).add(
+                    new_columns.ts, new_columns.amount, new_columns.desc)
+        with stage('parse'):
+            state.frame = self.builders[field](state.columns)
+        self.new_rows += len(new_columns)
+        return True
+
+    def _replace(self, field, cols):
+        state = self._state[field]
+        ids = set(cols.ids.tolist())
+        self.full_syncs += 1
+        if state.frame is not None and ids == state.ids:
+            return False
+        state.ids = ids
+        state.watermark = None
+        self._track(state, cols)
+        self.changes[field] = None
+        with stage('parse'):
+            state.columns = cols.sorted()
+        with stage('aggregate'):
+            state.rollup = DailyRollup.from_columns(state.columns.ts, state.columns.amount)
+            state.breakdown = breakdown_from_columns(state.columns)
+        with stage('parse'):
+            state.frame = self.builders[field](state.columns)
+        return True
+
+    def _track(self, state, cols):
+        """Avanza la marca de agua hasta la fila más reciente de `cols`."""
+        if not len(cols):
+            return
+        newest = format_timestamp(cols.ts.max())
+        if state.watermark is None or newest > state.watermark:
+            state.watermark = newest
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'updated_at': self.updated_at,
+            'syncs': self.syncs,
+            'full_syncs': self.full_syncs,
+            'delta_syncs': self.delta_syncs,
+            'new_rows': self.new_rows,
+            'errors': self.errors,
+            'use_filter': self.use_filter,
+            'rows': {field: len(state.columns) if state.columns is not None else 0
+                     for field, state in self._state.items()},
+            'watermarks': {field: state.watermark for field, state in self._state.items()},
+        }
@@ -0,0 +1,174 @@
+"""Generador de ventas de boletos y gastos sintéticos con la forma del API.
+
+Las filas se generan directamente en columnas (`store.Columns`), así que
+producir millones de filas cuesta segundos; `to_records` y `write_dump` las
+convierten a los registros/volcados JSON que devuelve el API GraphQL (como
+`data/pasar a luisiño` y `data/gastos`):
+
+    python synthetic.py --ventas 1000000 --gastos 200000 --out data/synthetic
+
+Las ventas siguen una tendencia creciente con estacionalidad semanal (más
+viajes el fin de semana), anual (vacaciones de verano e invierno) y horaria
+(picos de mañana y tarde); el precio depende de la ruta. Los gastos son
+sueldos mensuales por conductor, mantenimiento, combustible y lavado por bus,
+peajes por ruta y una parte de gastos sueltos con descripción única.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from store import Columns, ID_DTYPE
+
+DAY_NS = 86_400 * 10**9
+
+# Rutas y su tarifa
+ROUTES = {
+    'Santiago - Valparaíso': 100, 'Santiago - Rancagua': 100, 'Santiago - Talca': 150,
+    'Santiago - Chillán': 250, 'Santiago - Concepción': 300, 'Santiago - Temuco': 400,
+    'Santiago - La Serena': 350, 'Valparaíso - La Serena': 300, 'Concepción - Temuco': 150,
+    'Temuco - Puerto Montt': 200, 'Santiago - Puerto Montt': 500, 'Rancagua - Talca': 100,
+}
+
+HOUR_WEIGHTS = np.array([1, 1, 1, 1, 2, 4, 8, 10, 9, 6, 5, 5, 6, 6, 5, 5, 7, 10, 9, 6, 4, 3, 2, 1], dtype='float64')
+WEEKDAY_WEIGHTS = np.array([0.9, 0.85, 0.85, 0.9, 1.2, 1.4, 1.3])  # lunes..domingo
+
+
+def random_ids(rng, n):
+    """`n` UUID v4 como bytes `S36`, sin pasar por `uuid.uuid4()` fila a fila."""
+    hexdigits = np.frombuffer(b'0123456789abcdef', dtype='u1')
+    nibbles = rng.integers(0, 16, size=(n, 32), dtype='u1')
+    nibbles[:, 12] = 4
+    nibbles[:, 16] = 8 + nibbles[:, 16] % 4
+    out = np.full((n, 36), ord('-'), dtype='u1')
+    positions = [i for i in range(36) if i not in (8, 13, 18, 23)]
+    out[:, positions] = hexdigits[nibbles]
+    return out.view('S36').ravel().astype(ID_DTYPE)
+
+
+def day_weights(start, days, trend=0.5):
+    """Peso relativo de cada día: tendencia lineal + semana + vacaciones."""
+    dates = pd.date_range(start, periods=days, freq='D')
+    weights = 1 + trend * np.arange(days) / max(days - 1, 1)
+    weights *= WEEKDAY_WEIGHTS[dates.dayofweek]
+    # Verano (ene-feb), invierno (julio) y fiestas de septiembre
+    weights *= np.where(dates.month.isin([1, 2]), 1.5, 1.0)
+    weights *= np.where(dates.month == 7, 1.3, 1.0)
+    weights *= np.where((dates.month == 9) & (dates.day >= 15) & (dates.day <= 20), 1.6, 1.0)
+    return weights / weights.sum()
+
+
+def _timestamps(rng, n, start, days, weights, hours=HOUR_WEIGHTS):
+    day = rng.choice(days, size=n, p=weights)
+    hour = rng.choice(24, size=n, p=hours / hours.sum())
+    ms = rng.integers(0, 3_600_000, size=n)
+    ts = pd.Timestamp(start, tz='UTC').value + day * DAY_NS + hour * 3_600 * 10**9 + ms * 10**6
+    return np.sort(ts)
+
+
+def sales_columns(rows, start='2023-01-01', days=730, seed=0):
+    """`rows` ventas de boletos entre `start` y `start + days`."""
+    rng = np.random.default_rng(seed)
+    ts = _timestamps(rng, rows, start, days, day_weights(start, days))
+    fares = np.array(list(ROUTES.values()), dtype='float64')
+    popularity = 1 / np.arange(1, len(fares) + 1)
+    route = rng.choice(len(fares), size=rows, p=popularity / popularity.sum())
+    return Columns(ts, fares[route], random_ids(rng, rows))
+
+
+def expense_columns(rows, start='2023-01-01', days=730, seed=1, buses=40, drivers=60, unique_share=0.05):
+    """`rows` gastos con descripciones de buses, conductores y rutas.
+
+    Los sueldos se pagan a fin de mes; el resto se reparte en días hábiles.
+    `unique_share` es la fracción de gastos sueltos ("Gasto número N").
+    """
+    rng = np.random.default_rng(seed)
+    kinds = (
+        [(f'Sueldo conductor {d}', 3000.0, 0.0) for d in range(1, drivers + 1)]
+        + [(f'Mantenimiento bus {b}', 1000.0, 0.3) for b in range(1, buses + 1)]
+        + [(f'Combustible bus {b}', 450.0, 0.2) for b in range(1, buses + 1)]
+        + [(f'Lavado bus {b}', 60.0, 0.1) for b in range(1, buses + 1)]
+        + [(f'Peaje ruta {route}', 25.0 + fare / 10, 0.05) for route, fare in ROUTES.items()]
+    )
+    names = np.array([k[0] for k in kinds], dtype=object)
+    base = np.array([k[1] for k in kinds])
+    spread = np.array([k[2] for k in kinds])
+    frequency = np.array([1.0 if k[0].startswith('Sueldo') else 4.0 for k in kinds])
+
+    n_unique = int(rows * unique_share)
+    n_known = rows - n_unique
+    kind = rng.choice(len(kinds), size=n_known, p=frequency / frequency.sum())
+    amount = np.round(base[kind] * rng.lognormal(0, spread[kind]), 2)
+
+    # Hábiles para todo salvo sueldos, que van el último día del mes
+    dates = pd.date_range(start, periods=days, freq='D')
+    business = np.where(dates.dayofweek < 5, 1.0, 0.1)
+    month_end = np.asarray(dates.is_month_end, dtype='float64') + 1e-9
+    is_salary = kind < drivers
+    ts = np.empty(rows, dtype='int64')
+    ts[:n_known][~is_salary] = _timestamps(rng, int((~is_salary).sum()), start, days, business / business.sum())
+    ts[:n_known][is_salary] = _timestamps(rng, int(is_salary.sum()), start, days, month_end / month_end.sum())
+    ts[n_known:] = _timestamps(rng, n_unique, start, days, business / business.sum())
+
+    categories = list(names) + [f'Gasto número {i}' for i in range(1, n_unique + 1)]
+    codes = np.concatenate([kind, len(names) + np.arange(n_unique)])
+    amount = np.concatenate([amount, np.round(rng.lognormal(5.5, 0.8, n_unique), 2)])
+
+    order = np.argsort(ts, kind='stable')
+    desc = pd.Categorical.from_codes(codes[order], categories=categories)
+    return Columns(ts[order], amount[order], random_ids(rng, rows), desc)
+
+
+def generate(ventas=10_000, gastos=10_000, start='2023-01-01', days=730, seed=0):
+    """{campo: Columns} con `ventas` ventas y `gastos` gastos."""
+    return {
+        'ventaBoletos': sales_columns(ventas, start, days, seed),
+        'gastos': expense_columns(gastos, start, days, seed + 1),
+    }
+
+
+def _iso(ts):
+    return np.char.add(np.datetime_as_string(ts.view('datetime64[ns]').astype('datetime64[ms]')), 'Z')
+
+
+def to_records(field, cols):
+    """Registros como los devuelve el API GraphQL para `field`."""
+    ids = np.char.decode(cols.ids, 'ascii').tolist()
+    dates = _iso(cols.ts).tolist()
+    amounts = cols.amount.tolist()
+    if field == 'ventaBoletos':
+        return [{'id': i, 'precio': p, 'fechaVenta': d} for i, p, d in zip(ids, amounts, dates)]
+    descs = np.asarray(cols.desc, dtype=object).tolist()
+    return [{'id': i, 'descripcion': s, 'monto': m, 'fecha': d} for i, s, m, d in zip(ids, descs, amounts, dates)]
+
+
+def write_dump(path, field, cols, chunk_rows=100_000):
+    """Escribe `{"data": {field: [...]}}` por partes, sin armar el documento en memoria."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"data": {%s: [' % json.dumps(field))
+        for offset in range(0, len(cols), chunk_rows):
+            part = cols.take(slice(offset, offset + chunk_rows))
+            body = json.dumps(to_records(field, part), ensure_ascii=False)[1:-1]
+            if body:
+                f.write((', ' if offset else '') + body)
+        f.write(']}}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genera volcados sintéticos de ventas y gastos.')
+    parser.add_argument('--ventas', type=int, default=10_000)
+    parser.add_argument('--gastos', type=int, default=10_000)
+    parser.add_argument('--start', default='2023-01-01')
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=os.path.join('data', 'synthetic'))
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    series = generate(args.ventas, args.gastos, args.start, args.days, args.seed)
+    for field, filename in (('ventaBoletos', 'ventaBoletos.json'), ('gastos', 'gastos.json')):
+        path = os.path.join(args.out, filename)
+        write_dump(path, field, series[field])
+        print(f"{path}: {len(series[field])} filas")
@@ -0,0 +1,988 @@
+"""Mediciones de rendimiento de la app contra el servidor GraphQL local.
+
+    python test/benchmarks.py fetch --delay 0.2
+    python test/benchmarks.py snapshot --scale 100
+    python test/benchmarks.py ingest --rows 1000000
+    python test/benchmarks.py filter --rows 1000000
+    python test/benchmarks.py downsample --scale 100
+    python test/benchmarks.py forecast
+    python test/benchmarks.py incremental --years 20
+    python test/benchmarks.py backtest --folds 200
+    python test/benchmarks.py breakdown --rows 3000000 --categories 10000
+    python test/benchmarks.py dashboard --scale 10 --delay 0.2
+    python test/benchmarks.py encoding --scale 100
+    python test/benchmarks.py metrics
+    python test/benchmarks.py shared --workers 4 --size 1000000
+    python test/benchmarks.py startup --size 1000000 --max-ms 500
+    python test/benchmarks.py serving --dashboards 50 --threads 10 --delay 0.5
+
+La suite completa usa datos sintéticos (ver synthetic.py) y guarda los
+resultados en test/results/<commit>-<filas>.json para comparar commits:
+
+    python test/benchmarks.py suite --size 1000000
+    python test/benchmarks.py compare 1a2b3c4 5d6e7f8 --size 1000000
+
+Es un script y no parte de pytest porque los tiempos se comparan entre
+commits (`compare` sobre test/results/), el tamaño se elige al correr
+(10k a 10M filas) y varias mediciones levantan procesos o servidores
+propios (shared, serving, startup). Las pruebas de pytest en test/test_*.py
+cubren el comportamiento; test_benchmarks.py corre una vez cada caso de la
+suite sobre pocos datos para que no se rompan sin que nadie lo note.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+sys.path.insert(0, ROOT)
+
+from stub_graphql import StubGraphQLServer, load_dumps
+
+
+def timed(fn, repeat):
+    """Devuelve el mejor tiempo (s) de `repeat` ejecuciones de `fn`."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_fetch(args):
+    """Consultas en serie con conexiones nuevas vs. en paralelo con la sesión compartida."""
+    import requests
+    from fetcher import GraphQLClient
+
+    with StubGraphQLServer(delay=args.delay) as stub:
+        query = "query { %s { id %s } }"
+        fields = {'ventaBoletos': 'precio fechaVenta', 'gastos': 'monto fecha'}
+
+        def serial():
+            for field, sub in fields.items():
+                requests.post(stub.url, json={"query": query % (field, sub)}).json()
+
+        client = GraphQLClient(stub.url)
+
+        def concurrent():
+            client.gather(client.execute, {field: (query % (field, sub),) for field, sub in fields.items()})
+
+        t_serial = timed(serial, args.repeat)
+        t_concurrent = timed(concurrent, args.repeat)
+        client.close()
+
+    print(f"upstream delay {args.delay * 1000:.0f} ms por consulta")
+    print(f"serie (requests.post):       {t_serial * 1000:8.1f} ms")
+    print(f"paralelo (sesión compartida): {t_concurrent * 1000:8.1f} ms")
+    print(f"ahorro: {(1 - t_concurrent / t_serial) * 100:.0f}%")
+
+
+def samples(fn, repeat):
+    """Tiempos (s) de `repeat` ejecuciones de `fn`."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run_child(code):
+    """Ejecuta `code` en un proceso nuevo; devuelve el dict JSON que imprime."""
+    return run_child_env(code, None)
+
+
+def run_child_env(code, env):
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# El pico de RSS sale de VmHWM: ru_maxrss arrastra el del proceso padre tras el fork
+MEASURE = """
+import json, resource, sys, time
+sys.path.insert(0, '.')
+import numpy as np, pandas as pd
+def peak_kb():
+    try:
+        with open('/proc/self/status') as f:
+            return next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+rss0 = peak_kb()
+t0 = time.perf_counter()
+%s
+elapsed = time.perf_counter() - t0
+rss = peak_kb() - rss0
+print(json.dumps({'seconds': elapsed, 'rss_kb': rss}))
+"""
+
+LOAD_JSON = """
+with open(%r, encoding='utf-8') as f:
+    ventas = json.load(f)['data']['ventaBoletos']
+with open(%r, encoding='utf-8') as f:
+    gastos = json.load(f)['data']['gastos']
+df_v = pd.DataFrame(ventas)
+df_v['fechaVenta'] = pd.to_datetime(df_v['fechaVenta'])
+df_v = df_v.set_index('fechaVenta')
+df_g = pd.DataFrame(gastos)
+df_g['fecha'] = pd.to_datetime(df_g['fecha']).dt.date
+"""
+
+LOAD_SNAPSHOT = """
+from store import load_snapshot
+series, meta = load_snapshot(%r)
+v, g = series['ventaBoletos'], series['gastos']
+df_v = pd.DataFrame({'Ganancia': v.amount}, index=pd.to_datetime(v.ts, utc=True))
+df_g = pd.DataFrame({'Gasto': g.amount}, index=pd.to_datetime(g.ts, utc=True))
+"""
+
+
+def bench_snapshot(args):
+    """Carga del historial: volcados JSON + pandas vs. instantánea columnar mapeada."""
+    from store import columns_from_records, save_snapshot
+    from sync import SERIES
+
+    records = load_dumps()
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {}
+        series = {}
+        for field, rows in records.items():
+            rows = rows * args.scale
+            path = os.path.join(tmp, field + '.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'data': {field: rows}}, f)
+            files[field] = path
+            series[field] = columns_from_records(rows, *SERIES[field])
+        snapshot_dir = os.path.join(tmp, 'snapshot')
+        save_snapshot(snapshot_dir, series)
+
+        rows = sum(len(cols) for cols in series.values())
+        json_stats = run_child(MEASURE % (LOAD_JSON % (files['ventaBoletos'], files['gastos'])))
+        snap_stats = run_child(MEASURE % (LOAD_SNAPSHOT % snapshot_dir))
+
+    print(f"{rows} filas")
+    for name, stats in (('JSON + pd.to_datetime', json_stats), ('instantánea (mmap)', snap_stats)):
+        print(f"{name:24s} {stats['seconds'] * 1000:9.1f} ms  {stats['rss_kb'] / 1024:8.1f} MB RSS")
+
+
+PARSE_RECORDS = """
+from store import columns_from_records
+with open(%r, encoding='utf-8') as f:
+    records = json.load(f)['data'][%r]
+cols = columns_from_records(records, *%r)
+"""
+
+PARSE_PANDAS = """
+with open(%r, encoding='utf-8') as f:
+    df = pd.DataFrame(json.load(f)['data'][%r])
+df[%r] = pd.to_datetime(df[%r])
+"""
+
+PARSE_STREAM = """
+import functools
+from ingest import read_columns
+with open(%r, encoding='utf-8') as f:
+    cols = read_columns(iter(functools.partial(f.read, 1 << 20), ''), %r, *%r, size_hint=%d)
+"""
+
+
+def bench_ingest(args):
+    """Volcado de `--rows` ventas: json.load + DataFrame vs. registros -> columnas vs. lectura por partes."""
+    import synthetic
+    from sync import SERIES
+
+    with tempfile.TemporaryDirectory() as tmp:
+        series = synthetic.generate(args.rows, args.rows)
+        paths = {}
+        for field, cols in series.items():
+            paths[field] = os.path.join(tmp, field + '.json')
+            synthetic.write_dump(paths[field], field, cols)
+        del series
+
+        print(f"{args.rows} filas por serie")
+        for field, spec in SERIES.items():
+            path = paths[field]
+            size = os.path.getsize(path)
+            cases = (
+                ('json.load + pd.DataFrame', PARSE_PANDAS % (path, field, spec[0], spec[0])),
+                ('json.load + columnas', PARSE_RECORDS % (path, field, spec)),
+                ('por partes (ingest)', PARSE_STREAM % (path, field, spec, size)),
+            )
+            print(f"{field} ({size / 2**20:.0f} MB)")
+            for name, code in cases:
+                stats = run_child(MEASURE % code)
+                print(f"  {name:26s} {stats['seconds'] * 1000:9.1f} ms  {stats['rss_kb'] / 1024:8.1f} MB RSS")
+
+
+def bench_filter(args):
+    """Filtro por rango de fechas: comparación de `index.date` vs. `searchsorted`."""
+    import numpy as np
+    import pandas as pd
+    from app import filter_by_date
+
+    rng = np.random.default_rng(0)
+    start = pd.Timestamp('2020-01-01', tz='UTC').value
+    ts = np.sort(rng.integers(start, start + 5 * 365 * 86_400 * 10**9, args.rows))
+    df = pd.DataFrame({'Ganancia': rng.random(args.rows)}, index=pd.to_datetime(ts, utc=True).rename('Fecha'))
+    start_date, end_date = '2022-03-01', '2022-09-30'
+
+    def by_date():
+        lo, hi = pd.to_datetime(start_date).date(), pd.to_datetime(end_date).date()
+        return df[(df.index.date >= lo) & (df.index.date <= hi)]
+
+    def by_searchsorted():
+        return filter_by_date(df, start_date, end_date)
+
+    assert by_date().equals(by_searchsorted())
+    t_old = timed(by_date, args.repeat)
+    t_new = timed(by_searchsorted, args.repeat)
+    print(f"{args.rows} filas, rango {start_date} a {end_date}")
+    print(f"index.date elemento a elemento: {t_old * 1000:9.2f} ms")
+    print(f"searchsorted (vista):           {t_new * 1000:9.3f} ms")
+    print(f"x{t_old / t_new:.0f} más rápido")
+
+
+def scaled_dataset(scale):
+    """Dataset con los volcados de data/ replicados `scale` veces."""
+    import app
+    from sync import DataSync
+
+    records = {field: rows * scale for field, rows in load_dumps().items()}
+    data_sync = DataSync(None, {'ventaBoletos': app.ventas_frame, 'gastos': app.gastos_frame})
+    return data_sync.load_records(records)
+
+
+def bench_downsample(args):
+    """Tamaño y tiempo de serialización de /get_data (separate) con y sin max_points."""
+    from app import app as flask_app, process_data_for_chart
+    from encoding import to_json
+
+    data = scaled_dataset(args.scale)
+    print(f"{len(data.ventas)} ventas, {len(data.gastos)} gastos")
+    with flask_app.app_context():
+        for max_points in (None, 2000, 1000):
+            for method in (('lttb', 'minmax') if max_points else ('lttb',)):
+                def encode():
+                    chart = process_data_for_chart(data, 'separate', max_points=max_points, method=method)
+                    return flask_app.json.dumps(to_json(chart))
+
+                body = encode()
+                elapsed = timed(encode, args.repeat)
+                label = f"max_points={max_points} ({method})" if max_points else "sin reducción"
+                print(f"{label:28s} {len(body) / 1024:10.1f} KB  {elapsed * 1000:8.1f} ms")
+
+
+def sklearn_forecast(y, model, horizon):
+    """Ajuste con sklearn tal como lo hacía make_predictions() antes de forecasting.py."""
+    import numpy as np
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import mean_absolute_error, r2_score
+    from sklearn.preprocessing import PolynomialFeatures
+
+    X = np.arange(len(y)).reshape(-1, 1)
+    X_pred = np.arange(len(y), len(y) + horizon).reshape(-1, 1)
+    degree = 1 if model == 'linear' else int(model[-1])
+    poly = PolynomialFeatures(degree=degree)
+    X_poly = poly.fit_transform(X)
+    reg = LinearRegression()
+    reg.fit(X_poly, y)
+    y_pred = reg.predict(poly.transform(X_pred))
+    return y_pred, r2_score(y, reg.predict(X_poly)), mean_absolute_error(y, reg.predict(X_poly))
+
+
+def bench_forecast(args):
+    """Latencia de ajuste por petición (ganancias + gastos): sklearn vs. forecasting.py."""
+    from forecasting import forecast_many
+
+    data = scaled_dataset(args.scale)
+    for period in ('D', 'W', 'M'):
+        ys = [data.rollups[field].buckets(period)[1] for field in ('ventaBoletos', 'gastos')]
+        for model in ('linear', 'poly2', 'poly3', 'exp_smoothing'):
+            t_numpy = timed(lambda: forecast_many(ys, model, 30), args.repeat)
+            line = f"{period} {model:14s} numpy {t_numpy * 1000:7.3f} ms"
+            if model != 'exp_smoothing':
+                try:
+                    t_sklearn = timed(lambda: [sklearn_forecast(y, model, 30) for y in ys], args.repeat)
+                    line += f"   sklearn {t_sklearn * 1000:7.3f} ms"
+                except ImportError:
+                    pass
+            print(line)
+
+
+def bench_encoding(args):
+    """Bytes y tiempo de codificación de /get_data y /get_predictions por formato."""
+    from app import app as flask_app, process_data_for_chart, make_predictions
+    from encoding import encode
+
+    data = scaled_dataset(args.scale)
+    payloads = {
+        'get_data separate': process_data_for_chart(data, 'separate'),
+        'get_data daily': process_data_for_chart(data, 'daily'),
+        'get_predictions D': make_predictions(data, 'linear', 30, 'D'),
+    }
+    print(f"{len(data.ventas)} ventas, {len(data.gastos)} gastos")
+    with flask_app.app_context():
+        for name, payload in payloads.items():
+            for fmt in ('json', 'columnar', 'binary'):
+                def serialize():
+                    body, _ = encode(payload, fmt)
+                    return body if fmt == 'binary' else flask_app.json.dumps(body)
+
+                size = len(serialize())
+                elapsed = timed(serialize, args.repeat)
+                print(f"{name:18s} {fmt:9s} {size / 1024:10.1f} KB  {elapsed * 1000:8.2f} ms")
+
+
+SHARED_WORKER = """
+import json, sys, time
+sys.path.insert(0, '.')
+import app
+client = app.app.test_client()
+versions = set()
+end = time.time() + %f
+while time.time() < end:
+    assert client.get('/get_data?chart_type=daily').status_code == 200
+    versions.add(app.dataset_cache.get().version)
+    time.sleep(0.1)
+with open('/proc/self/smaps_rollup') as f:
+    anon_kb = next(int(line.split()[1]) for line in f if line.startswith('Anonymous:'))
+shared = app.shared_dataset.stats() if app.shared_dataset is not None else {}
+print(json.dumps({'leader': shared.get('leader'), 'versions': sorted(versions), 'anon_kb': anon_kb}))
+"""
+
+
+def bench_shared(args):
+    """`--workers` procesos con y sin SHARED_DATA: consultas al upstream y memoria propia de cada uno.
+
+    A mitad de la corrida el upstream agrega filas; todos los procesos deben
+    ver la versión nueva. La memoria es la anónima (sin contar las páginas
+    de la instantánea mapeada, que comparten).
+    """
+    import synthetic
+
+    series = synthetic.generate(args.size, max(args.size // 4, 1))
+    records = {field: synthetic.to_records(field, cols) for field, cols in series.items()}
+    del series
+    ttl = 2.0
+    for shared in ('0', '1'):
+        with StubGraphQLServer(records=records) as stub, tempfile.TemporaryDirectory() as snapshot_dir:
+            stub.limits = {'ventaBoletos': len(records['ventaBoletos']) - 100}
+            env = dict(os.environ, GRAPHQL_URL=stub.url, SNAPSHOT_DIR=snapshot_dir, SHARED_DATA=shared,
+                       DATA_CACHE_TTL=str(ttl), PRECOMPUTE='0')
+            workers = [
+                subprocess.Popen([sys.executable, '-c', SHARED_WORKER % args.duration], cwd=ROOT, env=env,
+                                 stdout=subprocess.PIPE, text=True)
+                for _ in range(args.workers)
+            ]
+            time.sleep(args.duration / 2)
+            stub.limits = {}
+            results = [json.loads(worker.communicate()[0].strip().splitlines()[-1]) for worker in workers]
+
+        print(f"SHARED_DATA={shared}: {args.workers} procesos, {args.duration:.0f} s, TTL {ttl:.0f} s")
+        print(f"  consultas al upstream: {stub.hits}")
+        for i, result in enumerate(results):
+            role = {True: 'líder', False: 'seguidor', None: '-'}[result['leader']]
+            print(f"  proceso {i}: {role:8s} versiones {result['versions']}  {result['anon_kb'] / 1024:7.1f} MB anónima")
+        print(f"  total {sum(r['anon_kb'] for r in results) / 1024:.1f} MB anónima")
+
+
+# Módulos que `import app` no debe cargar: se importan recién al usarlos
+HEAVY_MODULES = ('pandas', 'requests', 'sklearn', 'scipy', 'matplotlib', 'multiprocessing')
+
+STARTUP = """
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, '.')
+import app
+t_import = time.perf_counter() - t0
+loaded = [m for m in %r if m in sys.modules]
+client = app.app.test_client()
+assert client.get('/').status_code == 200
+t_index = time.perf_counter() - t0
+assert client.get('/get_data?chart_type=daily').status_code == 200
+t_data = time.perf_counter() - t0
+print(json.dumps({'import': t_import, 'index': t_index, 'data': t_data, 'loaded': loaded}))
+"""
+
+
+def import_times(env):
+    """{módulo: µs acumulados} de lo que importa `app` directamente, según `-X importtime`."""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    # Cada módulo aparece después de los que importa, con un nivel más de sangría
+    children = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:
+            children[name.strip()] = int(cumulative)
+        elif depth == 0:
+            if name.strip() == 'app':
+                return dict(children, app=int(cumulative))
+            children = {}
+    return {}
+
+
+def bench_startup(args):
+    """Arranque de un worker: `import app`, primera respuesta de `/` y primeros datos.
+
+    Los datos salen de una instantánea de `--size` ventas sintéticas (sin
+    red). Falla si `import app` carga alguno de `HEAVY_MODULES` o si la
+    mediana de la importación supera `--max-ms`.
+    """
+    import synthetic
+    from store import save_snapshot
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        save_snapshot(snapshot_dir, synthetic.generate(args.size, max(args.size // 4, 1)), {'version': 1})
+        env = dict(os.environ, DATA_SOURCE='synthetic', SNAPSHOT_DIR=snapshot_dir, PRECOMPUTE='0')
+        runs = [run_child_env(STARTUP % (HEAVY_MODULES,), env) for _ in range(args.repeat)]
+        # Sin instantánea, para ver solo lo que carga la importación: con ella
+        # el hilo que la precarga importa pandas mientras tanto
+        check = run_child_env(STARTUP % (HEAVY_MODULES,), dict(env, SNAPSHOT_DIR=''))
+        modules = import_times(env)
+
+    total = modules.pop('app', 0)
+    print(f"import app: {total / 1000:.1f} ms según -X importtime; lo más pesado:")
+    for name, us in sorted(modules.items(), key=lambda item: -item[1])[:8]:
+        print(f"  {name:20s} {us / 1000:8.1f} ms")
+    for key, label in (('import', 'import app'), ('index', 'primera respuesta de /'), ('data', f'primeros datos ({args.size} ventas)')):
+        values = [run[key] for run in runs]
+        print(f"{label:40s} {statistics.median(values) * 1000:8.1f} ms  (mín {min(values) * 1000:.1f})")
+
+    failures = []
+    loaded = check['loaded']
+    if loaded:
+        failures.append(f"import app carga {', '.join(loaded)}")
+    median = statistics.median(run['import'] for run in runs) * 1000
+    if median > args.max_ms:
+        failures.append(f"import app tarda {median:.0f} ms (máximo {args.max_ms:.0f} ms)")
+    if failures:
+        sys.exit('; '.join(failures))
+
+
+# Servidores de cada modo; `serving` necesita gunicorn y uvicorn (y las dependencias de asgi.py)
+SERVERS = {
+    'wsgi': lambda port, threads: ['gunicorn', '-k', 'gthread', '-w', '1', '--threads', str(threads),
+                                   '-b', f'127.0.0.1:{port}', 'app:app'],
+    'asgi': lambda port, threads: ['uvicorn', 'asgi:app', '--port', str(port), '--log-level', 'warning',
+                                   '--timeout-graceful-shutdown', '1'],
+}
+
+
+def wait_for(url, timeout=60):
+    import requests
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    sys.exit(f"{url} no respondió en {timeout} s")
+
+
+def dashboard_load(base, dashboards, duration, stream=True, timeout=10.0):
+    """`dashboards` clientes que (opcionalmente) abren /stream y piden /get_data en bucle.
+
+    Devuelve (latencias en s de las respuestas 200, errores).
+    """
+    import threading
+    import requests
+
+    urls = [f'{base}/get_data?chart_type={chart_type}&max_points=500'
+            for chart_type in ('daily', 'monthly', 'separate', 'combined')]
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def listen(session):
+        try:
+            with session.get(f'{base}/stream', stream=True, timeout=(timeout, None)) as response:
+                for _ in response.iter_lines():
+                    if stop.is_set():
+                        return
+        except requests.RequestException:
+            pass
+
+    def client(i):
+        session = requests.Session()
+        if stream:
+            threading.Thread(target=listen, args=(requests.Session(),), daemon=True).start()
+        n = i
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                ok = session.get(urls[n % len(urls)], timeout=timeout).status_code == 200
+            except requests.RequestException:
+                ok = False
+            with lock:
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors[0] += 1
+            n += 1
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(dashboards)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout + 1)
+    return latencies, errors[0]
+
+
+def bench_serving(args):
+    """Modo WSGI (gunicorn gthread) vs. ASGI (uvicorn asgi:app) con el mismo número de hilos.
+
+    `--dashboards` clientes abren /stream y piden /get_data en bucle contra
+    un upstream con `--delay` de latencia; los datos vencen cada segundo, así
+    que el upstream se consulta durante toda la corrida.
+    """
+    import shutil
+
+    port = 5173
+    for mode, command in SERVERS.items():
+        command = command(port, args.threads)
+        if shutil.which(command[0]) is None:
+            print(f"{mode}: falta {command[0]}, se omite")
+            continue
+        with StubGraphQLServer(delay=args.delay) as stub:
+            # En WSGI, /stream con la mitad de los hilos; el resto de los dashboards recibe 503
+            env = dict(os.environ, GRAPHQL_URL=stub.url, SNAPSHOT_DIR='', DATA_CACHE_TTL='1', PRECOMPUTE='0',
+                       ASGI_THREADS=str(args.threads), STREAM_WSGI_CLIENTS=str(args.threads // 2))
+            server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                base = f'http://127.0.0.1:{port}'
+                wait_for(base + '/')
+                latencies, errors = dashboard_load(base, args.dashboards, args.duration, stream=not args.no_stream)
+            finally:
+                server.terminate()
+                server.wait()
+        done = len(latencies)
+        line = f"{mode}: {args.dashboards} dashboards, {args.threads} hilos: {done / args.duration:7.1f} peticiones/s"
+        if done:
+            latencies.sort()
+            p50, p95 = latencies[done // 2], latencies[min(done - 1, int(done * 0.95))]
+            line += f"  p50 {p50 * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms"
+        print(f"{line}  errores {errors}  consultas al upstream {sum(stub.hits.values())}")
+
+
+def bench_metrics(args):
+    """Costo de la instrumentación: por etapa medida y por petición completa."""
+    import metrics
+    import app
+
+    calls = 100_000
+
+    def bare():
+        for _ in range(calls):
+            pass
+
+    def staged():
+        for _ in range(calls):
+            with metrics.stage('bench'):
+                pass
+
+    t_bare = timed(bare, args.repeat)
+    t_stage = timed(staged, args.repeat)
+    print(f"stage(): {(t_stage - t_bare) / calls * 1e9:.0f} ns por bloque medido")
+
+    app.dataset_cache.put(scaled_dataset(args.scale))
+    client = app.app.test_client()
+    urls = ['/get_data?chart_type=daily', '/get_predictions?model_type=linear&prediction_days=30&prediction_period=W']
+    requests_per_run = 200
+
+    def run():
+        for i in range(requests_per_run):
+            client.get(urls[i % len(urls)])
+
+    results = {}
+    for enabled in (False, True):
+        metrics.enabled = enabled
+        results[enabled] = timed(run, args.repeat) / requests_per_run
+    metrics.enabled = True
+    overhead = results[True] - results[False]
+    print(f"petición sin métricas: {results[False] * 1e6:8.1f} µs")
+    print(f"petición con métricas: {results[True] * 1e6:8.1f} µs  ({overhead * 1e6:+.1f} µs, "
+          f"{overhead / results[False] * 100:+.1f}%)")
+
+
+def synthetic_rollup(years, seed=0):
+    """Índice diario con `years` años de ventas sintéticas (tendencia, semana y ruido)."""
+    import numpy as np
+    import pandas as pd
+    from rollups import DAY_NS, DailyRollup
+
+    rng = np.random.default_rng(seed)
+    days = np.arange(years * 365)
+    daily = 1000 + 2 * days + 300 * np.sin(2 * np.pi * days / 7) + rng.normal(0, 150, len(days))
+    start = pd.Timestamp('2020-01-01', tz='UTC').value
+    return DailyRollup.from_columns(start + days * DAY_NS, daily)
+
+
+def bench_incremental(args):
+    """Pronóstico tras cada día nuevo: estadísticos incrementales (TrendState) vs. reajuste completo.
+
+    Falla si algún pronóstico, R² o MAE se aparta del reajuste más allá de la tolerancia.
+    """
+    import numpy as np
+    from forecasting import STATE_MODELS, forecast_many
+    from rollups import DAY_NS
+
+    rollup = synthetic_rollup(args.years)
+    last_day = int(rollup.days[-1])
+    for period in ('D', 'W', 'M'):
+        rollup.trend(period)
+    rng = np.random.default_rng(1)
+    updates = 30
+    t_add = 0.0
+    t_state = {model: 0.0 for model in STATE_MODELS}
+    t_moments = dict(t_state)
+    t_refit = dict(t_state)
+    worst = 0.0
+    for i in range(1, updates + 1):
+        # Un día nuevo con 50 ventas
+        ts = (last_day + i) * DAY_NS + rng.integers(0, DAY_NS, 50)
+        start = time.perf_counter()
+        rollup = rollup.add(ts, rng.gamma(2.0, 30.0, 50))
+        t_add += time.perf_counter() - start
+        for period in ('D', 'W', 'M'):
+            y = rollup.buckets(period)[1]
+            for model in STATE_MODELS:
+                start = time.perf_counter()
+                got = rollup.trend(period).forecast(model, args.horizon, y)
+                t_state[model] += time.perf_counter() - start
+                # Sin la serie: pronóstico y R² solo desde los momentos, sin MAE
+                start = time.perf_counter()
+                rollup.trend(period).forecast(model, args.horizon)
+                t_moments[model] += time.perf_counter() - start
+                start = time.perf_counter()
+                expected = forecast_many([y], model, args.horizon)[0]
+                t_refit[model] += time.perf_counter() - start
+                assert np.allclose(got[0], expected[0], rtol=1e-7), (period, model)
+                if expected[1] is not None:
+                    assert abs(got[1] - expected[1]) < 1e-8 and np.isclose(got[2], expected[2], rtol=1e-7), (period, model)
+                worst = max(worst, float(np.max(np.abs(got[0] - expected[0]) / np.abs(expected[0]))))
+
+    print(f"{args.years} años ({len(rollup)} días), {updates} días nuevos de a uno, D/W/M, horizonte {args.horizon}")
+    print(f"add() con los estadísticos de D/W/M: {t_add / updates * 1000:7.3f} ms por día")
+    for model in STATE_MODELS:
+        print(f"{model:12s} incremental {t_state[model] / updates / 3 * 1e6:8.1f} µs "
+              f"(sin MAE {t_moments[model] / updates / 3 * 1e6:6.1f} µs)   "
+              f"reajuste {t_refit[model] / updates / 3 * 1e6:8.1f} µs")
+    print(f"diferencia relativa máxima de los pronósticos: {worst:.1e}")
+
+
+def bench_backtest(args):
+    """Validación cruzada de todos los modelos × D/W/M con 1..N procesos."""
+    from concurrent.futures import ProcessPoolExecutor
+    from backtest import run_backtest
+    from forecasting import MODELS
+
+    rollup = synthetic_rollup(args.years)
+    series = {
+        (period, name): synthetic_rollup(args.years, seed).buckets(period)[1]
+        for period in ('D', 'W', 'M')
+        for seed, name in enumerate(('ganancias', 'gastos'))
+    }
+    print(f"{args.years} años ({len(rollup)} días), {len(MODELS)} modelos, "
+          f"{args.folds} orígenes, horizonte {args.horizon}")
+
+    t_serial = timed(lambda: run_backtest(series, MODELS, args.horizon, args.folds), args.repeat)
+    print(f"en proceso:   {t_serial * 1000:9.1f} ms")
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            run_backtest(series, MODELS, args.horizon, args.folds, executor=pool)  # arranque del pool
+            elapsed = timed(lambda: run_backtest(series, MODELS, args.horizon, args.folds, executor=pool), args.repeat)
+        print(f"{workers:2d} procesos: {elapsed * 1000:9.1f} ms  x{t_serial / elapsed:.2f}")
+        workers *= 2
+
+
+def bench_breakdown(args):
+    """/get_breakdown: índice por día y descripción vs. `groupby` sobre todas las filas."""
+    import numpy as np
+    import pandas as pd
+    from app import filter_by_date
+    from rollups import DAY_NS, CategoryRollup
+
+    rng = np.random.default_rng(0)
+    start = pd.Timestamp('2020-01-01', tz='UTC').value
+    days = args.years * 365
+    ts = np.sort(rng.integers(start, start + days * DAY_NS, args.rows))
+    amount = rng.gamma(2.0, 500.0, args.rows).round(2)
+    # Pocas descripciones concentran la mayoría de los gastos (Zipf)
+    codes = ((rng.zipf(1.3, args.rows) - 1) % args.categories).astype('int32')
+    names = [f'Mantenimiento bus {i}' for i in range(args.categories)]
+    desc = pd.Categorical.from_codes(codes, categories=names)
+    df = pd.DataFrame({'Gasto': amount, 'Descripcion': desc},
+                      index=pd.DatetimeIndex(ts.view('datetime64[ns]'), name='Fecha'))
+    print(f"{args.rows} gastos, {args.categories} descripciones, {args.years} años")
+
+    build = timed(lambda: CategoryRollup.from_columns(ts, amount, desc), 1)
+    index = CategoryRollup.from_columns(ts, amount, desc)
+    print(f"armado del índice:        {build * 1000:9.1f} ms  ({len(index)} pares día/descripción, "
+          f"{(index.days.nbytes + index.codes.nbytes + index.sums.nbytes + index.counts.nbytes) / 2**20:.1f} MB)")
+    last_day = slice(np.searchsorted(ts, ts[-1] - DAY_NS), None)
+    head = CategoryRollup.from_columns(ts[:last_day.start], amount[:last_day.start], desc[:last_day.start])
+    add = timed(lambda: head.add(ts[last_day], amount[last_day], desc[last_day]), args.repeat)
+    print(f"agregar el último día:    {add * 1000:9.2f} ms  ({len(ts) - last_day.start} filas)")
+
+    def groupby_top(freq, top, start_date, end_date):
+        rows = df if start_date is None else filter_by_date(df, start_date, end_date)
+        grouper = pd.Grouper(freq={'M': 'ME', 'W': 'W'}.get(freq, freq))
+        sums = rows.groupby([grouper, 'Descripcion'], observed=True)['Gasto'].sum()
+        return sums.sort_values(ascending=False, kind='stable').groupby(level=0).head(top).sort_index(level=0, sort_remaining=False)
+
+    last = np.datetime64(int(ts[-1]), 'ns').astype('datetime64[D]')
+    end, start_90 = str(last), str(last - 90)
+    for freq in ('D', 'W', 'M'):
+        for start_date, end_date, label in ((None, None, 'todo'), (start_90, end, '90 días')):
+            fresh = lambda: CategoryRollup(index.categories, index.days, index.codes, index.sums, index.counts)
+            top = index.top(freq, 10, start_date, end_date)
+            expected = groupby_top(freq, 10, start_date, end_date)
+            assert np.allclose(np.sort(top['top_sums']), np.sort(expected.to_numpy()))
+            t_groupby = timed(lambda: groupby_top(freq, 10, start_date, end_date), args.repeat)
+            # Primera consulta de la versión (arma los períodos) y las siguientes
+            t_first = timed(lambda: fresh().top(freq, 10, start_date, end_date), args.repeat)
+            t_index = timed(lambda: index.top(freq, 10, start_date, end_date), args.repeat)
+            print(f"{freq} {label:8s} groupby {t_groupby * 1000:9.1f} ms   índice {t_first * 1000:8.2f} ms "
+                  f"(luego {t_index * 1000:7.2f} ms)  x{t_groupby / t_index:.0f}")
+
+
+def bench_dashboard(args):
+    """Carga del dashboard: /get_data + /get_predictions vs. una sola petición a /get_dashboard.
+
+    Con la caché de datos vencida (cada petición sincroniza, como con
+    `DATA_CACHE_TTL=0`) y vigente; cuenta las consultas al upstream por carga.
+    """
+    records = {field: rows * args.scale for field, rows in load_dumps().items()}
+    params = ('chart_type=separate&start_date=2024-01-01&end_date=2024-12-31&max_points=1000'
+              '&model_type=poly2&prediction_days=30&prediction_period=W')
+    flows = {
+        'get_data + get_predictions': [f'/get_data?{params}', f'/get_predictions?{params}'],
+        'get_dashboard': [f'/get_dashboard?{params}'],
+    }
+    with StubGraphQLServer(records=records, delay=args.delay) as stub:
+        os.environ.update(GRAPHQL_URL=stub.url, SNAPSHOT_DIR='', PRECOMPUTE='0', DATA_CACHE_TTL='0')
+        import app
+
+        client = app.app.test_client()
+        client.get(flows['get_dashboard'][0])  # primera carga completa
+        print(f"{sum(len(rows) for rows in records.values())} filas, upstream con {args.delay * 1000:.0f} ms de latencia")
+        for cache, ttl in (('vencida', 0.0), ('vigente', float('inf'))):
+            app.dataset_cache.ttl = ttl
+            for name, urls in flows.items():
+                def load():
+                    app.forecast_cache.clear()
+                    for url in urls:
+                        response = client.get(url)
+                        assert response.status_code == 200, (url, response.status_code)
+
+                before = stub.requests
+                load()
+                queries = stub.requests - before
+                elapsed = timed(load, args.repeat)
+                print(f"caché {cache:8s} {name:28s} {elapsed * 1000:8.1f} ms  {queries} consultas al upstream")
+
+
+# Hasta este tamaño también se arman los registros JSON para medir el parseo
+MAX_RECORDS = 2_000_000
+
+
+def git_revision():
+    """(commit, hay cambios sin guardar) del árbol actual."""
+    def git(*cmd):
+        return subprocess.run(['git', *cmd], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return git('rev-parse', 'HEAD') or 'unknown', bool(git('status', '--porcelain', '--untracked-files=no'))
+
+
+def suite_cases(app, data, records):
+    """{nombre: función} de los casos de la suite."""
+    from forecasting import MODELS
+    from ingest import read_columns
+    from sync import DataSync, SERIES
+
+    cases = {}
+    if records is not None:
+        payloads = {field: json.dumps({'data': {field: rows}}) for field, rows in records.items()}
+        cases['parse.json'] = lambda: [json.loads(body) for body in payloads.values()]
+        builders = {'ventaBoletos': app.ventas_frame, 'gastos': app.gastos_frame}
+        cases['parse.get_datos'] = lambda: DataSync(None, builders).load_records(records)
+        cases['parse.stream'] = lambda: DataSync(None, builders).load_columns({
+            field: read_columns([body], field, *SERIES[field]) for field, body in payloads.items()})
+
+    for chart_type in ('daily', 'monthly', 'separate', 'combined'):
+        cases[f'chart.{chart_type}'] = (
+            lambda chart_type=chart_type: app.process_data_for_chart(data, chart_type, max_points=1000))
+    for model in MODELS:
+        for period in ('D', 'W', 'M'):
+            cases[f'predict.{model}.{period}'] = (
+                lambda model=model, period=period: app.make_predictions(data, model, 30, period))
+
+    # Arranque de un proceso nuevo (sin instantánea ni red)
+    env = dict(os.environ, DATA_SOURCE='synthetic', SNAPSHOT_DIR='', PRECOMPUTE='0')
+    cases['startup.import'] = lambda: subprocess.run([sys.executable, '-c', 'import app'], cwd=ROOT, env=env, check=True)
+
+    client = app.app.test_client()
+
+    def round_trip(url):
+        app.forecast_cache.clear()
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+
+    for chart_type in ('daily', 'monthly', 'separate', 'combined'):
+        url = f'/get_data?chart_type={chart_type}&max_points=1000'
+        cases[f'http.get_data.{chart_type}'] = lambda url=url: round_trip(url)
+        cases[f'http.get_data.{chart_type}.binary'] = lambda url=url: round_trip(url + '&format=binary')
+    for model in MODELS:
+        url = f'/get_predictions?model_type={model}&prediction_days=30&prediction_period=W'
+        cases[f'http.get_predictions.{model}'] = lambda url=url: round_trip(url)
+    url = '/get_dashboard?chart_type=separate&max_points=1000&model_type=linear&prediction_period=W'
+    cases['http.get_dashboard'] = lambda url=url: round_trip(url)
+    for period in ('D', 'W', 'M'):
+        url = f'/get_breakdown?period={period}&top=10'
+        cases[f'http.get_breakdown.{period}'] = lambda url=url: round_trip(url)
+    return cases
+
+
+def load_synthetic(app, ventas, gastos):
+    """Carga en `app` un historial sintético que no vence; devuelve (dataset, registros o None)."""
+    import synthetic
+    from store import save_snapshot
+
+    series = synthetic.generate(ventas, gastos)
+    records = None
+    if ventas + gastos <= MAX_RECORDS:
+        records = {field: synthetic.to_records(field, cols) for field, cols in series.items()}
+    with tempfile.TemporaryDirectory() as tmp:
+        save_snapshot(tmp, series)
+        app.data_sync.load_snapshot(tmp)
+    app.dataset_cache.ttl = float('inf')
+    app.dataset_cache.put(app.data_sync.dataset())
+    return app.dataset_cache.get(), records
+
+
+def bench_suite(args):
+    """Todos los casos sobre un historial sintético de `--size` ventas; guarda los tiempos."""
+    os.environ['SNAPSHOT_DIR'] = ''
+    import app
+
+    ventas, gastos = args.size, max(args.size // 4, 1)
+    data, records = load_synthetic(app, ventas, gastos)
+
+    cases = suite_cases(app, data, records)
+    if args.filter:
+        cases = {name: fn for name, fn in cases.items() if args.filter in name}
+
+    commit, dirty = git_revision()
+    print(f"{commit[:10]}{' (con cambios)' if dirty else ''}: {ventas} ventas, {gastos} gastos")
+    results = {}
+    for name, fn in cases.items():
+        fn()  # calentamiento
+        times = samples(fn, args.repeat)
+        results[name] = {'min': min(times), 'median': statistics.median(times), 'repeat': len(times)}
+        print(f"{name:40s} {results[name]['min'] * 1000:10.2f} ms  (mediana {results[name]['median'] * 1000:.2f})")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{commit[:10]}{'-dirty' if dirty else ''}-{args.size}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'commit': commit, 'dirty': dirty, 'size': args.size, 'ventas': ventas, 'gastos': gastos,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+            'machine': platform.machine(), 'cases': results,
+        }, f, indent=2)
+    print(f"resultados en {os.path.relpath(path, ROOT)}")
+
+
+def find_results(ref, size):
+    if os.path.exists(ref):
+        return ref
+    matches = sorted(glob.glob(os.path.join(RESULTS_DIR, f'{ref}*-{size}.json')))
+    if not matches:
+        sys.exit(f"no hay resultados de {ref} con --size {size} en {RESULTS_DIR}")
+    return matches[-1]
+
+
+def bench_compare(args):
+    """Compara dos corridas de la suite (archivo o prefijo de commit); falla si hay regresiones."""
+    if len(args.files) != 2:
+        sys.exit("uso: benchmarks.py compare BASE NUEVO [--size N] [--threshold 0.1]")
+    runs = []
+    for ref in args.files:
+        with open(find_results(ref, args.size), encoding='utf-8') as f:
+            runs.append(json.load(f))
+    base, new = runs
+    print(f"{base['commit'][:10]} -> {new['commit'][:10]} ({new['ventas']} ventas, {new['gastos']} gastos)")
+    regressions = 0
+    for name in sorted(set(base['cases']) & set(new['cases'])):
+        before, after = base['cases'][name]['min'], new['cases'][name]['min']
+        ratio = after / before
+        flag = ''
+        if ratio > 1 + args.threshold:
+            flag = '  REGRESIÓN'
+            regressions += 1
+        elif ratio < 1 - args.threshold:
+            flag = '  mejora'
+        print(f"{name:40s} {before * 1000:10.2f} -> {after * 1000:10.2f} ms  x{ratio:5.2f}{flag}")
+    if regressions:
+        sys.exit(f"{regressions} casos más lentos que el umbral de {args.threshold:.0%}")
+
+
+BENCHMARKS = {
+    'fetch': bench_fetch,
+    'snapshot': bench_snapshot,
+    'ingest': bench_ingest,
+    'filter': bench_filter,
+    'downsample': bench_downsample,
+    'forecast': bench_forecast,
+    'backtest': bench_backtest,
+    'incremental': bench_incremental,
+    'breakdown': bench_breakdown,
+    'dashboard': bench_dashboard,
+    'encoding': bench_encoding,
+    'metrics': bench_metrics,
+    'shared': bench_shared,
+    'startup': bench_startup,
+    'serving': bench_serving,
+    'suite': bench_suite,
+    'compare': bench_compare,
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('files', nargs='*', help='para compare: dos archivos de resultados o prefijos de commit')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--delay', type=float, default=0.2, help='latencia del upstream (s)')
+    parser.add_argument('--scale', type=int, default=1, help='veces que se replican los datos de data/')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='filas sintéticas')
+    parser.add_argument('--years', type=int, default=5, help='años de historial sintético')
+    parser.add_argument('--categories', type=int, default=10_000, help='para breakdown: descripciones distintas')
+    parser.add_argument('--folds', type=int, default=100, help='orígenes de la validación cruzada')
+    parser.add_argument('--horizon', type=int, default=7, help='períodos pronosticados por origen')
+    parser.add_argument('--workers', type=int, default=4, help='procesos de la app para shared')
+    parser.add_argument('--duration', type=float, default=10.0, help='segundos de la corrida de shared')
+    parser.add_argument('--size', type=int, default=100_000, help='ventas sintéticas de la suite (10k a 10M)')
+    parser.add_argument('--filter', default='', help='solo los casos de la suite que contengan este texto')
+    parser.add_argument('--dashboards', type=int, default=50, help='para serving: clientes simultáneos')
+    parser.add_argument('--threads', type=int, default=10, help='para serving: hilos del servidor en cada modo')
+    parser.add_argument('--no-stream', action='store_true', help='para serving: los clientes no abren /stream')
+    parser.add_argument('--max-ms', type=float, default=500, help='para startup: tope de la importación de app')
+    parser.add_argument('--threshold', type=float, default=0.10, help='para compare: tolerancia antes de marcar regresión')
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
@@ -0,0 +1,46 @@
+"""Configuración de pytest: la raíz del repositorio en `sys.path` y la app contra el servidor GraphQL local."""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+
+# `app` lee su configuración al importarse: sin tocar data/snapshot ni precalcular
+os.environ.setdefault('SNAPSHOT_DIR', '')
+os.environ.setdefault('PRECOMPUTE', '0')
+
+from stub_graphql import ROOT_FIELDS, StubGraphQLServer, load_dumps  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def stub():
+    """Servidor GraphQL local con los volcados de data/, compartido por toda la corrida."""
+    server = StubGraphQLServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope='session')
+def app_module(stub):
+    """El módulo `app` apuntando a `stub` (se importa una sola vez)."""
+    os.environ['GRAPHQL_URL'] = stub.url
+    import app
+    assert app.GRAPHQL_URL == stub.url, "app ya estaba importada con otro GRAPHQL_URL"
+    return app
+
+
+@pytest.fixture
+def app_client(app_module, stub):
+    """Cliente de prueba de la app con las cachés vacías y el upstream con todos los datos."""
+    stub.records = load_dumps()
+    stub.limits = {}
+    stub.delay = 0.0
+    app_module.data_sync.reset()
+    app_module.dataset_cache.invalidate()
+    app_module.dataset_cache.ttl = 60.0
+    app_module.forecast_cache.clear()
+    for field in ROOT_FIELDS:
+        stub.hits[field] = 0
+    return app_module.app.test_client()
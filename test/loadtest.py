@@ -0,0 +1,397 @@
+"""Prueba de carga de punta a punta de la app contra el servidor GraphQL local.
+
+Levanta el servidor GraphQL local con los volcados de data/ (replicados
+`--scale` veces) o con datos sintéticos (`--synthetic` ventas), arranca la app
+en un proceso aparte y la carga con `--concurrency` clientes que piden sin
+pausa una mezcla de gráficos, rangos de fechas, modelos y horizontes. Informa
+peticiones por segundo, latencias p50/p95/p99 y errores por endpoint, la
+memoria (RSS) de los procesos del servidor y las consultas al upstream, y
+guarda todo en test/results/load-*.json para comparar versiones y
+configuraciones:
+
+    python test/loadtest.py --concurrency 20 --duration 30
+    python test/loadtest.py --server wsgi --workers 4 --threads 8 --synthetic 1000000
+    python test/loadtest.py --server asgi --mix data=1,dashboard=1 --delay 0.2 --ttl 5
+    python test/loadtest.py --env PRECOMPUTE=1 --env FORECAST_CACHE_SIZE=0
+    python test/loadtest.py --compare test/results/load-A.json test/results/load-B.json
+
+Los clientes son de lazo cerrado (cada uno pide la siguiente URL al recibir
+la respuesta anterior) y la secuencia de URLs depende solo de `--seed`, así
+dos corridas con la misma semilla piden lo mismo.
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks import RESULTS_DIR, ROOT, git_revision, wait_for
+from stub_graphql import StubGraphQLServer, load_dumps
+
+# Cómo se arranca la app en cada modo; `wsgi` necesita gunicorn y `asgi`, uvicorn
+SERVERS = {
+    'flask': lambda port, args: [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(port),
+                                 '--with-threads', '--no-reload'],
+    'wsgi': lambda port, args: ['gunicorn', '-k', 'gthread', '-w', str(args.workers), '--threads', str(args.threads),
+                                '-b', f'127.0.0.1:{port}', 'app:app'],
+    'asgi': lambda port, args: ['uvicorn', 'asgi:app', '--port', str(port), '--workers', str(args.workers),
+                                '--log-level', 'warning', '--timeout-graceful-shutdown', '1'],
+}
+
+CHART_TYPES = ('daily', 'monthly', 'separate', 'combined')
+MODELS = ('linear', 'poly2', 'poly3', 'moving_avg', 'rolling_avg', 'exp_smoothing')
+PERIODS = ('D', 'W', 'M')
+HORIZONS = (7, 30, 90)
+MAX_POINTS = (None, 500, 1000)
+# Días hacia atrás de los rangos de fechas; None es el historial completo
+RANGE_DAYS = (None, None, 30, 90, 365)
+DEFAULT_MIX = 'data=5,predictions=3,dashboard=2,breakdown=1'
+
+
+def parse_mix(text):
+    """'data=5,predictions=3' -> {'data': 5.0, 'predictions': 3.0}."""
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        kind = kind.strip()
+        if kind not in REQUESTS:
+            sys.exit(f"--mix: '{kind}' no es uno de {sorted(REQUESTS)}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def date_range(rng, first_day, last_day):
+    """Parámetros de un rango de fechas: casi siempre hasta el último día, a veces una ventana anterior."""
+    days = rng.choice(RANGE_DAYS)
+    if days is None:
+        return {}
+    end = last_day
+    if rng.random() < 0.25:
+        end -= datetime.timedelta(days=rng.randrange(max((last_day - first_day).days - days, 1)))
+    start = max(end - datetime.timedelta(days=days), first_day)
+    return {'start_date': start.isoformat(), 'end_date': end.isoformat()}
+
+
+def chart_params(rng, first_day, last_day):
+    params = {'chart_type': rng.choice(CHART_TYPES), **date_range(rng, first_day, last_day)}
+    max_points = rng.choice(MAX_POINTS)
+    if max_points is not None:
+        params['max_points'] = max_points
+    return params
+
+
+def prediction_params(rng):
+    return {'model_type': rng.choice(MODELS), 'prediction_days': rng.choice(HORIZONS),
+            'prediction_period': rng.choice(PERIODS)}
+
+
+# Parámetros de cada tipo de petición: {tipo: (ruta, fn(rng, primer día, último día))}
+REQUESTS = {
+    'data': ('/get_data', chart_params),
+    'predictions': ('/get_predictions', lambda rng, first, last: {
+        **prediction_params(rng), **(date_range(rng, first, last) if rng.random() < 0.3 else {})}),
+    'dashboard': ('/get_dashboard', lambda rng, first, last: {
+        **chart_params(rng, first, last), **prediction_params(rng)}),
+    'breakdown': ('/get_breakdown', lambda rng, first, last: {
+        'period': rng.choice(PERIODS), 'top': rng.choice((5, 10, 20)), **date_range(rng, first, last)}),
+}
+
+
+def request_plan(rng, mix, first_day, last_day, count):
+    """`count` peticiones (tipo, url relativa) elegidas según los pesos de `mix`."""
+    kinds, weights = zip(*mix.items())
+    plan = []
+    for kind in rng.choices(kinds, weights, k=count):
+        path, params = REQUESTS[kind]
+        query = '&'.join(f'{key}={value}' for key, value in params(rng, first_day, last_day).items())
+        plan.append((kind, f'{path}?{query}'))
+    return plan
+
+
+def percentile(values, q):
+    """Percentil `q` (0-100) por rango más cercano de `values` ordenados."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(math.ceil(q / 100 * len(values)) - 1, 0))]
+
+
+def process_tree(pid):
+    """`pid` y todos sus descendientes (workers de gunicorn o uvicorn), según /proc."""
+    pids, pending = [], [pid]
+    while pending:
+        pid = pending.pop()
+        pids.append(pid)
+        try:
+            with open(f'/proc/{pid}/task/{pid}/children', encoding='ascii') as f:
+                pending.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def tree_rss_kb(pid):
+    """RSS (kB) sumado de `pid` y sus descendientes, o None fuera de Linux."""
+    total = None
+    for child in process_tree(pid):
+        try:
+            with open(f'/proc/{child}/status', encoding='ascii') as f:
+                rss = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+        except (OSError, StopIteration):
+            continue
+        total = (total or 0) + rss
+    return total
+
+
+class RSSSampler:
+    """Mide cada `interval` segundos la memoria del servidor; guarda el pico y la última lectura."""
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = None
+        self.last_kb = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while True:
+            rss = tree_rss_kb(self.pid)
+            if rss is not None:
+                self.last_kb = rss
+                self.peak_kb = max(self.peak_kb or 0, rss)
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_load(base, plans, warmup, duration, timeout):
+    """Un cliente por plan, en bucle sobre su lista de URLs durante `warmup` + `duration` segundos.
+
+    Solo se registran las respuestas de la parte medida. Devuelve
+    ({tipo: [latencias en s de las respuestas 200]}, {tipo: errores}, segundos medidos).
+    """
+    import requests
+
+    latencies = {kind: [] for kind in REQUESTS}
+    errors = {kind: 0 for kind in REQUESTS}
+    lock = threading.Lock()
+    measuring = threading.Event()
+    stop = threading.Event()
+
+    def client(plan):
+        session = requests.Session()
+        n = 0
+        while not stop.is_set():
+            kind, url = plan[n % len(plan)]
+            n += 1
+            start = time.perf_counter()
+            try:
+                ok = session.get(base + url, timeout=timeout).status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            if not measuring.is_set() or stop.is_set():
+                continue
+            with lock:
+                if ok:
+                    latencies[kind].append(elapsed)
+                else:
+                    errors[kind] += 1
+        session.close()
+
+    threads = [threading.Thread(target=client, args=(plan,), daemon=True) for plan in plans]
+    for thread in threads:
+        thread.start()
+    time.sleep(warmup)
+    measuring.set()
+    started = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    elapsed = time.perf_counter() - started
+    for thread in threads:
+        thread.join(timeout + 1)
+    return latencies, errors, elapsed
+
+
+def summarize(latencies, errors, elapsed):
+    """Peticiones, errores, peticiones/s (solo las respuestas 200) y percentiles en ms."""
+    done = len(latencies)
+    latencies = sorted(x * 1000 for x in latencies)
+    return {
+        'requests': done + errors,
+        'errors': errors,
+        'error_rate': errors / (done + errors) if done + errors else 0.0,
+        'rps': done / elapsed,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': latencies[-1] if latencies else None,
+    }
+
+
+def format_ms(value):
+    return f"{value:8.1f}" if value is not None else f"{'-':>8s}"
+
+
+def print_summary(name, summary):
+    print(f"{name:12s} {summary['requests']:7d} {summary['rps']:8.1f}/s  p50 {format_ms(summary['p50_ms'])} ms"
+          f"  p95 {format_ms(summary['p95_ms'])} ms  p99 {format_ms(summary['p99_ms'])} ms"
+          f"  errores {summary['errors']} ({summary['error_rate']:.1%})")
+
+
+def seed_records(args):
+    """Registros del upstream: los volcados de data/ o datos sintéticos."""
+    if args.synthetic:
+        import synthetic
+
+        series = synthetic.generate(args.synthetic, max(args.synthetic // 4, 1), seed=args.seed)
+        return {field: synthetic.to_records(field, cols) for field, cols in series.items()}
+    return {field: rows * args.scale for field, rows in load_dumps().items()}
+
+
+def history_span(records):
+    """(primer día, último día) de las ventas."""
+    dates = [r['fechaVenta'] for r in records['ventaBoletos']]
+    return datetime.date.fromisoformat(min(dates)[:10]), datetime.date.fromisoformat(max(dates)[:10])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def loadtest(args):
+    mix = parse_mix(args.mix)
+    port = free_port()
+    command = SERVERS[args.server](port, args)
+    if shutil.which(command[0]) is None:
+        sys.exit(f"{args.server}: falta {command[0]}")
+    base = f'http://127.0.0.1:{port}'
+
+    records = seed_records(args)
+    rows = {field: len(field_records) for field, field_records in records.items()}
+    first_day, last_day = history_span(records)
+    rng = random.Random(args.seed)
+    plans = [request_plan(random.Random(rng.random()), mix, first_day, last_day, args.plan_size)
+             for _ in range(args.concurrency)]
+
+    extra_env = dict(item.split('=', 1) for item in args.env)
+    commit, dirty = git_revision()
+    print(f"{commit[:10]}{' (con cambios)' if dirty else ''}: {args.server}, {args.workers} procesos x "
+          f"{args.threads} hilos, {args.concurrency} clientes, {rows['ventaBoletos']} ventas, {rows['gastos']} gastos "
+          f"({first_day} a {last_day})")
+
+    with StubGraphQLServer(records=records, delay=args.delay) as stub:
+        env = dict(os.environ, GRAPHQL_URL=stub.url, SNAPSHOT_DIR='', PRECOMPUTE='0',
+                   DATA_CACHE_TTL=str(args.ttl), ASGI_THREADS=str(args.threads))
+        env.update(extra_env)
+        server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                                  stderr=None if args.verbose else subprocess.DEVNULL)
+        try:
+            wait_for(base + '/', timeout=args.startup_timeout)
+            idle_kb = tree_rss_kb(server.pid)
+            with RSSSampler(server.pid) as rss:
+                latencies, errors, elapsed = run_load(base, plans, args.warmup, args.duration, args.timeout)
+        finally:
+            server.terminate()
+            server.wait()
+        upstream = dict(stub.hits)
+
+    endpoints = {kind: summarize(latencies[kind], errors[kind], elapsed) for kind in mix}
+    total = summarize([x for kind in mix for x in latencies[kind]], sum(errors[kind] for kind in mix), elapsed)
+    for kind, summary in endpoints.items():
+        print_summary(kind, summary)
+    print_summary('total', total)
+    rss = {'idle_kb': idle_kb, 'peak_kb': rss.peak_kb, 'last_kb': rss.last_kb}
+    if rss['peak_kb'] is not None:
+        print(f"RSS del servidor: pico {rss['peak_kb'] / 1024:.1f} MB, al terminar {rss['last_kb'] / 1024:.1f} MB")
+    print(f"consultas al upstream: {upstream}")
+
+    result = {
+        'commit': commit, 'dirty': dirty, 'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count(),
+        'config': {
+            'server': args.server, 'workers': args.workers, 'threads': args.threads,
+            'concurrency': args.concurrency, 'duration': args.duration, 'warmup': args.warmup,
+            'mix': mix, 'seed': args.seed, 'delay': args.delay, 'ttl': args.ttl, 'env': extra_env,
+            'source': 'synthetic' if args.synthetic else 'data', 'scale': args.scale, 'rows': rows,
+        },
+        'total': total, 'endpoints': endpoints, 'rss': rss, 'upstream_queries': upstream,
+    }
+    path = args.out
+    if path is None:
+        name = (f"load-{commit[:10]}{'-dirty' if dirty else ''}-{args.server}-w{args.workers}t{args.threads}"
+                f"-c{args.concurrency}-{rows['ventaBoletos']}.json")
+        path = os.path.join(RESULTS_DIR, name)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"resultados en {os.path.relpath(path, ROOT)}")
+
+
+def compare(paths):
+    """Dos corridas lado a lado: peticiones/s y latencias de cada endpoint."""
+    runs = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            runs.append(json.load(f))
+    for run in runs:
+        config = run['config']
+        print(f"{run['commit'][:10]}{' (con cambios)' if run['dirty'] else ''}: {config['server']} "
+              f"{config['workers']}x{config['threads']}, {config['concurrency']} clientes, {config['rows']}")
+    base, new = runs
+    names = [kind for kind in base['endpoints'] if kind in new['endpoints']] + ['total']
+    for name in names:
+        before = base['total'] if name == 'total' else base['endpoints'][name]
+        after = new['total'] if name == 'total' else new['endpoints'][name]
+        line = f"{name:12s} {before['rps']:8.1f} -> {after['rps']:8.1f}/s"
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            line += f"  {key[:3]} {format_ms(before[key])} -> {format_ms(after[key])} ms"
+        print(f"{line}  errores {before['error_rate']:.1%} -> {after['error_rate']:.1%}")
+    if base['rss']['peak_kb'] and new['rss']['peak_kb']:
+        print(f"RSS pico {base['rss']['peak_kb'] / 1024:.1f} -> {new['rss']['peak_kb'] / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=sorted(SERVERS), default='flask')
+    parser.add_argument('--workers', type=int, default=1, help='procesos del servidor (wsgi y asgi)')
+    parser.add_argument('--threads', type=int, default=10, help='hilos por proceso (wsgi y asgi)')
+    parser.add_argument('--concurrency', type=int, default=10, help='clientes simultáneos')
+    parser.add_argument('--duration', type=float, default=20.0, help='segundos medidos')
+    parser.add_argument('--warmup', type=float, default=3.0, help='segundos de carga previos, sin medir')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'pesos de cada tipo de petición ({DEFAULT_MIX})')
+    parser.add_argument('--plan-size', type=int, default=200, help='URLs distintas por cliente')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scale', type=int, default=1, help='veces que se replican los datos de data/')
+    parser.add_argument('--synthetic', type=int, default=0, help='ventas sintéticas en lugar de data/')
+    parser.add_argument('--delay', type=float, default=0.0, help='latencia del upstream (s)')
+    parser.add_argument('--ttl', type=float, default=60.0, help='DATA_CACHE_TTL de la app (s)')
+    parser.add_argument('--env', action='append', default=[], metavar='CLAVE=VALOR',
+                        help='variable de entorno extra para la app (se puede repetir)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='tope de cada petición (s)')
+    parser.add_argument('--startup-timeout', type=float, default=60.0)
+    parser.add_argument('--out', default=None, help='archivo de resultados (por defecto en test/results/)')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NUEVO'), help='compara dos archivos de resultados')
+    parser.add_argument('--verbose', action='store_true', help='muestra la salida de errores del servidor')
+    args = parser.parse_args()
+    if args.compare:
+        compare(args.compare)
+    else:
+        loadtest(args)
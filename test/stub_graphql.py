@@ -0,0 +1,153 @@
+"""Servidor GraphQL local que imita a http://localhost:3000/api/graphql.
+
+Responde las consultas `ventaBoletos` y `gastos` con los volcados guardados
+en `data/` y cuenta cuántas veces se consulta cada campo, para poder probar
+la app sin el servicio real:
+
+    python test/stub_graphql.py --port 3000 --delay 0.2
+    GRAPHQL_URL=http://localhost:3000/api/graphql python app.py
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+VENTAS_FILE = os.path.join(DATA_DIR, 'pasar a luisiño')
+GASTOS_FILE = os.path.join(DATA_DIR, 'gastos')
+
+ROOT_FIELDS = ('ventaBoletos', 'gastos')
+
+
+def load_dumps(ventas_file=VENTAS_FILE, gastos_file=GASTOS_FILE):
+    with open(ventas_file, encoding='utf-8') as f:
+        ventas = json.load(f)['data']['ventaBoletos']
+    with open(gastos_file, encoding='utf-8') as f:
+        gastos = json.load(f)['data']['gastos']
+    return {'ventaBoletos': ventas, 'gastos': gastos}
+
+
+def parse_selection(query, field):
+    """Devuelve (argumentos, subcampos) pedidos para `field`, o None si no se pidió."""
+    match = re.search(r'\b' + field + r'\b\s*(\([^)]*\))?\s*\{([^}]*)\}', query)
+    if not match:
+        return None
+    args = dict(re.findall(r'(\w+)\s*:\s*"([^"]*)"', match.group(1) or ''))
+    return args, re.findall(r'\w+', match.group(2))
+
+
+class StubGraphQLServer:
+    """Servidor en un hilo aparte; `hits` cuenta las consultas por campo raíz.
+
+    `limits[field]` limita cuántas filas del volcado se sirven, para simular
+    un historial que crece. Con `delta_arg` se acepta ese argumento como
+    filtro "fecha >= valor"; sin él, cualquier argumento devuelve un error
+    de validación (con estado `error_status`). Las próximas `failures`
+    consultas responden 503, como un upstream caído.
+    """
+
+    def __init__(self, records=None, host='127.0.0.1', port=0, delay=0.0, delta_arg=None):
+        self.records = records if records is not None else load_dumps()
+        self.delay = delay
+        self.delta_arg = delta_arg
+        self.limits = {}
+        self.failures = 0
+        self.error_status = 200
+        self.rows_served = {field: 0 for field in ROOT_FIELDS}
+        self.hits = {field: 0 for field in ROOT_FIELDS}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/api/graphql'
+
+    def execute(self, query):
+        data = {}
+        for field in ROOT_FIELDS:
+            selection = parse_selection(query, field)
+            if selection is None:
+                continue
+            args, fields = selection
+            if set(args) - {self.delta_arg}:
+                return {'errors': [{'message': f'Unknown argument on field {field}'}]}
+
+            rows = self.records[field][:self.limits.get(field)]
+            if self.delta_arg in args:
+                time_field = 'fechaVenta' if field == 'ventaBoletos' else 'fecha'
+                rows = [row for row in rows if row[time_field] >= args[self.delta_arg]]
+            with self._lock:
+                self.hits[field] += 1
+                self.rows_served[field] += len(rows)
+            data[field] = [{k: row[k] for k in fields if k in row} for row in rows]
+        return {'data': data}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                with server._lock:
+                    server.requests += 1
+                if server.delay:
+                    time.sleep(server.delay)
+                with server._lock:
+                    failed = server.failures > 0
+                    server.failures -= failed
+                if failed:
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                result = server.execute(body.get('query', ''))
+                payload = json.dumps(result).encode('utf-8')
+                self.send_response(server.error_status if 'errors' in result else 200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor GraphQL local con los datos de data/')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--delay', type=float, default=0.0, help='latencia artificial por petición (s)')
+    parser.add_argument('--delta-arg', default=None, help='argumento aceptado como filtro de fecha')
+    args = parser.parse_args()
+
+    stub = StubGraphQLServer(host=args.host, port=args.port, delay=args.delay, delta_arg=args.delta_arg)
+    print(f'Sirviendo {stub.url}')
+    try:
+        stub._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,16 @@
+"""Cada caso de `benchmarks.py suite`, una vez y con pocos datos: que no se rompan entre mediciones."""
+from benchmarks import load_synthetic, suite_cases
+
+
+def test_suite_cases_run(app_client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module.dataset_cache, 'ttl', app_module.dataset_cache.ttl)
+    try:
+        data, records = load_synthetic(app_module, 2000, 500)
+        cases = suite_cases(app_module, data, records)
+        assert {'parse.stream', 'chart.daily', 'predict.linear.M', 'http.get_dashboard'} <= set(cases)
+        for fn in cases.values():
+            fn()
+    finally:
+        # Los datos sintéticos no quedan para las pruebas siguientes
+        app_module.data_sync.reset()
+        app_module.dataset_cache.invalidate()
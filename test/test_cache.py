@@ -0,0 +1,111 @@
+import threading
+
+import pandas as pd
+
+from cache import DatasetCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def frames(n=3):
+    return pd.DataFrame({'Ganancia': range(n)}), pd.DataFrame({'Gasto': range(n)})
+
+
+def test_loads_once_per_ttl():
+    clock = FakeClock()
+    loads = []
+    cache = DatasetCache(lambda: loads.append(1) or frames(), ttl=10, clock=clock)
+    for _ in range(5):
+        cache.get()
+    assert len(loads) == 1
+    clock.now = 9.9
+    cache.get()
+    assert len(loads) == 1
+    clock.now = 10
+    cache.get()
+    assert len(loads) == 2
+    assert cache.stats()['hits'] == 5
+
+
+def test_stale_copy_is_served_while_one_thread_reloads():
+    clock = FakeClock()
+    started, release = threading.Event(), threading.Event()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        if len(loads) > 1:
+            started.set()
+            release.wait(5)
+        return frames(len(loads))
+
+    cache = DatasetCache(loader, ttl=10, clock=clock)
+    first = cache.get()
+    clock.now = 20
+    reloader = threading.Thread(target=cache.get)
+    reloader.start()
+    assert started.wait(5)
+    # Mientras se recarga, el resto recibe la copia vencida sin volver a cargar
+    assert all(cache.get() is first for _ in range(10))
+    release.set()
+    reloader.join()
+    assert len(loads) == 2
+    assert cache.stats()['stale_hits'] == 10
+
+
+def test_oversized_dataset_is_still_retained():
+    cache = DatasetCache(frames, ttl=10, max_bytes=1, clock=FakeClock())
+    value = cache.get()
+    assert all(cache.get() is value for _ in range(5))
+    stats = cache.stats()
+    assert stats['loads'] == 1 and stats['oversized'] == 1
+
+
+class Versioned(tuple):
+    """Como `sync.Dataset`: un objeto nuevo por carga, con la versión de los datos."""
+
+    def __new__(cls, version):
+        value = super().__new__(cls, frames())
+        value.version = version
+        return value
+
+
+def test_oversized_warning_once_per_version(capsys):
+    clock = FakeClock()
+    versions = [1, 1, 1, 2, 2]
+    cache = DatasetCache(lambda: Versioned(versions.pop(0)), ttl=10, max_bytes=1, clock=clock)
+    for i in range(5):
+        clock.now = i * 10
+        cache.get()
+    stats = cache.stats()
+    assert stats['loads'] == 5 and stats['oversized'] == 2
+    assert capsys.readouterr().out.count('Aviso') == 2
+
+
+def test_upstream_hit_once_per_ttl_window(app_client, app_module, stub, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(app_module.dataset_cache, 'clock', clock)
+    app_module.dataset_cache.ttl = 60
+    urls = ['/get_data?chart_type=daily', '/get_data?chart_type=monthly', '/get_predictions?model_type=linear']
+    for _ in range(3):
+        for url in urls:
+            assert app_client.get(url).status_code == 200
+    assert stub.hits == {'ventaBoletos': 1, 'gastos': 1}
+
+    clock.now = 61
+    for url in urls:
+        assert app_client.get(url).status_code == 200
+    assert stub.hits == {'ventaBoletos': 2, 'gastos': 2}
+
+
+def test_refresh_button_invalidates(app_client, stub):
+    app_client.get('/get_data?chart_type=daily')
+    assert app_client.post('/refresh_data').status_code == 200
+    app_client.get('/get_data?chart_type=daily')
+    assert stub.hits == {'ventaBoletos': 2, 'gastos': 2}
@@ -0,0 +1,88 @@
+import gzip
+import json
+
+import pytest
+
+ENDPOINTS = (
+    '/get_data?chart_type=daily',
+    '/get_predictions?model_type=poly2&prediction_days=30&prediction_period=W',
+    '/get_dashboard?chart_type=monthly&model_type=linear&prediction_period=M',
+)
+
+
+@pytest.fixture
+def aggregation_calls(app_module, monkeypatch):
+    """Cuenta las llamadas a las funciones que agregan o ajustan modelos."""
+    calls = []
+    for name in ('process_data_for_chart', 'make_predictions', 'net_profit'):
+        original = getattr(app_module, name)
+        monkeypatch.setattr(app_module, name,
+                            lambda *args, _name=name, _original=original, **kwargs:
+                            calls.append(_name) or _original(*args, **kwargs))
+    return calls
+
+
+@pytest.mark.parametrize('url', ENDPOINTS)
+def test_revalidation_costs_no_work(app_client, aggregation_calls, url):
+    first = app_client.get(url)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'no-cache'
+    assert aggregation_calls
+
+    del aggregation_calls[:]
+    second = app_client.get(url, headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.data == b''
+    assert second.headers['ETag'] == etag
+    assert second.headers['X-Data-Version'] == first.headers['X-Data-Version']
+    assert aggregation_calls == []
+
+
+def test_if_modified_since(app_client):
+    first = app_client.get(ENDPOINTS[0])
+    second = app_client.get(ENDPOINTS[0], headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert second.status_code == 304 and second.data == b''
+
+
+def test_etag_depends_on_parameters_and_format(app_client):
+    etags = {
+        app_client.get(url).headers['ETag']
+        for url in ('/get_data?chart_type=daily', '/get_data?chart_type=monthly',
+                    '/get_data?chart_type=daily&format=columnar')
+    }
+    assert len(etags) == 3
+    stale = app_client.get('/get_data?chart_type=monthly',
+                           headers={'If-None-Match': app_client.get('/get_data?chart_type=daily').headers['ETag']})
+    assert stale.status_code == 200
+
+
+def test_etag_changes_with_new_data(app_module, app_client, stub):
+    stub.limits = {field: len(rows) - 30 for field, rows in stub.records.items()}
+    first = app_client.get(ENDPOINTS[0])
+    stub.limits = {}
+    app_module.dataset_cache.invalidate()
+    second = app_client.get(ENDPOINTS[0], headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert int(second.headers['X-Data-Version']) > int(first.headers['X-Data-Version'])
+
+
+def test_gzip_above_threshold(app_module, app_client):
+    plain = app_client.get(ENDPOINTS[0])
+    assert 'Content-Encoding' not in plain.headers
+    assert len(plain.data) >= app_module.COMPRESS_MIN_BYTES
+
+    compressed = app_client.get(ENDPOINTS[0], headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert len(compressed.data) < len(plain.data)
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
+    # El ETag es débil: el mismo para el cuerpo comprimido y el original
+    assert compressed.headers['ETag'] == plain.headers['ETag']
+
+
+def test_small_responses_are_not_compressed(app_module, app_client):
+    response = app_client.get('/precompute_status', headers={'Accept-Encoding': 'gzip'})
+    assert len(response.data) < app_module.COMPRESS_MIN_BYTES
+    assert 'Content-Encoding' not in response.headers
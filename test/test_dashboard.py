@@ -0,0 +1,96 @@
+import time
+
+import numpy as np
+import pytest
+
+PARAMS = 'chart_type=monthly&model_type=poly2&prediction_days=12&prediction_period={period}'
+
+
+def separate_urls(period):
+    params = PARAMS.format(period=period)
+    return f'/get_data?{params}', f'/get_predictions?{params}'
+
+
+@pytest.fixture
+def no_cache(app_module, app_client):
+    """Cada lectura de los datos va al upstream, como con la caché vencida."""
+    app_module.dataset_cache.ttl = 0.0
+    return app_client
+
+
+def timed(app_module, client, urls):
+    # Sin pronósticos ya calculados, para que ambos flujos hagan el mismo trabajo
+    app_module.forecast_cache.clear()
+    start = time.perf_counter()
+    responses = [client.get(url) for url in urls]
+    assert all(response.status_code == 200 for response in responses)
+    return time.perf_counter() - start, responses
+
+
+def test_one_upstream_fetch_per_dashboard(app_module, no_cache, stub):
+    # La primera sincronización (completa) no cuenta para comparar tiempos
+    no_cache.get('/get_data?chart_type=daily')
+    stub.hits.update(dict.fromkeys(stub.hits, 0))
+    dashboard_time, _ = timed(app_module, no_cache, [f'/get_dashboard?{PARAMS.format(period="W")}'])
+    assert stub.hits == {'ventaBoletos': 1, 'gastos': 1}
+
+    two_call_time, _ = timed(app_module, no_cache, separate_urls('W'))
+    assert stub.hits == {'ventaBoletos': 3, 'gastos': 3}
+    print(f"dashboard {dashboard_time * 1000:.1f} ms, /get_data + /get_predictions {two_call_time * 1000:.1f} ms")
+
+
+def test_slow_upstream_latency(app_module, no_cache, stub):
+    # Con el upstream lento, cada lectura cuesta al menos `delay`; las dos
+    # llamadas separadas pagan dos lecturas y el dashboard una sola
+    stub.delay = 0.1
+    no_cache.get('/get_data?chart_type=daily')
+    dashboard_time, _ = timed(app_module, no_cache, [f'/get_dashboard?{PARAMS.format(period="M")}'])
+    two_call_time, _ = timed(app_module, no_cache, separate_urls('M'))
+    print(f"upstream lento: dashboard {dashboard_time * 1000:.1f} ms, dos llamadas {two_call_time * 1000:.1f} ms")
+    assert two_call_time >= 2 * stub.delay
+
+
+@pytest.mark.parametrize('period', ['D', 'W', 'M'])
+def test_matches_separate_endpoints(app_client, period):
+    dashboard = app_client.get(f'/get_dashboard?{PARAMS.format(period=period)}')
+    chart, predictions = (app_client.get(url) for url in separate_urls(period))
+    body = dashboard.get_json()
+    assert body['chart'] == chart.get_json()
+    assert body['predictions'] == predictions.get_json()
+    # Todo sale de la misma versión de los datos
+    assert dashboard.headers['X-Data-Version'] == chart.headers['X-Data-Version'] == predictions.headers['X-Data-Version']
+
+
+@pytest.mark.parametrize('period', ['D', 'W', 'M'])
+def test_net_profit_aligns_buckets(app_client, period):
+    body = app_client.get(f'/get_dashboard?{PARAMS.format(period=period)}').get_json()
+    ganancias, gastos = body['predictions']['ganancias'], body['predictions']['gastos']
+    expected = {}
+    for series, sign in ((ganancias['real'], 1), (gastos['real'], -1)):
+        for label, value in zip(series['labels'], series['data']):
+            expected[label] = expected.get(label, 0.0) + sign * value
+    net = body['net']
+    assert net['real']['labels'] == sorted(expected)
+    np.testing.assert_allclose(net['real']['data'], [expected[label] for label in sorted(expected)])
+    assert net['predicted']['labels'] == ganancias['predicted']['labels']
+    np.testing.assert_allclose(net['predicted']['data'],
+                               np.subtract(ganancias['predicted']['data'], gastos['predicted']['data']))
+
+
+def test_invalid_period(app_client):
+    response = app_client.get('/get_dashboard?prediction_period=Y')
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('route', ['/get_predictions', '/get_dashboard'])
+@pytest.mark.parametrize('params', [
+    'prediction_period=Y',
+    'prediction_days=-5',
+    'prediction_days=0',
+    'prediction_days=abc',
+    'model_type=nope',
+])
+def test_invalid_prediction_params(app_client, route, params):
+    response = app_client.get(f'{route}?{params}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from downsampling import MIN_POINTS, downsample
+
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_never_returns_more_than_max_points(method):
+    x = np.arange(1000)
+    y = np.sin(x / 10.0)
+    for max_points in (MIN_POINTS, 10, 999):
+        index = downsample(x, y, max_points, method)
+        assert len(index) <= max_points
+        assert np.all(np.diff(index) > 0)
+
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+@pytest.mark.parametrize('max_points', [-1, 0, 1, 2])
+def test_too_few_points_is_an_error(method, max_points):
+    with pytest.raises(ValueError):
+        downsample(np.arange(10), np.arange(10.0), max_points, method)
+
+
+@pytest.mark.parametrize('route', ['/get_data', '/get_dashboard'])
+@pytest.mark.parametrize('max_points', [-5, 0, 1, 2])
+def test_routes_reject_too_few_points(app_client, route, max_points):
+    response = app_client.get(f'{route}?chart_type=separate&max_points={max_points}')
+    assert response.status_code == 400
+    assert 'max_points' in response.get_json()['error']
+
+
+def test_route_reduces_to_the_minimum(app_client):
+    chart = app_client.get(f'/get_data?chart_type=separate&max_points={MIN_POINTS}').get_json()
+    assert len(chart['ganancias']['labels']) == MIN_POINTS
@@ -0,0 +1,110 @@
+"""forecasting.py contra el cálculo con sklearn que reemplazó en make_predictions()."""
+import numpy as np
+import pytest
+
+from forecasting import MODELS, forecast, forecast_many, r2_score
+from rollups import DailyRollup
+from store import columns_from_records
+from stub_graphql import load_dumps
+
+sklearn = pytest.importorskip('sklearn')
+from sklearn.linear_model import LinearRegression  # noqa: E402
+from sklearn.metrics import mean_absolute_error as sk_mae, r2_score as sk_r2  # noqa: E402
+from sklearn.preprocessing import PolynomialFeatures  # noqa: E402
+
+HORIZON = 30
+
+
+def sklearn_forecast(y, model, horizon):
+    """El `modelo_prediccion` original de app.py."""
+    X = np.arange(len(y)).reshape(-1, 1)
+    X_pred = np.arange(len(y), len(y) + horizon).reshape(-1, 1)
+    if model == 'linear':
+        reg = LinearRegression().fit(X, y)
+        return reg.predict(X_pred), sk_r2(y, reg.predict(X)), sk_mae(y, reg.predict(X))
+    if model.startswith('poly'):
+        poly = PolynomialFeatures(degree=int(model[-1]))
+        X_poly = poly.fit_transform(X)
+        reg = LinearRegression().fit(X_poly, y)
+        fitted = reg.predict(X_poly)
+        return reg.predict(poly.transform(X_pred)), sk_r2(y, fitted), sk_mae(y, fitted)
+    window = min(5, len(y))
+    return np.full(horizon, np.mean(y[-window:])), None, None
+
+
+def sample_series():
+    rng = np.random.default_rng(0)
+    series = {f'random{n}': rng.normal(1000, 300, n) for n in (3, 5, 12, 53, 400)}
+    x = np.arange(200)
+    series['cubic'] = 0.001 * x ** 3 - 0.3 * x ** 2 + 5 * x + 100 + rng.normal(0, 5, 200)
+    cols = columns_from_records(load_dumps()['gastos'], 'fecha', 'monto').sorted()
+    rollup = DailyRollup.from_columns(cols.ts, cols.amount)
+    for freq in 'DWM':
+        series[f'gastos.{freq}'] = rollup.buckets(freq)[1].astype('float64')
+    return series
+
+
+SERIES = sample_series()
+
+
+def assert_close(ours, reference, scale):
+    pred, r2, mae = ours
+    ref_pred, ref_r2, ref_mae = reference
+    np.testing.assert_allclose(pred, ref_pred, rtol=1e-6, atol=1e-6 * scale)
+    if ref_r2 is None:
+        assert r2 is None and mae is None
+        return
+    assert r2 == pytest.approx(ref_r2, rel=1e-6, abs=1e-9)
+    assert mae == pytest.approx(ref_mae, rel=1e-6, abs=1e-9 * scale)
+
+
+# Con x sin escalar, el cúbico de sklearn pierde precisión en series largas
+# (x³ llega a ~10⁸); ahí se compara contra un ajuste bien condicionado
+ILL_CONDITIONED = {('poly3', 'random400'), ('poly3', 'gastos.D')}
+
+
+@pytest.mark.parametrize('model', ['linear', 'poly2', 'poly3', 'moving_avg'])
+@pytest.mark.parametrize('name', sorted(SERIES))
+def test_matches_sklearn(model, name):
+    y = SERIES[name]
+    degree = int(model[-1]) if model.startswith('poly') else 1
+    ours, reference = forecast(y, model, HORIZON), sklearn_forecast(y, model, HORIZON)
+    if model != 'moving_avg' and len(y) <= degree:
+        # Menos puntos que coeficientes: ambos interpolan, con soluciones distintas
+        assert ours[1] == reference[1] == 1.0
+        return
+    if (model, name) in ILL_CONDITIONED:
+        x = np.arange(len(y) + HORIZON)
+        exact = np.polynomial.Polynomial.fit(x[:len(y)], y, degree)
+        np.testing.assert_allclose(ours[0], exact(x[len(y):]), rtol=1e-8)
+        assert ours[1] >= reference[1]
+        return
+    assert_close(ours, reference, np.abs(y).max())
+
+
+@pytest.mark.parametrize('model', MODELS)
+def test_batched_fit_matches_one_by_one(model):
+    ys = [SERIES['random53'], SERIES['gastos.W'], SERIES['random400'], SERIES['cubic'][:53]]
+    for ours, y in zip(forecast_many(ys, model, HORIZON), ys):
+        single = forecast(y, model, HORIZON)
+        np.testing.assert_allclose(ours[0], single[0], rtol=1e-9)
+        if single[1] is None:
+            assert ours[1:] == (None, None)
+        else:
+            assert ours[1:] == pytest.approx(single[1:])
+
+
+def test_r2_conventions_match_sklearn():
+    constant = np.full(10, 3.0)
+    assert r2_score(constant, constant) == sk_r2(constant, constant)
+    assert r2_score(constant, constant + 1) == sk_r2(constant, constant + 1)
+
+
+def test_empty_series_is_an_error():
+    with pytest.raises(ValueError):
+        forecast(np.empty(0), 'linear', 5)
+
+
+def test_rolling_average_feeds_its_own_forecasts():
+    pred, _, _ = forecast(np.array([1.0, 2.0, 3.0, 4.0, 5.0]), 'rolling_avg', 3)
+    np.testing.assert_allclose(pred, [3.0, 3.4, 3.68])
@@ -0,0 +1,12 @@
+def latency_labels(client):
+    text = client.get('/metrics').get_data(as_text=True)
+    return {line.split('model_type="')[1].split('"')[0]
+            for line in text.splitlines() if line.startswith('http_request_duration_seconds_count')}
+
+
+def test_unknown_model_type_shares_one_series(app_client):
+    for model in ('linear', 'nope1', 'nope2', 'x' * 200):
+        app_client.get(f'/get_predictions?model_type={model}')
+    labels = latency_labels(app_client)
+    assert {'linear', 'other'} <= labels
+    assert not any(label.startswith('nope') or label.startswith('xxx') for label in labels)
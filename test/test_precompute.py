@@ -0,0 +1,130 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from conftest import ROOT
+from precompute import Precomputer
+
+
+class Data:
+    def __init__(self, version):
+        self.version = version
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "no terminó a tiempo"
+        time.sleep(0.01)
+
+
+def test_respects_max_workers_and_finishes():
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def task():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+
+    precomputer = Precomputer(lambda data: [task] * 20, max_workers=3)
+    precomputer.schedule(Data(1))
+    wait_until(lambda: precomputer.status()['finished_at'] is not None)
+    status = precomputer.status()
+    assert status['done'] == 20 and status['pending'] == 0 and status['version'] == 1
+    assert peak[0] <= 3
+    precomputer.shutdown()
+
+
+def test_new_version_cancels_pending_tasks():
+    release = threading.Event()
+    precomputer = Precomputer(lambda data: [lambda: release.wait(5)] * 10, max_workers=1)
+    precomputer.schedule(Data(1))
+    precomputer.schedule(Data(2))
+    release.set()
+    wait_until(lambda: precomputer.status()['finished_at'] is not None)
+    status = precomputer.status()
+    assert status['version'] == 2
+    assert status['cancelled'] >= 8
+    assert status['done'] + status['cancelled'] == 20
+    precomputer.shutdown()
+
+
+def test_failed_task_is_counted():
+    precomputer = Precomputer(lambda data: [lambda: 1 / 0, lambda: None])
+    precomputer.schedule(Data(1))
+    wait_until(lambda: precomputer.status()['finished_at'] is not None)
+    assert precomputer.status()['failed'] == 1
+    precomputer.shutdown()
+
+
+def test_shutdown_stops_scheduling():
+    precomputer = Precomputer(lambda data: [lambda: None])
+    precomputer.shutdown()
+    precomputer.schedule(Data(1))
+    assert precomputer.status()['enabled'] is False
+    assert precomputer.status()['scheduled'] == 0
+
+
+# Proceso con PRECOMPUTE=1: tras la primera sincronización, la grilla por
+# defecto queda calculada y pedirla ya no ajusta ningún modelo
+APP_WITH_PRECOMPUTE = """
+import json, time
+import app
+client = app.app.test_client()
+assert client.get('/get_data?chart_type=daily').status_code == 200
+deadline = time.monotonic() + 60
+while True:
+    status = client.get('/precompute_status').get_json()
+    if status['finished_at'] is not None or time.monotonic() > deadline:
+        break
+    time.sleep(0.05)
+before = app.forecast_cache.stats()
+for model in app.PRECOMPUTE_MODELS:
+    for period in app.PRECOMPUTE_PERIODS:
+        for days in app.PRECOMPUTE_HORIZONS:
+            url = f'/get_predictions?model_type={model}&prediction_days={days}&prediction_period={period}'
+            assert client.get(url).status_code == 200
+after = app.forecast_cache.stats()
+print(json.dumps({'status': status, 'misses': after['misses'] - before['misses'],
+                  'hits': after['hits'] - before['hits']}))
+"""
+
+
+def test_precomputed_grid_is_served_from_cache(stub):
+    env = dict(os.environ, GRAPHQL_URL=stub.url, SNAPSHOT_DIR='', PRECOMPUTE='1', PRECOMPUTE_WORKERS='2')
+    out = subprocess.run([sys.executable, '-c', APP_WITH_PRECOMPUTE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    status = result['status']
+    assert status['enabled'] and status['max_workers'] == 2
+    assert status['pending'] == 0 and status['failed'] == 0 and status['done'] > 0
+    assert result['misses'] == 0
+    assert result['hits'] > 0
+
+
+def test_background_refresh_shares_the_reload_turn(app_module, app_client, stub, monkeypatch):
+    app_client.get('/get_data?chart_type=daily')
+    cache = app_module.dataset_cache
+    loads = []
+    loader = cache.loader
+    monkeypatch.setattr(cache, 'loader', lambda: loads.append(1) or loader())
+
+    # Una petición tiene el turno: la vuelta en segundo plano no carga nada
+    assert cache.begin_load()
+    try:
+        app_module.background_refresh()
+    finally:
+        cache.end_load()
+    assert loads == []
+
+    app_module.background_refresh()
+    assert loads == [1]
+    assert stub.hits == {'ventaBoletos': 2, 'gastos': 2}
+    assert not cache.loading
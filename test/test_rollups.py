@@ -0,0 +1,113 @@
+"""El índice de agregados (rollups.py) contra el cálculo con pandas que reemplazó."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from rollups import CategoryRollup, DailyRollup
+from store import columns_from_records
+from stub_graphql import load_dumps
+
+RANGES = [(None, None), ('2024-08-01', '2025-02-10'), ('2024-09-03', '2024-09-03')]
+FREQS = {'D': 'D', 'W': 'W', 'M': 'ME'}
+
+
+@pytest.fixture(scope='module')
+def frames():
+    dumps = load_dumps()
+    ventas = pd.DataFrame(dumps['ventaBoletos'])
+    ventas = pd.DataFrame({'Ganancia': ventas['precio'].astype(float).to_numpy()},
+                          index=pd.to_datetime(ventas['fechaVenta']).dt.tz_localize(None).rename('Fecha'))
+    gastos = pd.DataFrame(dumps['gastos'])
+    gastos = pd.DataFrame({'Gasto': gastos['monto'].astype(float).to_numpy(),
+                           'Descripcion': gastos['descripcion'].to_numpy()},
+                          index=pd.to_datetime(gastos['fecha']).dt.tz_localize(None).rename('Fecha'))
+    return {'ganancias': ventas.sort_index(), 'gastos': gastos.sort_index()}
+
+
+def between(df, start, end):
+    if start is None:
+        return df
+    dates = df.index.date
+    return df[(dates >= pd.Timestamp(start).date()) & (dates <= pd.Timestamp(end).date())]
+
+
+def pandas_chart(df, col, chart_type):
+    if chart_type == 'daily':
+        grouped = df[col].groupby(df.index.date).sum()
+        return [str(d) for d in grouped.index], grouped.tolist()
+    grouped = df[col].groupby(pd.Grouper(freq='ME')).sum()
+    return grouped.index.strftime('%Y-%m').tolist(), grouped.tolist()
+
+
+@pytest.mark.parametrize('chart_type', ['daily', 'monthly'])
+@pytest.mark.parametrize('start,end', RANGES)
+def test_chart_matches_pandas(app_client, frames, chart_type, start, end):
+    url = f'/get_data?chart_type={chart_type}'
+    if start:
+        url += f'&start_date={start}&end_date={end}'
+    chart = app_client.get(url).get_json()
+    for key, col in (('ganancias', 'Ganancia'), ('gastos', 'Gasto')):
+        labels, values = pandas_chart(between(frames[key], start, end), col, chart_type)
+        assert chart[key]['labels'] == labels
+        np.testing.assert_allclose(chart[key]['data'], values)
+
+
+# Las fechas pronosticadas no usan alias de pandas en desuso ('M')
+@pytest.mark.filterwarnings('error::FutureWarning')
+@pytest.mark.parametrize('period', ['D', 'W', 'M'])
+@pytest.mark.parametrize('start,end', RANGES[:2])
+def test_prediction_buckets_match_pandas(app_client, frames, period, start, end):
+    url = f'/get_predictions?model_type=linear&prediction_days=5&prediction_period={period}'
+    if start:
+        url += f'&start_date={start}&end_date={end}'
+    predictions = app_client.get(url).get_json()
+    for key, col in (('ganancias', 'Ganancia'), ('gastos', 'Gasto')):
+        grouped = between(frames[key], start, end)[col].groupby(pd.Grouper(freq=FREQS[period])).sum()
+        real = predictions[key]['real']
+        assert [label[:10] for label in real['labels']] == grouped.index.strftime('%Y-%m-%d').tolist()
+        np.testing.assert_allclose(real['data'], grouped.to_numpy())
+
+
+def test_incremental_add_matches_full_build():
+    cols = columns_from_records(load_dumps()['gastos'], 'fecha', 'monto')
+    cols = cols.sorted()
+    rollup = DailyRollup()
+    for i in range(0, len(cols), 700):
+        rollup = rollup.add(cols.ts[i:i + 700], cols.amount[i:i + 700])
+    full = DailyRollup.from_columns(cols.ts, cols.amount)
+    np.testing.assert_array_equal(rollup.days, full.days)
+    np.testing.assert_allclose(rollup.sums, full.sums)
+    np.testing.assert_array_equal(rollup.counts, full.counts)
+    for freq in 'DWM':
+        for a, b in zip(rollup.buckets(freq), full.buckets(freq)):
+            np.testing.assert_allclose(np.asarray(a, dtype='float64'), np.asarray(b, dtype='float64'))
+
+
+def test_late_rows_are_merged():
+    rng = np.random.default_rng(0)
+    ts = rng.integers(0, 400 * 86_400 * 10 ** 9, 5000)
+    amount = rng.random(5000)
+    # La segunda tanda trae filas anteriores a las ya indexadas
+    rollup = DailyRollup.from_columns(np.sort(ts[:3000]), amount[np.argsort(ts[:3000])]).add(ts[3000:], amount[3000:])
+    expected = DailyRollup.from_columns(ts, amount)
+    np.testing.assert_array_equal(rollup.days, expected.days)
+    np.testing.assert_allclose(rollup.sums, expected.sums)
+
+
+@pytest.mark.parametrize('freq', ['D', 'W', 'M'])
+def test_category_top_matches_groupby(frames, freq):
+    df = frames['gastos']
+    cols = columns_from_records(load_dumps()['gastos'], 'fecha', 'monto', 'descripcion').sorted()
+    breakdown = CategoryRollup.from_columns(cols.ts, cols.amount, cols.desc)
+    result = breakdown.top(freq, 3)
+    grouped = df.groupby([pd.Grouper(freq=FREQS[freq]), 'Descripcion'], observed=True)['Gasto'].sum()
+    totals = df['Gasto'].groupby(pd.Grouper(freq=FREQS[freq])).sum()
+    totals = totals[totals.index.isin(grouped.index.get_level_values(0))]
+    np.testing.assert_allclose(result['sums'], totals.to_numpy())
+    for i, label in enumerate(totals.index):
+        expected = grouped.loc[label].sort_values(ascending=False, kind='stable').head(3)
+        rows = result['period'] == i
+        np.testing.assert_allclose(result['top_sums'][rows], expected.to_numpy())
+        # Con empates en el tercer lugar cualquiera de los empatados vale
+        names = {breakdown.categories[code] for code in result['codes'][rows]}
+        assert names <= set(grouped.loc[label][grouped.loc[label] >= expected.min()].index)
@@ -0,0 +1,144 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from conftest import ROOT
+from stub_graphql import ROOT_FIELDS, StubGraphQLServer, load_dumps
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork') or sys.platform == 'win32', reason='requiere flock')
+
+WORKERS = 3
+DURATION = 6.0
+TTL = 1.0
+
+# Cada proceso pide datos en bucle durante DURATION segundos y reporta su rol
+# y lo que vio; con el mismo SNAPSHOT_DIR, como los workers de gunicorn
+WORKER = """
+import json, sys, time
+import app
+client = app.app.test_client()
+versions = []
+end = %f
+while time.time() < end:
+    assert client.get('/get_data?chart_type=daily').status_code == 200
+    data = app.dataset_cache.get()
+    if not versions or versions[-1] != data.version:
+        versions.append(data.version)
+    time.sleep(0.05)
+data = app.dataset_cache.get()
+leader = app.shared_dataset.is_leader
+# Nadie deja de sincronizar antes de que todos anoten su rol: si el líder
+# soltara el lock, otro tomaría su lugar
+time.sleep(1.0)
+app.shared_dataset.close()
+stats = app.shared_dataset.stats()
+print(json.dumps({'leader': leader, 'syncs': stats['syncs'], 'maps': stats['maps'],
+                  'snapshot': stats['snapshot'], 'versions': versions,
+                  'rows': {'ventaBoletos': len(data.ventas), 'gastos': len(data.gastos)}}))
+"""
+
+
+@pytest.fixture(scope='module')
+def results(tmp_path_factory):
+    records = load_dumps()
+    snapshot_dir = str(tmp_path_factory.mktemp('snapshot'))
+    with StubGraphQLServer(records=records) as stub:
+        stub.limits = {field: len(rows) - 20 for field, rows in records.items()}
+        env = dict(os.environ, GRAPHQL_URL=stub.url, SNAPSHOT_DIR=snapshot_dir, SHARED_DATA='1',
+                   DATA_CACHE_TTL=str(TTL), PRECOMPUTE='0')
+        end = time.time() + DURATION
+        workers = [subprocess.Popen([sys.executable, '-c', WORKER % end], cwd=ROOT, env=env,
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                   for _ in range(WORKERS)]
+        # A mitad de la corrida el upstream agrega filas
+        time.sleep(DURATION / 2)
+        stub.limits = {}
+        outputs = [worker.communicate(timeout=60) for worker in workers]
+        for worker, (_, err) in zip(workers, outputs):
+            assert worker.returncode == 0, err
+        hits = dict(stub.hits)
+    return {
+        'workers': [json.loads(out.strip().splitlines()[-1]) for out, _ in outputs],
+        'hits': hits,
+        'total': {field: len(rows) for field, rows in records.items()},
+    }
+
+
+def test_single_leader(results):
+    leaders = [w for w in results['workers'] if w['leader']]
+    followers = [w for w in results['workers'] if not w['leader']]
+    assert len(leaders) == 1
+    assert leaders[0]['syncs'] > 0
+    assert all(w['syncs'] == 0 and w['maps'] > 0 for w in followers)
+
+
+def test_upstream_load_does_not_grow_with_workers(results):
+    # Solo el líder consulta: a lo sumo una vez por TTL (más la primera carga)
+    leader = next(w for w in results['workers'] if w['leader'])
+    for field in ROOT_FIELDS:
+        assert results['hits'][field] <= leader['syncs']
+        assert results['hits'][field] <= DURATION / TTL + 2
+
+
+def test_followers_see_new_version(results):
+    workers = results['workers']
+    final = {w['versions'][-1] for w in workers}
+    assert len(final) == 1
+    assert all(len(w['versions']) >= 2 for w in workers)
+    assert all(w['rows'] == results['total'] for w in workers)
+    # Los seguidores mapean la misma instantánea
+    assert len({w['snapshot'] for w in workers if not w['leader']}) == 1
+
+
+def test_followers_take_the_rollups_from_the_snapshot(tmp_path, monkeypatch):
+    import shared
+    from forecasting import TrendState
+    from rollups import CategoryRollup, DailyRollup
+    from test_sync import new_sync, sorted_dumps
+
+    records = sorted_dumps()
+    with StubGraphQLServer(records=records) as stub:
+        stub.limits = {field: len(rows) - 20 for field, rows in records.items()}
+        leader = shared.SharedDataset(new_sync(stub), tmp_path, poll=0).start()
+        follower = shared.SharedDataset(new_sync(stub), tmp_path, poll=0, first_wait=0)
+        assert leader.is_leader
+        leader.load()
+        leader.data_sync.save_snapshot(tmp_path)
+        monkeypatch.setattr(DailyRollup, 'from_columns', None)
+        monkeypatch.setattr(CategoryRollup, 'from_columns', None)
+        first = follower.load()
+        assert not follower.is_leader
+        first.rollups['ventaBoletos'].trend('W')
+
+        stub.limits = {}
+        leader.request_refresh()
+        expected = leader.load()
+        leader.data_sync.save_snapshot(tmp_path)
+        builds = []
+        from_values = TrendState.from_values.__func__
+        monkeypatch.setattr(TrendState, 'from_values', classmethod(lambda cls, y, *args: builds.append(len(y)) or
+                                                                   from_values(cls, y, *args)))
+        data = follower.load()
+        assert data.version == expected.version
+        for field, rollup in data.rollups.items():
+            np.testing.assert_array_equal(rollup.days, expected.rollups[field].days)
+            np.testing.assert_allclose(rollup.sums, expected.rollups[field].sums)
+        assert data.breakdowns['gastos'].categories == expected.breakdowns['gastos'].categories
+        # La tendencia de la versión anterior se pone al día en lugar de rehacerse
+        data.rollups['ventaBoletos'].trend('W')
+        assert builds == []
+        follower.close()
+        leader.close()
+
+
+def test_shared_mode_needs_a_process_lock(tmp_path, monkeypatch):
+    import shared
+    monkeypatch.setattr(shared, 'fcntl', None)
+    monkeypatch.setattr(shared, 'msvcrt', None)
+    with pytest.raises(RuntimeError, match='SHARED_DATA'):
+        shared.SharedDataset(None, tmp_path)
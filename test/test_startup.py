@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks import HEAVY_MODULES, import_times
+from conftest import ROOT
+
+# Margen amplio sobre lo que tarda hoy (~0.3 s): solo debe saltar si vuelve
+# a importarse algo pesado al arrancar
+MAX_IMPORT_MS = float(os.environ.get('STARTUP_MAX_MS', 1500))
+
+CHECK = """
+import json, sys, time
+t0 = time.perf_counter()
+import app
+elapsed = time.perf_counter() - t0
+print(json.dumps({'ms': elapsed * 1000, 'loaded': [m for m in %r if m in sys.modules]}))
+"""
+
+
+def child_env():
+    # Sin instantánea: con ella el hilo que la precarga importa pandas
+    return dict(os.environ, SNAPSHOT_DIR='', PRECOMPUTE='0', SHARED_DATA='0')
+
+
+def run_check():
+    out = subprocess.run([sys.executable, '-c', CHECK % (HEAVY_MODULES + ('asyncio',),)], cwd=ROOT,
+                         env=child_env(), capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_import_app_skips_heavy_modules():
+    assert run_check()['loaded'] == []
+
+
+def test_import_app_time():
+    # La mejor de tres, para no depender de un arranque en frío del disco
+    best = min(run_check()['ms'] for _ in range(3))
+    assert best < MAX_IMPORT_MS, f"import app tarda {best:.0f} ms (máximo {MAX_IMPORT_MS:.0f} ms)"
+
+
+def test_importtime_has_no_heavy_children():
+    modules = import_times(child_env())
+    total = modules.pop('app')
+    assert total / 1000 < MAX_IMPORT_MS
+    assert not set(modules) & set(HEAVY_MODULES)
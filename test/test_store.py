@@ -0,0 +1,84 @@
+import subprocess
+import sys
+
+import numpy as np
+
+from store import Columns, current_snapshot, load_snapshot, save_snapshot
+
+WRITER = """
+import sys
+import numpy as np
+from store import Columns, save_snapshot
+directory, n = sys.argv[1], int(sys.argv[2])
+for i in range(n):
+    cols = Columns(np.arange(i + 1, dtype='int64'), np.ones(i + 1), np.array([b'x'] * (i + 1), 'S36'))
+    save_snapshot(directory, {'ventaBoletos': cols}, {'version': i})
+"""
+
+
+def columns(n):
+    return Columns(np.arange(n, dtype='int64'), np.arange(n, dtype='float64'), np.array([b'id'] * n, 'S36'))
+
+
+def test_round_trip(tmp_path):
+    save_snapshot(tmp_path, {'ventaBoletos': columns(5)}, {'version': 3})
+    series, meta = load_snapshot(tmp_path)
+    assert meta == {'version': 3}
+    np.testing.assert_array_equal(series['ventaBoletos'].amount, np.arange(5))
+
+
+def test_aggregates_round_trip(tmp_path):
+    days = {'days': np.arange(3, dtype='int64'), 'sums': np.ones(3)}
+    save_snapshot(tmp_path, {'ventaBoletos': columns(5), 'gastos': columns(2)}, {},
+                  {'ventaBoletos': {'daily': ({'categories': ['a', None]}, days)}})
+    series, meta, aggregates = load_snapshot(tmp_path, aggregates=True)
+    assert aggregates['gastos'] == {}
+    info, arrays = aggregates['ventaBoletos']['daily']
+    assert info == {'categories': ['a', None]}
+    np.testing.assert_array_equal(arrays['sums'], days['sums'])
+    assert len(load_snapshot(tmp_path)) == 2
+
+
+def test_replaced_version_is_removed(tmp_path):
+    first = save_snapshot(tmp_path, {'ventaBoletos': columns(1)})
+    second = save_snapshot(tmp_path, {'ventaBoletos': columns(2)})
+    snaps = [p for p in tmp_path.iterdir() if p.name.startswith('snap-')]
+    assert snaps == [tmp_path / current_snapshot(tmp_path)]
+    assert str(snaps[0]) == second != first
+
+
+def test_concurrent_writers(tmp_path):
+    from conftest import ROOT
+
+    writers = [subprocess.Popen([sys.executable, '-c', WRITER, str(tmp_path), '30'], cwd=ROOT) for _ in range(3)]
+    assert [w.wait() for w in writers] == [0, 0, 0]
+    series, _ = load_snapshot(tmp_path)
+    assert len(series['ventaBoletos']) == 30
+    # Solo queda la versión vigente, y ningún puntero temporal
+    assert sorted(p.name for p in tmp_path.iterdir() if not p.name.startswith('CURRENT')) == [current_snapshot(tmp_path)]
+    assert not list(tmp_path.glob('CURRENT.*.tmp'))
+
+
+def test_version_removed_while_reading(tmp_path, monkeypatch):
+    import store
+
+    save_snapshot(tmp_path, {'ventaBoletos': columns(1)})
+    read = store._read_snapshot
+    calls = []
+
+    def replaced_once(target, mmap):
+        # La primera lectura pierde la carrera contra un guardado concurrente
+        if not calls:
+            calls.append(target)
+            save_snapshot(tmp_path, {'ventaBoletos': columns(2)})
+        return read(target, mmap)
+
+    monkeypatch.setattr(store, '_read_snapshot', replaced_once)
+    series, _ = load_snapshot(tmp_path)
+    assert len(series['ventaBoletos']) == 2
+
+
+def test_missing_arrays_return_none(tmp_path):
+    target = save_snapshot(tmp_path, {'ventaBoletos': columns(3)})
+    (tmp_path / target / 'ventaBoletos.ts.npy').unlink()
+    assert load_snapshot(tmp_path) is None
@@ -0,0 +1,54 @@
+import json
+import time
+
+import pytest
+
+
+@pytest.fixture
+def broker(app_module, app_client, monkeypatch):
+    """El broker de /stream con lugar para clientes y la sincronización cada 50 ms."""
+    monkeypatch.setattr(app_module.event_broker, 'max_clients', 4)
+    monkeypatch.setattr(app_module, 'STREAM_SYNC_INTERVAL', 0.05)
+    return app_module.event_broker
+
+
+def next_event(subscriber, name, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        message = subscriber.get(0.1)
+        if message is None:
+            continue
+        lines = message.decode('utf-8').splitlines()
+        if lines[0] == f'event: {name}':
+            return json.loads(next(line for line in lines if line.startswith('data: '))[len('data: '):])
+    raise AssertionError(f"no llegó ningún evento {name}")
+
+
+def test_disabled_by_default_under_wsgi(app_client):
+    response = app_client.get('/stream')
+    assert response.status_code == 503
+    assert 'STREAM_WSGI_CLIENTS' in response.get_json()['error']
+
+
+def test_subscribed_clients_get_deltas_without_requests(app_module, app_client, broker, stub):
+    stub.limits = {field: len(rows) - 20 for field, rows in stub.records.items()}
+    app_client.get('/get_data?chart_type=daily')
+    version = app_module.data_sync.version
+    subscriber = broker.subscribe()
+    try:
+        app_module.ensure_stream_sync()
+        stub.limits = {}
+        # Nadie pide datos: la sincronización de /stream trae las filas nuevas
+        delta = next_event(subscriber, 'delta')
+        assert delta['version'] == version + 1
+        assert set(delta) >= {'ganancias', 'gastos'}
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+def test_no_sync_without_clients(app_module, app_client, broker, stub):
+    app_client.get('/get_data?chart_type=daily')
+    app_module.ensure_stream_sync()
+    hits = dict(stub.hits)
+    time.sleep(0.3)
+    assert stub.hits == hits
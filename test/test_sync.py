@@ -0,0 +1,169 @@
+import numpy as np
+import pytest
+
+from fetcher import GraphQLClient
+from sources import GraphQLSource
+from stub_graphql import StubGraphQLServer, load_dumps
+from sync import DataSync, SERIES
+
+QUERY_FIELDS = {
+    'ventaBoletos': ('id', 'precio', 'fechaVenta'),
+    'gastos': ('id', 'descripcion', 'monto', 'fecha'),
+}
+# Tamaño de cada tramo del historial que el upstream va sirviendo
+STEPS = (0.25, 0.5, 0.51, 0.8, 1.0)
+
+
+def sorted_dumps():
+    # Las filas nuevas siempre son posteriores: el historial crece por el final
+    return {field: sorted(rows, key=lambda r: r[SERIES[field][0]]) for field, rows in load_dumps().items()}
+
+
+def new_sync(stub, delta_arg='', full_resync_every=0):
+    source = GraphQLSource(GraphQLClient(stub.url, retries=0), QUERY_FIELDS, delta_arg)
+    return DataSync(source.fetch, {field: lambda cols: cols for field in SERIES}, use_filter=source.supports_filter,
+                    full_resync_every=full_resync_every, fetch_many=source.fetch_many)
+
+
+def assert_same(incremental, full):
+    for field in SERIES:
+        a, b = incremental.columns()[field], full.columns()[field]
+        order_a, order_b = np.argsort(a.ids, kind='stable'), np.argsort(b.ids, kind='stable')
+        np.testing.assert_array_equal(a.ids[order_a], b.ids[order_b])
+        np.testing.assert_array_equal(a.ts[order_a], b.ts[order_b])
+        np.testing.assert_array_equal(a.amount[order_a], b.amount[order_b])
+        assert a.is_sorted()
+        if b.desc is not None:
+            assert list(np.asarray(a.desc)[order_a]) == list(np.asarray(b.desc)[order_b])
+        ra, rb = incremental.dataset().rollups[field], full.dataset().rollups[field]
+        np.testing.assert_array_equal(ra.days, rb.days)
+        np.testing.assert_allclose(ra.sums, rb.sums)
+        np.testing.assert_array_equal(ra.counts, rb.counts)
+
+
+@pytest.mark.parametrize('delta_arg', ['', 'desde'])
+def test_incremental_sync_matches_full_sync(delta_arg):
+    records = sorted_dumps()
+    with StubGraphQLServer(records=records, delta_arg=delta_arg or None) as stub:
+        incremental = new_sync(stub, delta_arg)
+        for step in STEPS:
+            stub.limits = {field: int(len(rows) * step) for field, rows in records.items()}
+            incremental.sync()
+            full = new_sync(stub)
+            full.sync(full=True)
+            assert_same(incremental, full)
+    # Los contadores son por serie: solo la primera sincronización fue completa
+    assert incremental.full_syncs == len(SERIES)
+    assert incremental.delta_syncs == len(SERIES) * (len(STEPS) - 1)
+
+
+def test_filter_only_downloads_new_rows():
+    records = sorted_dumps()
+    total = sum(len(rows) for rows in records.values())
+    with StubGraphQLServer(records=records, delta_arg='desde') as stub:
+        data_sync = new_sync(stub, 'desde')
+        stub.limits = {field: len(rows) - 50 for field, rows in records.items()}
+        data_sync.sync()
+        served = sum(stub.rows_served.values())
+        stub.limits = {}
+        data_sync.sync()
+        # Solo las 100 filas nuevas y las que comparten la fecha de la marca de agua
+        assert sum(stub.rows_served.values()) - served < 0.05 * total
+        assert sum(len(cols) for cols in data_sync.columns().values()) == total
+
+
+def test_unchanged_upstream_keeps_version():
+    with StubGraphQLServer(records=sorted_dumps()) as stub:
+        data_sync = new_sync(stub)
+        data_sync.sync()
+        version = data_sync.version
+        data_sync.sync()
+        assert data_sync.version == version
+        assert data_sync.changes == {}
+
+
+def test_falls_back_to_id_diff_when_filter_is_rejected():
+    records = sorted_dumps()
+    # El upstream no acepta argumentos: la consulta con filtro devuelve errores
+    with StubGraphQLServer(records=records) as stub:
+        data_sync = new_sync(stub, 'desde')
+        stub.limits = {field: len(rows) // 2 for field, rows in records.items()}
+        data_sync.sync()
+        stub.limits = {}
+        data_sync.sync()
+        assert not data_sync.use_filter
+        full = new_sync(stub)
+        full.sync(full=True)
+        assert_same(data_sync, full)
+
+
+def test_validation_error_with_status_400_falls_back():
+    records = sorted_dumps()
+    with StubGraphQLServer(records=records) as stub:
+        stub.error_status = 400
+        data_sync = new_sync(stub, 'desde')
+        data_sync.sync()
+        data_sync.sync()
+        assert not data_sync.use_filter
+        assert data_sync.errors == 0
+
+
+def test_transient_failure_keeps_the_filter():
+    records = sorted_dumps()
+    with StubGraphQLServer(records=records, delta_arg='desde') as stub:
+        data_sync = new_sync(stub, 'desde')
+        stub.limits = {field: len(rows) - 50 for field, rows in records.items()}
+        data_sync.sync()
+        stub.limits = {}
+        stub.failures = len(SERIES)
+        hits = dict(stub.hits)
+        data_sync.sync()
+        # Sin reintentar con una descarga completa contra el upstream caído
+        assert stub.hits == hits
+        assert data_sync.use_filter
+        assert data_sync.errors == len(SERIES)
+        served = sum(stub.rows_served.values())
+        data_sync.sync()
+        assert sum(stub.rows_served.values()) - served < 0.05 * sum(len(rows) for rows in records.values())
+        full = new_sync(stub)
+        full.sync(full=True)
+        assert_same(data_sync, full)
+
+
+def test_full_resync_replaces_rewritten_history():
+    records = sorted_dumps()
+    with StubGraphQLServer(records=records) as stub:
+        data_sync = new_sync(stub)
+        data_sync.sync()
+        stub.records = {field: rows[::2] for field, rows in records.items()}
+        data_sync.reset()
+        data_sync.sync()
+        assert data_sync.changes == {field: None for field in SERIES}
+        full = new_sync(stub)
+        full.sync(full=True)
+        assert_same(data_sync, full)
+
+
+
+def test_warm_start_from_snapshot_is_incremental(tmp_path):
+    records = sorted_dumps()
+    with StubGraphQLServer(records=records) as stub:
+        stub.limits = {field: len(rows) - 10 for field, rows in records.items()}
+        first = new_sync(stub)
+        first.sync()
+        first.save_snapshot(tmp_path)
+
+        stub.limits = {}
+        data_sync = new_sync(stub, full_resync_every=3)
+        assert data_sync.load_snapshot(tmp_path)
+        data_sync.sync()
+        assert (data_sync.full_syncs, data_sync.delta_syncs) == (0, len(SERIES))
+        data_sync.sync()
+        data_sync.sync()
+        # La resincronización periódica se cuenta desde la carga
+        assert data_sync.full_syncs == 0
+        data_sync.sync()
+        assert data_sync.full_syncs == len(SERIES)
+        full = new_sync(stub)
+        full.sync(full=True)
+        assert_same(data_sync, full)